@@ -1,5 +1,10 @@
-from fastapi import Header, HTTPException
+from fastapi import Header, HTTPException, Request
 from typing import Optional
+from app.services.registry import ServiceRegistry
+
+def get_registry(request: Request) -> ServiceRegistry:
+    """Return the process-wide service registry created in the app lifespan"""
+    return request.app.state.registry
 
 async def get_openai_api_key(authorization: Optional[str] = Header(None)) -> str:
     if not authorization:
@@ -1,14 +1,20 @@
+import json
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from app.services.chat_service import ChatService
 from typing import List, Dict, Optional
-from app.api.deps import get_openai_api_key
+from app.api.deps import get_openai_api_key, get_registry
+from app.services.registry import ServiceRegistry
 from app.core.config import settings
+from app.services.admission import AdmissionRejected, Priority
 
 router = APIRouter()
 
 class QueryRequest(BaseModel):
     query: str
+    project: Optional[str] = None  # owner/repo or repository URL; searches all projects when omitted
+    trace: bool = False  # Return the timed pipeline spans in the response metadata
+    session_id: Optional[str] = None  # Client-chosen id; questions with the same id share a conversation
 
 class Source(BaseModel):
     title: str
@@ -18,6 +24,8 @@ class Source(BaseModel):
 class Metadata(BaseModel):
     model: Optional[str] = None
     run_id: Optional[str] = None
+    cached: Optional[str] = None  # "exact" or "semantic" when served from the answer cache
+    trace: Optional[List[Dict]] = None  # Spans of the request when asked for: name, start_ms, duration_ms
 
 class QueryResponseData(BaseModel):
     answer: str
@@ -30,23 +38,57 @@ class QueryResponse(BaseModel):
 
 class ChatRequest(BaseModel):
     message: str
+    project: Optional[str] = None
+    session_id: Optional[str] = None
 
 @router.post("/query", response_model=QueryResponse)
-def query_documents(request: QueryRequest):
+async def query_documents(request: QueryRequest, registry: ServiceRegistry = Depends(get_registry)):
     """Query the documents and get a response"""
     try:
         api_key = settings.OPENAI_API_KEY
-        chat_service = ChatService(api_key=api_key)
-        result = chat_service.query_docs(request.query)
+        chat_service = await registry.chat_service(api_key)
+        result = await chat_service.query_docs(
+            request.query, project=request.project, trace=request.trace, session_id=request.session_id
+        )
         return result
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error processing query: {str(e)}"
         )
 
+@router.post("/query/stream")
+async def stream_query_documents(request: QueryRequest, registry: ServiceRegistry = Depends(get_registry)):
+    """Query the documents and stream the answer as Server-Sent Events.
+
+    Sends ``token`` events with answer deltas, then one ``done`` event whose data
+    is a ``QueryResponse`` with the full answer, sources and metadata.
+    """
+    # Once streaming has started a rejection can only be sent as an error event
+    registry.admission.check(Priority.INTERACTIVE)
+    chat_service = await registry.chat_service(settings.OPENAI_API_KEY)
+
+    async def event_stream():
+        async for event, data in chat_service.stream_query_docs(
+            request.query, project=request.project, trace=request.trace, session_id=request.session_id
+        ):
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Stop nginx from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/chat")
-async def chat(request: ChatRequest, api_key: str = settings.OPENAI_API_KEY):
-    chat_service = ChatService(api_key=api_key)
-    response = chat_service.query_docs(request.message)
+async def chat(
+    request: ChatRequest,
+    api_key: str = settings.OPENAI_API_KEY,
+    registry: ServiceRegistry = Depends(get_registry)
+):
+    chat_service = await registry.chat_service(api_key)
+    response = await chat_service.query_docs(request.message, project=request.project, session_id=request.session_id)
     return response 
\ No newline at end of file
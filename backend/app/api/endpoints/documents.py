@@ -1,12 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from typing import List
-from app.services.document_service import DocumentService
+from python_multipart.multipart import parse_options_header
 from pydantic import BaseModel, HttpUrl
-from app.api.deps import get_openai_api_key
+from app.api.deps import get_openai_api_key, get_registry
+from app.services.ingest_jobs import IngestJob
+from app.services.registry import ServiceRegistry
 from app.core.config import settings
+from app.core.executor import run_blocking
+from app.models.project import project_id
+from app.services.admission import AdmissionRejected, Priority
 
 router = APIRouter()
-document_service = DocumentService()
 
 class GitHubRepoRequest(BaseModel):
     repo_url: HttpUrl
@@ -17,14 +21,48 @@ class ProcessResponse(BaseModel):
 
 class ProcessGitHubRequest(BaseModel):
     repo_url: str
+    force: bool = False  # Reprocess even if the README has not changed
 
 @router.post("/process-github")
-async def process_github_repo(request: ProcessGitHubRequest, api_key: str = settings.OPENAI_API_KEY):
+async def process_github_repo(
+    request: ProcessGitHubRequest,
+    api_key: str = settings.OPENAI_API_KEY,
+    registry: ServiceRegistry = Depends(get_registry)
+):
     """Process a GitHub repository and store its documentation"""
     try:
-        document_service = DocumentService(api_key=api_key)
-        result = await document_service.process_github_repo(request.repo_url)
+        document_service = await registry.document_service(api_key)
+        result = await document_service.process_github_repo(request.repo_url, force=request.force)
         return {"status": "success", "message": "Repository processed successfully", "data": result}
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing repository: {str(e)}"
+        )
+
+class ProcessRepositoryRequest(BaseModel):
+    repo_url: str
+    ref: str = "HEAD"  # Branch, tag or commit; the default branch by default
+    force: bool = False  # Reprocess even if the repository has not changed
+
+@router.post("/process-repository")
+async def process_repository(
+    request: ProcessRepositoryRequest,
+    api_key: str = settings.OPENAI_API_KEY,
+    registry: ServiceRegistry = Depends(get_registry)
+):
+    """Process every documentation file of a GitHub repository"""
+    # Local checkouts can be ingested from code, but not through the API
+    if not request.repo_url.startswith(("https://", "http://")):
+        raise HTTPException(status_code=400, detail="repo_url must be an http(s) URL")
+    try:
+        document_service = await registry.document_service(api_key)
+        result = await document_service.process_repository(request.repo_url, ref=request.ref, force=request.force)
+        return {"status": "success", "message": "Repository processed successfully", "data": result}
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -34,21 +72,98 @@ async def process_github_repo(request: ProcessGitHubRequest, api_key: str = sett
 class ProcessMultipleRequest(BaseModel):
     repo_urls: List[str]
 
-@router.post("/process-multiple")
-async def process_multiple_repos(request: ProcessMultipleRequest, api_key: str = settings.OPENAI_API_KEY):
-    """Process multiple GitHub repositories"""
+@router.post("/process-multiple", status_code=202)
+async def process_multiple_repos(
+    request: ProcessMultipleRequest,
+    api_key: str = settings.OPENAI_API_KEY,
+    registry: ServiceRegistry = Depends(get_registry)
+):
+    """Queue multiple GitHub repositories for background processing.
+
+    Returns a job id right away; poll ``/jobs/{job_id}`` for per-URL progress.
+    """
+    # Refuse new jobs while the embedding queue is full rather than failing them later
+    registry.admission.check(Priority.BULK)
     try:
-        document_service = DocumentService(api_key=api_key)
-        results = []
-        for url in request.repo_urls:
-            try:
-                result = await document_service.process_github_repo(url)
-                results.append({"url": url, "status": "success", "data": result})
-            except Exception as e:
-                results.append({"url": url, "status": "error", "error": str(e)})
-        return {"status": "success", "results": results}
+        document_service = await registry.document_service(api_key)
+        job = registry.ingest_jobs.submit(request.repo_urls, document_service)
+        return {"status": "accepted", "job_id": job.id, "job": job}
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error processing repositories: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+UPLOAD_REQUEST_BODY = {
+    "content": {
+        "multipart/form-data": {
+            "schema": {
+                "type": "object",
+                "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}}
+            }
+        }
+    }
+}
+
+@router.post("/upload", status_code=202, openapi_extra={"requestBody": UPLOAD_REQUEST_BODY})
+async def upload_documents(
+    request: Request,
+    project: str = Query(..., min_length=1),
+    force: bool = False,  # Reingest files whose content was ingested before
+    api_key: str = settings.OPENAI_API_KEY,
+    registry: ServiceRegistry = Depends(get_registry)
+):
+    """Upload documentation files and queue them for background ingestion.
+
+    The multipart body is streamed to ``UPLOAD_DIR`` as it arrives, so any
+    number of files of up to ``UPLOAD_MAX_FILE_BYTES`` can be sent at once.
+    Files whose content the project already has are not processed again.
+    Returns a job id right away; poll ``/jobs/{job_id}`` for per-file progress.
+    """
+    registry.admission.check(Priority.BULK)
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+
+    upload_store = registry.upload_store
+    receiver = upload_store.receiver(options[b"boundary"], project_id(project), force)
+    try:
+        async for data in request.stream():
+            await run_blocking(receiver.write, data)
+        uploads = await run_blocking(receiver.finish)
+    except Exception as e:
+        await run_blocking(receiver.abort)
+        raise HTTPException(status_code=400, detail=f"Invalid upload: {str(e)}")
+
+    try:
+        queued = {upload.url: upload for upload in uploads if upload.status == "queued"}
+        job = None
+        if queued:
+            document_service = await registry.document_service(api_key)
+            job = registry.ingest_jobs.submit(
+                list(queued),
+                document_service,
+                handler=lambda url: document_service.process_upload(queued[url], upload_store)
+            )
+        return {
+            "status": "accepted",
+            "job_id": job.id if job is not None else None,
+            "files": [
+                {"filename": upload.filename, "url": upload.url, "size": upload.size, "status": upload.status,
+                 "detail": upload.detail}
+                for upload in uploads
+            ],
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error queueing uploads: {str(e)}"
+        )
+
+@router.get("/jobs/{job_id}", response_model=IngestJob)
+async def get_ingest_job(job_id: str, registry: ServiceRegistry = Depends(get_registry)):
+    """Get the progress of an ingestion job"""
+    job = registry.ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingest job {job_id} not found")
+    return job
@@ -1,27 +1,39 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from typing import List
-from app.services.project_service import ProjectService, Project
-from app.services.document_service import DocumentService
-from app.api.deps import get_openai_api_key
+from app.models.project import Project
+from app.api.deps import get_openai_api_key, get_registry
+from app.services.registry import ServiceRegistry
 from app.core.config import settings
+from app.core.executor import run_blocking
+from app.services.admission import AdmissionRejected
 
 router = APIRouter()
-project_service = ProjectService()
 
 @router.get("/", response_model=List[Project])
-async def list_projects():
-    """Get all projects"""
+async def list_projects(
+    response: Response,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    registry: ServiceRegistry = Depends(get_registry)
+):
+    """Get a page of projects; the total count is sent in the X-Total-Count header"""
     try:
-        return project_service.get_projects()
+        project_service = registry.project_service
+        response.headers["X-Total-Count"] = str(await run_blocking(project_service.count))
+        return await run_blocking(project_service.get_projects, offset, limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/add")
-async def add_project(repo_url: str, api_key: str = settings.OPENAI_API_KEY):
+async def add_project(
+    repo_url: str,
+    api_key: str = settings.OPENAI_API_KEY,
+    registry: ServiceRegistry = Depends(get_registry)
+):
     """Add a new project and process its documentation"""
     try:
         # Process the repository documentation
-        document_service = DocumentService(api_key=api_key)
+        document_service = await registry.document_service(api_key)
         await document_service.process_github_repo(repo_url)
         
         # Extract repository name from GitHub URL
@@ -33,7 +45,8 @@ async def add_project(repo_url: str, api_key: str = settings.OPENAI_API_KEY):
             repo_url = f"https://github.com/{parts[3]}/{repo_name}"
             
             # Add project to our storage
-            project = project_service.add_project(
+            project = await run_blocking(
+                registry.project_service.add_project,
                 name=repo_name,
                 readmeUrl=repo_url,
                 description=f"GitHub Repository: {repo_name}"
@@ -42,5 +55,7 @@ async def add_project(repo_url: str, api_key: str = settings.OPENAI_API_KEY):
             return {"status": "success", "project": project}
         else:
             raise HTTPException(status_code=400, detail="Invalid GitHub URL format")
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from pathlib import Path
 from typing import Optional
 import logging
 
@@ -17,6 +18,25 @@ class Settings(BaseSettings):
     # Qdrant Settings
     QDRANT_URL: str = "http://localhost:6333"
     QDRANT_COLLECTION_NAME: str = "docs-agent"
+    QDRANT_ON_DISK_VECTORS: bool = False  # Keep original vectors on disk (memory-mapped)
+    QDRANT_QUANTIZATION: str = "none"  # none, scalar (int8, 4x smaller) or binary (1 bit, 32x smaller)
+    QDRANT_QUANTIZATION_ALWAYS_RAM: bool = True  # Pin quantized vectors in RAM even with on-disk originals
+    QDRANT_RESCORE: bool = True  # Re-rank quantized candidates with the original vectors
+    QDRANT_OVERSAMPLING: float = 2.0  # Quantized candidates fetched per result before rescoring
+    QDRANT_HNSW_M: int = 16  # Graph links per node: higher improves recall, costs memory
+    QDRANT_HNSW_EF_CONSTRUCT: int = 100  # Build-time beam width: higher improves graph quality
+    QDRANT_HNSW_ON_DISK: bool = False
+    QDRANT_SEARCH_EF: Optional[int] = None  # Search-time beam width, Qdrant's default when unset
+    WARM_UP_RETRY_SECONDS: float = 1.0  # First wait before retrying Qdrant at startup, doubled on each retry
+    WARM_UP_RETRY_MAX_SECONDS: float = 30.0
+    
+    # Connection Pooling
+    HTTP_MAX_CONNECTIONS: int = 100  # Shared by all OpenAI clients
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_TIMEOUT: float = 60.0
+    SERVICE_CACHE_SIZE: int = 16  # Distinct API keys with live services
+    BLOCKING_EXECUTOR_WORKERS: int = 16  # Threads for blocking SDK calls made from async code
+    PROCESS_POOL_WORKERS: int = 0  # Processes for CPU-bound work, 0 means one per CPU
     
     # OpenRouter Settings
     OPENROUTER_API_KEY: str
@@ -24,10 +44,101 @@ class Settings(BaseSettings):
     
     # OpenAI Settings (for embeddings)
     OPENAI_API_KEY: str
+    OPENAI_BASE_URL: Optional[str] = None  # Point at an OpenAI-compatible server, e.g. for load tests
+    
+    # Admission Control (shared by chat and ingestion, sized to the account's OpenAI limits)
+    OPENAI_REQUESTS_PER_MINUTE: int = 500  # 0 disables the limit
+    OPENAI_TOKENS_PER_MINUTE: int = 300000  # Prompt plus expected completion tokens; 0 disables the limit
+    ADMISSION_BURST_SECONDS: float = 10.0  # Bucket size, in seconds of the per-minute rates
+    ADMISSION_INTERACTIVE_RESERVE: float = 0.2  # Share of each bucket only chat may use
+    ADMISSION_INTERACTIVE_QUEUE: int = 64  # Waiting chat calls beyond this are rejected with 503
+    ADMISSION_INTERACTIVE_MAX_WAIT: float = 10.0  # Seconds; chat calls expected to wait longer get 503
+    ADMISSION_BULK_QUEUE: int = 1024  # Waiting ingest calls beyond this are rejected; they never time out
+    ADMISSION_COMPLETION_TOKENS: int = 1000  # Output tokens assumed for a completion without max_tokens
+    
+    # Embeddings
+    # openai: remote embedding model. local: lexical fallback for offline development and tests,
+    # hashes words and word pairs without a model, so it matches shared words, not meaning
+    EMBEDDER_BACKEND: str = "openai"
+    EMBEDDING_MODEL: str = "text-embedding-3-small"  # Used by the openai backend
+    EMBEDDING_DIMENSIONS: int = 1536  # Vector size; text-embedding-3 models can return fewer (Matryoshka), e.g. 512
+    LOCAL_EMBEDDER_SHARD_SIZE: int = 256  # Texts per worker task; smaller batches stay in-process
+    
+    # Local state (caches, indexes)
+    DATA_DIR: str = str(Path(__file__).parent.parent.parent / "data")
+    
+    # Embedding Cache
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: Optional[str] = None  # Defaults to DATA_DIR/embedding_cache.sqlite3
+    EMBEDDING_CACHE_MEMORY_ITEMS: int = 5000  # ~6 KB each at 1536 dimensions
+    EMBEDDING_CACHE_DISK_ITEMS: int = 500000
+    
+    # Answer Cache
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+    ANSWER_CACHE_SIMILARITY: float = 0.95  # Min. cosine similarity for a near-duplicate hit
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000
+    
+    # Retrieval
+    RETRIEVAL_MODE: str = "hybrid"  # dense, sparse (BM25) or hybrid (both, fused by reciprocal rank)
+    RETRIEVAL_CANDIDATES: int = 20  # Results fetched from each index before fusion
+    RRF_K: int = 60  # Reciprocal rank fusion constant; larger values flatten rank differences
+    LEXICAL_INDEX_PATH: Optional[str] = None  # Defaults to DATA_DIR/lexical_index.sqlite3
+    RERANK_ENABLED: bool = True
+    RERANK_CANDIDATES: int = 50  # Results fetched for reranking
+    RERANK_PRIOR_WEIGHT: float = 0.3  # Weight of the first-stage rank in the reranked score
+    RERANK_CACHE_SIZE: int = 1024  # Cached score vectors, one per query and candidate set
+    CONTEXT_MAX_CHUNKS: int = 8  # Chunks given to the agent per knowledge search
+    CONTEXT_TOKEN_BUDGET: int = 2000  # ...trimmed to this many tokens
+    
+    # Conversations
+    CONVERSATION_MAX_SESSIONS: int = 10000  # Least recently used sessions beyond this are dropped
+    CONVERSATION_TTL_SECONDS: int = 3600  # Idle sessions expire after this
+    CONVERSATION_WINDOW_TOKENS: int = 1500  # Latest turns sent verbatim with each question
+    CONVERSATION_SUMMARY_TOKENS: int = 300  # Older turns are folded into a summary of this size
+    CONVERSATION_SUMMARY_MODEL: str = "gpt-4o-mini"
     
     # Document Processing
-    UPLOAD_DIR: str = "uploads"
+    UPLOAD_DIR: str = "uploads"  # Uploaded files, stored once per content hash
+    UPLOAD_MAX_FILE_BYTES: int = 50 * 1024 * 1024  # Larger uploaded files are rejected while they stream in
     ALLOWED_EXTENSIONS: set = {"pdf", "docx", "md"}
+    MAX_DOCUMENT_BYTES: int = 50 * 1024 * 1024  # Larger documents are rejected mid-download
+    FETCH_CHUNK_BYTES: int = 64 * 1024  # Read size when streaming a download into the chunker
+
+    # Chunking
+    CHUNK_TARGET_TOKENS: int = 400  # Chunks are filled up to this size
+    CHUNK_MAX_TOKENS: int = 800  # Hard cap; larger blocks are split
+    CHUNK_OVERLAP_TOKENS: int = 50  # Trailing prose repeated in the next chunk of a section
+    CHUNK_MIN_TOKENS: int = 40  # Smaller sections are merged with their first subsection
+
+    # Ingestion Pipeline
+    EMBED_BATCH_SIZE: int = 64  # Max sections per embedding request
+    EMBED_BATCH_MAX_TOKENS: int = 32000  # Approx. token budget per embedding request
+    EMBED_CONCURRENCY: int = 4  # Embedding batches in flight per document
+    
+    # Fetching
+    GITHUB_RAW_BASE_URL: str = "https://raw.githubusercontent.com"  # Point at a mirror or a stub server
+    FETCH_MAX_CONNECTIONS: int = 100  # Shared by all document fetches
+    FETCH_MAX_CONNECTIONS_PER_HOST: int = 8
+    FETCH_KEEPALIVE_SECONDS: float = 30.0
+    FETCH_TIMEOUT: float = 60.0  # Max. seconds between reads of a response body
+    FETCH_RETRIES: int = 3  # Retries after 429, 5xx or connection errors
+    FETCH_BACKOFF_SECONDS: float = 0.5  # First retry delay, doubled on each retry
+    FETCH_BACKOFF_MAX_SECONDS: float = 30.0
+    FETCH_CACHE_ENABLED: bool = True  # Send ETag/Last-Modified so unchanged documents are skipped
+    FETCH_CACHE_PATH: Optional[str] = None  # Defaults to DATA_DIR/http_cache
+    
+    # Repository Crawling
+    GITHUB_ARCHIVE_BASE_URL: str = "https://codeload.github.com"  # Tarballs at {base}/{owner}/{repo}/tar.gz/{ref}
+    REPO_MAX_ARCHIVE_BYTES: int = 500 * 1024 * 1024
+    REPO_MAX_FILE_BYTES: int = 5 * 1024 * 1024  # Larger documentation files are skipped
+    REPO_FILE_CONCURRENCY: int = 8  # Files of one repository parsed or embedded at once
+    
+    # Ingestion Jobs
+    INGEST_MAX_CONCURRENCY: int = 8  # Repositories processed at once across all jobs
+    INGEST_PER_HOST_CONCURRENCY: int = 4  # Concurrent fetches per host
+    INGEST_PER_HOST_RATE: float = 5.0  # Fetches per second per host, 0 disables
+    INGEST_JOB_HISTORY: int = 200  # Finished jobs kept for polling
     
     class Config:
         case_sensitive = True
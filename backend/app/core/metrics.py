@@ -0,0 +1,263 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; covers sub-millisecond cache lookups up to minute-long LLM runs
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# (labels, value) pairs of one metric family
+Samples = Iterable[Tuple[Dict[str, str], float]]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def family(name: str, kind: str, documentation: str, samples: Samples) -> List[str]:
+    """Lines of one metric family in the Prometheus text exposition format"""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples)
+    return lines
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Monotonically increasing total, e.g. tokens used"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return family(self.name, self.kind, self.documentation, [
+            (dict(zip(self.labelnames, key)), value) for key, value in values
+        ])
+
+class Gauge(Counter):
+    """Value that goes up and down, e.g. requests in flight"""
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+@dataclass
+class _HistogramValue:
+    counts: List[int]
+    total: float = 0.0
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values: Dict[Tuple[str, ...], _HistogramValue] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = _HistogramValue([0] * len(self.buckets))
+            entry.counts[index] += 1
+            entry.total += value
+
+    def totals(self) -> Dict[Tuple[str, ...], Tuple[int, float]]:
+        """Observation count and sum per label values"""
+        with self._lock:
+            return {key: (sum(entry.counts), entry.total) for key, entry in self._values.items()}
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, list(entry.counts), entry.total) for key, entry in self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, counts, total in values:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels({**labels, 'le': _number(bound)})} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(labels)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self, extra: Iterable[List[str]] = ()) -> str:
+        """All metrics, followed by ``extra`` families collected at scrape time"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for lines_of_family in extra:
+            lines.extend(lines_of_family)
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "docs_agent_stage_seconds", "Latency of ingest and query pipeline stages", ["pipeline", "stage"]
+)
+TOKENS = REGISTRY.counter("docs_agent_tokens_total", "Tokens sent to or returned by models", ["kind"])
+SECTIONS = REGISTRY.counter("docs_agent_ingested_sections_total", "Sections seen by ingestion", ["result"])
+HTTP_REQUESTS = REGISTRY.counter(
+    "docs_agent_http_requests_total", "Finished API requests", ["method", "route", "status"]
+)
+HTTP_SECONDS = REGISTRY.histogram(
+    "docs_agent_http_request_seconds", "API request latency until the response is sent", ["method", "route"]
+)
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "docs_agent_admission_wait_seconds", "Time model calls waited for the rate limiter", ["priority"]
+)
+IN_FLIGHT = REGISTRY.gauge("docs_agent_http_requests_in_flight", "API requests being handled")
+IN_FLIGHT.inc(0)
+
+# Tracing
+
+@dataclass
+class Trace:
+    """Spans recorded while handling one request, for the response metadata"""
+    start: float = field(default_factory=time.perf_counter)
+    spans: List[Dict] = field(default_factory=list)
+
+    def add(self, pipeline: str, stage: str, start: float, seconds: float) -> None:
+        self.spans.append({
+            "name": f"{pipeline}.{stage}",
+            "start_ms": round((start - self.start) * 1000, 2),
+            "duration_ms": round(seconds * 1000, 2),
+        })
+
+    def to_list(self) -> List[Dict]:
+        return sorted(self.spans, key=lambda span: span["start_ms"])
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+@contextmanager
+def tracing() -> Iterator[Trace]:
+    """Collect the spans of this context, including tasks started from it"""
+    trace = Trace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # An async generator may be closed from another context, which ends that one anyway
+            pass
+
+@contextmanager
+def span(pipeline: str, stage: str) -> Iterator[None]:
+    """Time a stage into ``STAGE_SECONDS`` and the current trace, if any"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, pipeline=pipeline, stage=stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(pipeline, stage, start, seconds)
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests in flight and timing them by route template.
+
+    Routes are labelled by their path template (``/api/documents/jobs/{job_id}``)
+    so ids do not create a series each; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            IN_FLIGHT.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_SECONDS.observe(time.perf_counter() - start, method=method, route=path)
+            HTTP_REQUESTS.inc(method=method, route=path, status=str(status))
@@ -1,11 +1,36 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.executor import shutdown_executor
+from app.core.metrics import REGISTRY, MetricsMiddleware
+from app.services.admission import AdmissionRejected
 from app.api.endpoints import documents, chat, projects, settings as settings_endpoints
+from app.services.registry import ServiceRegistry
+
+logging.basicConfig(level=logging.INFO)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared clients and services live for the whole process
+    app.state.registry = ServiceRegistry()
+    # Not awaited: the server accepts connections while services warm up, see /ready
+    warm_up = asyncio.create_task(app.state.registry.warm_up())
+    try:
+        yield
+    finally:
+        warm_up.cancel()
+        await asyncio.gather(warm_up, return_exceptions=True)
+        await app.state.registry.aclose()
+        shutdown_executor()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -16,6 +41,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(documents.router, prefix=f"{settings.API_V1_STR}/documents", tags=["documents"])
@@ -23,6 +49,13 @@ app.include_router(chat.router, prefix=f"{settings.API_V1_STR}/chat", tags=["cha
 app.include_router(projects.router, prefix=f"{settings.API_V1_STR}/projects", tags=["projects"])
 app.include_router(settings_endpoints.router, prefix=f"{settings.API_V1_STR}/settings", tags=["settings"])
 
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, error: AdmissionRejected):
+    """Model calls are over the rate limit for longer than the caller should wait"""
+    return JSONResponse(
+        {"detail": str(error)}, status_code=503, headers={"Retry-After": str(error.retry_after)}
+    )
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Docs Agent API"}
@@ -30,3 +63,17 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/ready")
+async def readiness_check(request: Request):
+    """200 once services are warm and Qdrant is reachable, 503 until then"""
+    readiness = request.app.state.registry.readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    """Metrics in the Prometheus text format"""
+    return PlainTextResponse(
+        REGISTRY.render(request.app.state.registry.metric_families()),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,6 +1,28 @@
+from typing import Optional
+from urllib.parse import urlparse
 from pydantic import BaseModel
 
+GITHUB_HOSTS = ("github.com", "www.github.com", "raw.githubusercontent.com")
+
 class Project(BaseModel):
     name: str
     readmeUrl: str
-    description: str 
\ No newline at end of file
+    description: str
+    project: Optional[str] = None  # Normalized owner/repo id, usable as the chat ``project`` filter
+
+def project_id(value: str) -> str:
+    """Normalized project id (``owner/repo``) of a repository URL, README URL or id.
+
+    Repositories on hosts other than GitHub keep the host as a prefix.
+    """
+    value = value.strip().lower()
+    if "://" in value:
+        parsed = urlparse(value)
+        host, parts = parsed.netloc, [part for part in parsed.path.split("/") if part]
+    else:
+        parts = [part for part in value.split("/") if part]
+        host = parts.pop(0) if parts and parts[0] in GITHUB_HOSTS else ""
+    repo = [part.removesuffix(".git") for part in parts[:2]]
+    if host and host not in GITHUB_HOSTS:
+        repo.insert(0, host)
+    return "/".join(repo)
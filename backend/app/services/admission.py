@@ -0,0 +1,189 @@
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Deque, Dict, List, Optional
+from app.core.metrics import ADMISSION_WAIT_SECONDS
+
+class Priority(IntEnum):
+    """Classes of model calls, served strictly in this order"""
+    INTERACTIVE = 0  # Chat: someone is waiting for the answer
+    BULK = 1  # Ingestion and background summaries
+
+class AdmissionRejected(Exception):
+    """A call was turned away because its class's queue is full or the wait would be too long"""
+
+    def __init__(self, priority: Priority, retry_after: float, reason: str):
+        # Whole seconds, as sent in the Retry-After header
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.priority = priority
+        super().__init__(f"Model calls are rate limited ({reason}), retry in {self.retry_after}s")
+
+class TokenBucket:
+    """Refills at ``per_minute / 60`` per second up to ``burst_seconds`` worth of the rate"""
+
+    def __init__(self, per_minute: float, burst_seconds: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait(self, amount: float, floor: float = 0.0) -> float:
+        """Seconds until ``amount`` can be taken while leaving ``floor`` in the bucket"""
+        missing = amount + floor - self.level
+        return max(0.0, missing / self.rate)
+
+@dataclass
+class _Waiter:
+    tokens: float
+    future: asyncio.Future
+    queued: float
+
+class AdmissionController:
+    """Shared limit on model calls: requests and tokens per minute, with priorities.
+
+    Each call is admitted once both token buckets (requests and estimated
+    tokens per minute) can cover it. Waiting calls are served strictly by
+    priority, so chat goes ahead of any queued ingestion, and bulk calls may
+    not use the last ``reserve`` share of either bucket, which keeps room for
+    chat bursts while a large import runs. Queues are bounded: a call whose
+    queue is full, or whose expected wait exceeds its class's ``max_wait``,
+    is rejected at once with an ``AdmissionRejected`` carrying a retry delay.
+    A limit of 0 disables that bucket. Used from the event loop only.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        burst_seconds: float,
+        reserve: float,
+        queue_sizes: Dict[Priority, int],
+        max_waits: Dict[Priority, Optional[float]]
+    ):
+        self.requests = TokenBucket(requests_per_minute, burst_seconds) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute, burst_seconds) if tokens_per_minute > 0 else None
+        self.reserve = reserve
+        self.queue_sizes = queue_sizes
+        self.max_waits = max_waits
+        self._queues: Dict[Priority, Deque[_Waiter]] = {priority: deque() for priority in Priority}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.admitted = {priority: 0 for priority in Priority}
+        self.rejected = {priority: 0 for priority in Priority}
+
+    def _floor(self, bucket: TokenBucket, priority: Priority) -> float:
+        if priority == Priority.INTERACTIVE:
+            return 0.0
+        # Never so much that a single bulk call cannot fit
+        return min(bucket.capacity * self.reserve, bucket.capacity - 1)
+
+    def _wait(self, priority: Priority, requests: float, tokens: float) -> float:
+        """Seconds until both buckets can cover the amounts for this class"""
+        now = time.monotonic()
+        wait = 0.0
+        for bucket, amount in ((self.requests, requests), (self.tokens, tokens)):
+            if bucket is not None:
+                bucket.refill(now)
+                wait = max(wait, bucket.wait(amount, self._floor(bucket, priority)))
+        return wait
+
+    def _clamp(self, priority: Priority, tokens: float) -> float:
+        # A call larger than the bucket would otherwise wait forever
+        if self.tokens is None:
+            return tokens
+        return min(tokens, self.tokens.capacity - self._floor(self.tokens, priority))
+
+    def _ahead(self, priority: Priority) -> List[_Waiter]:
+        return [waiter for queued in Priority if queued <= priority for waiter in self._queues[queued]]
+
+    def expected_wait(self, priority: Priority, tokens: float = 0.0) -> float:
+        """Seconds a new call of this class would wait behind the calls queued ahead of it"""
+        ahead = self._ahead(priority)
+        return self._wait(priority, len(ahead) + 1, sum(waiter.tokens for waiter in ahead) + tokens)
+
+    def check(self, priority: Priority, tokens: float = 0.0) -> None:
+        """Raise ``AdmissionRejected`` if a call of this class would be turned away now"""
+        if len(self._queues[priority]) >= self.queue_sizes[priority]:
+            self.rejected[priority] += 1
+            raise AdmissionRejected(priority, self.expected_wait(priority, tokens), "queue full")
+        max_wait = self.max_waits.get(priority)
+        if max_wait is not None:
+            wait = self.expected_wait(priority, tokens)
+            if wait > max_wait:
+                self.rejected[priority] += 1
+                raise AdmissionRejected(priority, wait, f"expected wait {wait:.1f}s")
+
+    def _take(self, priority: Priority, tokens: float) -> None:
+        if self.requests is not None:
+            self.requests.level -= 1
+        if self.tokens is not None:
+            self.tokens.level -= tokens
+        self.admitted[priority] += 1
+
+    async def acquire(self, priority: Priority, tokens: float) -> None:
+        """Wait until a call of ``tokens`` estimated tokens may be sent.
+
+        Raises ``AdmissionRejected`` when it would wait too long for its class.
+        """
+        tokens = self._clamp(priority, tokens)
+        queued = any(self._queues[ahead] for ahead in Priority if ahead <= priority)
+        if not queued and self._wait(priority, 1, tokens) == 0:
+            self._take(priority, tokens)
+            ADMISSION_WAIT_SECONDS.observe(0.0, priority=priority.name.lower())
+            return
+
+        self.check(priority, tokens)
+        waiter = _Waiter(tokens, asyncio.get_running_loop().create_future(), time.monotonic())
+        self._queues[priority].append(waiter)
+        self._schedule()
+        max_wait = self.max_waits.get(priority)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done():
+                # Admitted while timing out; a cancelled caller simply does not use it
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+            else:
+                waiter.future.cancel()
+                self._queues[priority].remove(waiter)
+                self._schedule()
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                self.rejected[priority] += 1
+                raise AdmissionRejected(priority, self.expected_wait(priority, tokens), "timed out")
+        ADMISSION_WAIT_SECONDS.observe(time.monotonic() - waiter.queued, priority=priority.name.lower())
+
+    def _schedule(self) -> None:
+        """Admit queued calls in priority order, and set a timer for when the next one fits"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for priority in Priority:
+            queue = self._queues[priority]
+            while queue:
+                waiter = queue[0]
+                wait = self._wait(priority, 1, waiter.tokens)
+                if wait > 0:
+                    # Strict priority: lower classes wait behind this call
+                    self._timer = asyncio.get_running_loop().call_later(wait, self._schedule)
+                    return
+                queue.popleft()
+                self._take(priority, waiter.tokens)
+                waiter.future.set_result(None)
+
+    def stats(self) -> Dict:
+        return {
+            priority.name.lower(): {
+                "queued": len(self._queues[priority]),
+                "admitted": self.admitted[priority],
+                "rejected": self.rejected[priority],
+            }
+            for priority in Priority
+        }
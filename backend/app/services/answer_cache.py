@@ -0,0 +1,166 @@
+import copy
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return re.sub(r"[\s?!.]+$", "", " ".join(query.lower().split()))
+
+@dataclass
+class _Entry:
+    project: Optional[str]
+    query: str
+    embedding: Optional[np.ndarray]
+    response: Dict
+    expires_at: float
+
+class AnswerCache:
+    """In-process cache of agent answers in front of ChatService.
+
+    A lookup first tries the normalized query text, then the most similar cached
+    query embedding within the same project scope, if its cosine similarity is at
+    least ``similarity_threshold``. Entries expire after ``ttl`` seconds.
+
+    Every scope carries a version that ``invalidate`` bumps when documents are
+    re-ingested. Callers take a version token before running the agent and hand
+    it back to ``put``, so answers computed against the old documents are never
+    stored after an invalidation.
+    """
+
+    def __init__(self, ttl: float, similarity_threshold: float, max_entries: int):
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Optional[str], str], _Entry]" = OrderedDict()
+        self._matrices: Dict[Optional[str], Tuple[np.ndarray, List[_Entry]]] = {}
+        self._versions: Dict[Optional[str], int] = {}
+        self._global_version = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def version(self, project: Optional[str]) -> Tuple[int, int]:
+        """Token identifying the current document version for a project scope"""
+        return self._global_version, self._versions.get(project, 0)
+
+    def _drop(self, key: Tuple[Optional[str], str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._matrices.pop(entry.project, None)
+
+    @staticmethod
+    def _hit(entry: _Entry, kind: str) -> Dict:
+        response = copy.deepcopy(entry.response)
+        response["data"]["metadata"]["cached"] = kind
+        return response
+
+    def get(self, query: str, project: Optional[str] = None) -> Optional[Dict]:
+        """Return the cached response for an exact normalized-query match"""
+        key = (project, normalize_query(query))
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.time():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        self.exact_hits += 1
+        return self._hit(entry, "exact")
+
+    def get_similar(self, embedding: List[float], project: Optional[str] = None) -> Optional[Dict]:
+        """Return the cached response for the most similar query above the threshold"""
+        matrix, entries = self._matrix(project)
+        if not entries:
+            self.misses += 1
+            return None
+
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            self.misses += 1
+            return None
+        scores = matrix @ (vector / norm)
+        best = int(np.argmax(scores))
+        entry = entries[best]
+        if scores[best] < self.similarity_threshold or entry.expires_at < time.time():
+            self.misses += 1
+            return None
+
+        self.semantic_hits += 1
+        logger.debug(f"Semantic answer cache hit ({scores[best]:.3f}): {entry.query}")
+        return self._hit(entry, "semantic")
+
+    def _matrix(self, project: Optional[str]) -> Tuple[np.ndarray, List[_Entry]]:
+        """Stacked, normalized embeddings for a scope, rebuilt only after changes"""
+        cached = self._matrices.get(project)
+        if cached is None:
+            entries = [e for e in self._entries.values() if e.project == project and e.embedding is not None]
+            matrix = np.stack([e.embedding for e in entries]) if entries else np.empty((0, 0), dtype=np.float32)
+            cached = (matrix, entries)
+            self._matrices[project] = cached
+        return cached
+
+    def put(
+        self,
+        query: str,
+        response: Dict,
+        version: Tuple[int, int],
+        embedding: Optional[List[float]] = None,
+        project: Optional[str] = None
+    ) -> None:
+        """Store a successful response unless the scope was invalidated since ``version``"""
+        if response.get("status") != "success" or version != self.version(project):
+            return
+
+        vector = None
+        if embedding:
+            vector = np.asarray(embedding, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            vector = vector / norm if norm else None
+
+        key = (project, normalize_query(query))
+        self._drop(key)
+        self._entries[key] = _Entry(
+            project=project,
+            query=query,
+            embedding=vector,
+            response=copy.deepcopy(response),
+            expires_at=time.time() + self.ttl
+        )
+        self._matrices.pop(project, None)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate(self, project: Optional[str] = None) -> None:
+        """Drop answers that may depend on re-ingested documents.
+
+        Answers without a project scope may draw on any document, so they are
+        always dropped. Passing no project drops everything.
+        """
+        if project is None:
+            self._global_version += 1
+            self._entries.clear()
+            self._matrices.clear()
+        else:
+            self._versions[project] = self._versions.get(project, 0) + 1
+            self._versions[None] = self._versions.get(None, 0) + 1
+            for key in [key for key, entry in self._entries.items() if entry.project in (project, None)]:
+                self._drop(key)
+        logger.info(f"Invalidated answer cache for {project or 'all projects'}")
+
+    def stats(self) -> Dict:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+        }
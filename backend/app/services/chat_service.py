@@ -1,41 +1,95 @@
-from typing import List, Dict
-import httpx
+import asyncio
+from contextlib import nullcontext
+from dataclasses import dataclass
+from functools import partial
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from app.core.config import settings
-import json
-import numpy as np
-from qdrant_client import QdrantClient
+from openai import AsyncOpenAI, OpenAI
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models
 import logging
 from agno.agent import Agent
 from agno.models.openai import OpenAIChat
 from agno.vectordb.qdrant import Qdrant
-from agno.embedder.openai import OpenAIEmbedder
-from agno.document import Document
 from agno.knowledge.url import UrlKnowledge
+from agno.models.message import Message
+from agno.run.response import RunEvent
 from agno.tools.reasoning import ReasoningTools
+from app.core.executor import run_blocking
+from app.core.metrics import TOKENS, Trace, span, tracing
+from app.core.tokens import estimate_tokens
+from app.models.project import project_id
+from app.services.admission import AdmissionController, AdmissionRejected, Priority
+from app.services.answer_cache import AnswerCache
+from app.services.collection_config import search_params
+from app.services.conversation_store import ConversationStore, Turn
+from app.services.embedding_cache import CachedEmbedder, EmbeddingCache
+from app.services.embedders import create_embedder
+from app.services.lexical_index import LexicalIndex
+from app.services.reranker import LexicalReranker, trim_to_budget
 
 logger = logging.getLogger(__name__)
 
+RETRIEVAL_MODES = ("dense", "sparse", "hybrid")
+
+@dataclass
+class AdmittedOpenAIChat(OpenAIChat):
+    """OpenAIChat that waits for the admission controller before every completion of a run"""
+    admission: Optional[AdmissionController] = None
+    priority: Priority = Priority.INTERACTIVE
+
+    async def _admit(self, messages: List[Message]) -> None:
+        if self.admission is not None:
+            prompt = sum(estimate_tokens(str(message.content or "")) for message in messages)
+            await self.admission.acquire(self.priority, prompt + (self.max_tokens or settings.ADMISSION_COMPLETION_TOKENS))
+
+    async def ainvoke(self, messages: List[Message]):
+        await self._admit(messages)
+        return await super().ainvoke(messages)
+
+    async def ainvoke_stream(self, messages: List[Message]):
+        await self._admit(messages)
+        async for chunk in super().ainvoke_stream(messages):
+            yield chunk
+
 class ChatService:
-    def __init__(self, api_key: str = None):
+    def __init__(
+        self,
+        api_key: str = None,
+        openai_client: Optional[OpenAI] = None,
+        async_openai_client: Optional[AsyncOpenAI] = None,
+        qdrant_client: Optional[QdrantClient] = None,
+        async_qdrant_client: Optional[AsyncQdrantClient] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        answer_cache: Optional[AnswerCache] = None,
+        lexical_index: Optional[LexicalIndex] = None,
+        retrieval_mode: Optional[str] = None,
+        reranker: Optional[LexicalReranker] = None,
+        conversation_store: Optional[ConversationStore] = None,
+        admission: Optional[AdmissionController] = None
+    ):
+        """Pre-built clients may be passed in so connections are shared across requests"""
 
         if api_key is None:
             api_key = "sk.."
 
-        # Initialize OpenAI model for the agent
-        self.model = OpenAIChat(
-            api_key=api_key,
-            id="gpt-4-turbo-preview"
-        )
+        self.api_key = api_key
+        self.openai_client = openai_client
+        self.async_openai_client = async_openai_client
+        self.answer_cache = answer_cache
+        self.lexical_index = lexical_index
+        self.reranker = reranker
+        self.conversation_store = conversation_store
+        self.admission = admission
+        self.retrieval_mode = retrieval_mode or settings.RETRIEVAL_MODE
+        if self.retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {self.retrieval_mode}")
         
-        # Initialize embedder
-        self.embedder = OpenAIEmbedder(
-            api_key=api_key,
-            id="text-embedding-3-small", 
-            dimensions=1536
-        )
+        # Initialize embedder (backend chosen in settings)
+        self.embedder = create_embedder(api_key, openai_client, embedding_cache)
         
         # Initialize Qdrant client
-        self.qdrant_client = QdrantClient(url=settings.QDRANT_URL)
+        self.qdrant_client = qdrant_client or QdrantClient(url=settings.QDRANT_URL)
         
         # Initialize Agno vector store
         self.vector_db = Qdrant(
@@ -43,6 +97,10 @@ class ChatService:
             embedder=self.embedder,
             url=settings.QDRANT_URL
         )
+        # Reuse the pooled clients instead of letting agno open its own
+        self.vector_db._client = self.qdrant_client
+        if async_qdrant_client is not None:
+            self.vector_db._async_client = async_qdrant_client
         
         # Initialize knowledge base
         self.knowledge = UrlKnowledge(
@@ -50,10 +108,57 @@ class ChatService:
             vector_db=self.vector_db
         )
         
-        # Initialize Agno agent
-        self.agent = Agent(
+        # Process the reasoning tool entrypoints once, see _reasoning_tools
+        template = ReasoningTools(add_instructions=True)
+        for function in template.functions.values():
+            function.process_entrypoint()
+            function.skip_entrypoint_processing = True
+        self._reasoning_functions = template.functions
+
+    def _reasoning_tools(self) -> ReasoningTools:
+        """ReasoningTools for one agent, reusing the entrypoints processed in __init__.
+
+        Agno wraps each tool in pydantic's validate_call whenever an agent runs,
+        which for these tools builds a schema of the whole Agent class: hundreds of
+        milliseconds of CPU on the event loop per request. Shallow copies keep the
+        processed entrypoints while each agent still binds its own ``_agent``.
+        """
+        toolkit = ReasoningTools(add_instructions=True)
+        toolkit.functions = {name: function.model_copy() for name, function in self._reasoning_functions.items()}
+        return toolkit
+
+    def _create_agent(
+        self,
+        project: Optional[str] = None,
+        summary: str = "",
+        turns: Optional[List[Turn]] = None,
+        question: Optional[str] = None,
+        question_embedding: Optional[List[float]] = None
+    ) -> Agent:
+        """Create the Agno agent for a single run.
+
+        Agents and models keep per-run state, so they are cheap objects built per
+        query on top of the shared clients, embedder and vector store. Knowledge
+        searches of the agent are scoped to ``project`` when one is given. The
+        conversation so far is passed in as a ``summary`` of earlier turns and
+        the latest ``turns``, which go before the question. The ``question``
+        and its embedding, if already made, are handed to the retriever.
+        """
+        history = []
+        for turn in turns or []:
+            history += [{"role": "user", "content": turn.query}, {"role": "assistant", "content": turn.answer}]
+        context = f"Summary of the earlier conversation:\n{summary}" if summary else None
+        model = AdmittedOpenAIChat(
+            api_key=self.api_key,
+            id="gpt-4-turbo-preview",
+            client=self.openai_client,
+            async_client=self.async_openai_client,
+            admission=self.admission
+        )
+        
+        return Agent(
             name="Docs Assistant",
-            model=self.model,
+            model=model,
             description="""You are a documentation assistant that helps users understand code repositories by analyzing their README files.
             Your goal is to provide clear, accurate, and well-structured answers based on the repository documentation.
             You can search through the documentation to find relevant information and provide comprehensive responses.""",
@@ -67,75 +172,446 @@ class ChatService:
                 "6. Always cite your sources by referencing the specific sections you used"
             ],
             knowledge=self.knowledge,
-            tools=[ReasoningTools(add_instructions=True)],
+            retriever=partial(
+                self._retrieve, project=project, question=question, question_embedding=question_embedding
+            ),
+            add_messages=history or None,
+            additional_context=context,
+            tools=[self._reasoning_tools()],
             add_datetime_to_instructions=True,
             markdown=True,
             show_tool_calls=True,
-            read_chat_history=True
+            # Telemetry opens a fresh HTTPS client and calls agno's API on every run
+            telemetry=False
+        )
+
+    @staticmethod
+    def _project_filter(project: Optional[str]) -> Optional[models.Filter]:
+        if not project:
+            return None
+        return models.Filter(
+            must=[models.FieldCondition(key="meta_data.project", match=models.MatchValue(value=project_id(project)))]
+        )
+
+    async def _search_points(
+        self,
+        query: str,
+        limit: int,
+        project: Optional[str] = None,
+        embedding: Optional[List[float]] = None
+    ) -> List[models.ScoredPoint]:
+        """Embed the query off the event loop and run the vector search on the async client.
+
+        ``embedding`` is the query's vector if the caller already has it. With a
+        ``project`` the search is filtered on the indexed project id, so only
+        that project's points are scored.
+        """
+        query_embedding = embedding
+        if query_embedding is None:
+            with span("query", "embed"):
+                query_embedding = await self._embed_query(query)
+        if not query_embedding:
+            logger.error(f"Error getting embedding for query: {query}")
+            return []
+        
+        with span("query", "vector_search"):
+            response = await self.vector_db.async_client.query_points(
+                collection_name=settings.QDRANT_COLLECTION_NAME,
+                query=query_embedding,
+                query_filter=self._project_filter(project),
+                search_params=search_params(),
+                limit=limit,
+                with_payload=True
+            )
+        return [point for point in response.points if point.payload]
+
+    async def _dense_search(
+        self,
+        query: str,
+        limit: int,
+        project: Optional[str] = None,
+        embedding: Optional[List[float]] = None
+    ) -> List[Dict]:
+        points = await self._search_points(query, limit, project, embedding)
+        return [
+            {
+                "id": str(point.id),
+                "name": point.payload.get("name"),
+                "meta_data": point.payload["meta_data"],
+                "content": point.payload["content"],
+                "score": point.score
+            }
+            for point in points
+        ]
+
+    async def _sparse_search(self, query: str, limit: int, project: Optional[str] = None) -> List[Dict]:
+        with span("query", "lexical_search"):
+            return await run_blocking(self.lexical_index.search, query, limit, project_id(project) if project else None)
+
+    @staticmethod
+    def _fuse(rankings: List[List[Dict]], k: int) -> List[Dict]:
+        """Reciprocal rank fusion: each result scores ``sum(1 / (k + rank))`` over the rankings it appears in.
+
+        Only ranks are used, so BM25 and cosine scores need no calibration
+        against each other.
+        """
+        fused: Dict[str, Dict] = {}
+        for ranking in rankings:
+            for rank, result in enumerate(ranking, start=1):
+                entry = fused.setdefault(result["id"], {**result, "score": 0.0})
+                entry["score"] += 1.0 / (k + rank)
+        return sorted(fused.values(), key=lambda result: result["score"], reverse=True)
+
+    async def _first_stage(
+        self,
+        query: str,
+        limit: int,
+        project: Optional[str],
+        mode: str,
+        embedding: Optional[List[float]] = None
+    ) -> List[Dict]:
+        """Retrieve candidates with ``dense``, ``sparse`` or ``hybrid`` search.
+
+        ``dense`` searches the vectors, ``sparse`` the BM25 index, and ``hybrid``
+        runs both concurrently and fuses their rankings. Without a lexical index
+        every mode falls back to dense.
+        """
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+        if mode == "dense" or self.lexical_index is None:
+            return await self._dense_search(query, limit, project, embedding)
+        if mode == "sparse":
+            return await self._sparse_search(query, limit, project)
+        
+        candidates = max(limit, settings.RETRIEVAL_CANDIDATES)
+        dense, sparse = await asyncio.gather(
+            self._dense_search(query, candidates, project, embedding),
+            self._sparse_search(query, candidates, project)
         )
+        return self._fuse([dense, sparse], settings.RRF_K)[:limit]
+
+    async def search(
+        self,
+        query: str,
+        limit: int = 5,
+        project: Optional[str] = None,
+        mode: Optional[str] = None,
+        rerank: Optional[bool] = None,
+        embedding: Optional[List[float]] = None
+    ) -> List[Dict]:
+        """Retrieve the best ``limit`` sections for a query.
+
+        ``mode`` defaults to the service's retrieval mode. With a reranker (and
+        unless ``rerank`` is False) ``RERANK_CANDIDATES`` candidates are fetched
+        and reordered off the event loop before the top ``limit`` are returned.
+        An ``embedding`` of the query saves embedding it again.
+        """
+        mode = mode or self.retrieval_mode
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+        use_reranker = self.reranker is not None and rerank is not False
+        
+        candidates = max(limit, settings.RERANK_CANDIDATES) if use_reranker else limit
+        results = await self._first_stage(query, candidates, project, mode, embedding)
+        if use_reranker:
+            with span("query", "rerank"):
+                results = await run_blocking(self.reranker.rerank, query, results)
+        return results[:limit]
 
-    async def search_similar_chunks(self, query: str, limit: int = 5) -> List[Dict]:
-        """Search for similar document chunks using the query embedding"""
+    async def search_similar_chunks(
+        self,
+        query: str,
+        limit: int = 5,
+        project: Optional[str] = None,
+        mode: Optional[str] = None
+    ) -> List[Dict]:
+        """Search for similar document chunks using the configured retrieval mode"""
         try:
             # Search for similar documents
-            results = await self.vector_db.async_search(
-                query=query,
-                limit=limit
-            )
+            results = await self.search(query, limit, project, mode)
             
             return [
                 {
-                    "content": doc.content,
-                    "title": doc.meta_data["title"],
-                    "url": doc.meta_data["url"],
-                    "score": doc.meta_data.get("score", 0.0)
+                    "content": result["content"],
+                    "title": result["meta_data"]["title"],
+                    "url": result["meta_data"]["url"],
+                    "score": result["score"]
                 }
-                for doc in results
+                for result in results
             ]
         except Exception as e:
             logger.error(f"Error searching chunks: {str(e)}")
             return []
 
-    def query_docs(self, query: str) -> Dict:
-        """Main method to query documents and get a response"""
+    async def _retrieve(
+        self,
+        query: str,
+        num_documents: Optional[int] = None,
+        project: Optional[str] = None,
+        question: Optional[str] = None,
+        question_embedding: Optional[List[float]] = None,
+        **kwargs
+    ) -> Optional[List[Dict]]:
+        """Agent retriever that keeps knowledge search fully async.
+
+        Agno's own Qdrant search embeds the query synchronously on the event loop,
+        so the agent is given this retriever instead. Results use the same dict
+        shape as ``Document.to_dict`` so sources are extracted as before.
+
+        The user's ``question`` was embedded and admitted before the run, so its
+        embedding is reused when the model searches for it verbatim. Agno
+        swallows errors raised here, so when embedding a rephrased search is
+        rejected, the question is searched instead of answering without context.
+        """
+        limit = num_documents or settings.CONTEXT_MAX_CHUNKS
+        embedding = question_embedding if query == question else None
         try:
-            # Use Agno to generate response
-            response = self.agent.run(
-                query,
-                stream=False
-            )
-            
-            # Extract sources from the response metadata
-            sources = []
-            if hasattr(response, 'extra_data') and hasattr(response.extra_data, 'references'):
-                for ref in response.extra_data.references:
-                    for source in ref.references:
-                        sources.append({
-                            "title": source["meta_data"]["title"],
-                            "url": source["meta_data"]["url"],
-                            "content": source["content"][:200] + "..." if len(source["content"]) > 200 else source["content"]
-                        })
-            
-            # Create a structured response for the frontend
-            return {
-                "status": "success",
-                "data": {
-                    "answer": str(response.content) if hasattr(response, 'content') else str(response),
-                    "sources": sources,
-                    "metadata": {
-                        "model": response.model if hasattr(response, 'model') else None,
-                        "run_id": response.run_id if hasattr(response, 'run_id') else None
-                    }
-                }
+            results = await self.search(query, limit, project, embedding=embedding)
+        except AdmissionRejected:
+            if question_embedding is None or embedding is not None:
+                raise
+            logger.warning(f"Embedding the search {query!r} was rejected, searching for the question instead")
+            results = await self.search(question, limit, project, embedding=question_embedding)
+        # Fewer, better chunks: every token here is sent to the model on each turn
+        results = trim_to_budget(results, settings.CONTEXT_TOKEN_BUDGET)
+        if not results:
+            return None
+        return [
+            {
+                "name": result["name"],
+                "meta_data": result["meta_data"],
+                "content": result["content"]
             }
-        except Exception as e:
-            logger.error(f"Error processing query: {str(e)}")
-            return {
-                "status": "error",
-                "data": {
-                    "answer": "I encountered an error while processing your query.",
-                    "sources": [],
-                    "metadata": {},
-                    "error": str(e)
+            for result in results
+        ]
+
+    @staticmethod
+    def _format_response(response, answer: Optional[str] = None) -> Dict:
+        """Build the structured response for the frontend from an Agno run response"""
+        # Extract sources from the response metadata
+        sources = []
+        if hasattr(response, 'extra_data') and getattr(response.extra_data, 'references', None):
+            for ref in response.extra_data.references:
+                for source in ref.references:
+                    sources.append({
+                        "title": source["meta_data"]["title"],
+                        "url": source["meta_data"]["url"],
+                        "content": source["content"][:200] + "..." if len(source["content"]) > 200 else source["content"]
+                    })
+        
+        if answer is None:
+            answer = str(response.content) if hasattr(response, 'content') else str(response)
+        
+        return {
+            "status": "success",
+            "data": {
+                "answer": answer,
+                "sources": sources,
+                "metadata": {
+                    "model": response.model if hasattr(response, 'model') else None,
+                    "run_id": response.run_id if hasattr(response, 'run_id') else None
                 }
-            } 
\ No newline at end of file
+            }
+        }
+
+    @staticmethod
+    def _count_tokens(metrics: Optional[Dict]) -> None:
+        """Add the model's token usage of a run, summed over its messages, to the metrics"""
+        for key, kind in (("input_tokens", "prompt"), ("output_tokens", "completion")):
+            values = (metrics or {}).get(key) or []
+            TOKENS.inc(sum(values), kind=kind)
+
+    @staticmethod
+    def _with_trace(result: Dict, trace: Optional[Trace]) -> Dict:
+        """Copy of a response with the request's spans in its metadata; cached responses stay untouched"""
+        if trace is None:
+            return result
+        metadata = {**result["data"].get("metadata", {}), "trace": trace.to_list()}
+        return {**result, "data": {**result["data"], "metadata": metadata}}
+
+    @staticmethod
+    def _error_response(error: Exception) -> Dict:
+        return {
+            "status": "error",
+            "data": {
+                "answer": "I encountered an error while processing your query.",
+                "sources": [],
+                "metadata": {},
+                "error": str(error)
+            }
+        }
+
+    async def _prepare_query(
+        self,
+        query: str,
+        project: Optional[str],
+        use_cache: bool
+    ) -> Tuple[Optional[Dict], Optional[List[float]]]:
+        """Look the query up in the answer cache and embed it, before any agent runs.
+
+        Returns the cached response, if any, and the query embedding, which is
+        used for the near-duplicate lookup, stored with a fresh answer and
+        passed to the retriever. Embedding here, on every path that runs the
+        agent, means an ``AdmissionRejected`` reaches the caller; inside the
+        retriever agno would swallow it and answer without context.
+        """
+        caching = use_cache and self.answer_cache is not None
+        if caching:
+            with span("query", "answer_cache"):
+                cached = self.answer_cache.get(query, project)
+            if cached is not None:
+                return cached, None
+        
+        # Only a sparse-only search without the answer cache does without a vector
+        if not caching and self.retrieval_mode == "sparse" and self.lexical_index is not None:
+            return None, None
+        with span("query", "embed"):
+            embedding = await self._embed_query(query)
+        if not caching:
+            return None, embedding
+        with span("query", "answer_cache"):
+            return self.answer_cache.get_similar(embedding, project), embedding
+
+    def _history(self, session_id: Optional[str]) -> Tuple[str, List[Turn]]:
+        if session_id is None or self.conversation_store is None:
+            return "", []
+        return self.conversation_store.history(session_id)
+
+    def _remember(self, session_id: Optional[str], query: str, answer: str) -> None:
+        if session_id is not None and self.conversation_store is not None:
+            summarizer = self._summarize if self.async_openai_client is not None else None
+            self.conversation_store.append(session_id, query, answer, summarizer)
+
+    async def _embed_query(self, query: str) -> List[float]:
+        """Embed a query, waiting for admission only when it is actually sent to the API"""
+        if self.admission is None or settings.EMBEDDER_BACKEND != "openai":
+            return await run_blocking(self.embedder.get_embedding, query)
+        if not isinstance(self.embedder, CachedEmbedder):
+            await self.admission.acquire(Priority.INTERACTIVE, estimate_tokens(query))
+            return await run_blocking(self.embedder.get_embedding, query)
+
+        # A repeated query is served from the cache without waiting for admission
+        embedding = await run_blocking(self.embedder.cached_embedding, query)
+        if embedding is not None:
+            return embedding
+        await self.admission.acquire(Priority.INTERACTIVE, estimate_tokens(query))
+        return await run_blocking(self.embedder.embed_uncached, query)
+
+    async def _summarize(self, summary: str, turns: List[Turn]) -> str:
+        """Fold conversation turns into the running summary with a small model"""
+        transcript = "\n\n".join(f"User: {turn.query}\nAssistant: {turn.answer}" for turn in turns)
+        if self.admission is not None:
+            # Nobody waits on it, so it queues behind chat like ingestion
+            tokens = estimate_tokens(summary) + estimate_tokens(transcript) + settings.CONVERSATION_SUMMARY_TOKENS
+            await self.admission.acquire(Priority.BULK, tokens)
+        response = await self.async_openai_client.chat.completions.create(
+            model=settings.CONVERSATION_SUMMARY_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Update the summary of a conversation about software documentation. Keep the "
+                               "user's goals, the projects and facts discussed and open questions. Be terse."
+                },
+                {"role": "user", "content": f"Summary so far:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"}
+            ],
+            max_tokens=settings.CONVERSATION_SUMMARY_TOKENS
+        )
+        if response.usage is not None:
+            TOKENS.inc(response.usage.prompt_tokens, kind="prompt")
+            TOKENS.inc(response.usage.completion_tokens, kind="completion")
+        return response.choices[0].message.content or ""
+
+    async def query_docs(
+        self,
+        query: str,
+        project: Optional[str] = None,
+        trace: bool = False,
+        session_id: Optional[str] = None
+    ) -> Dict:
+        """Main method to query documents and get a response, optionally scoped to one project.
+
+        With a ``session_id`` the question is answered in the context of the
+        session's earlier turns, and the answer cache is only used for a
+        session's first question. With ``trace`` the timed spans of the request
+        are added to the response metadata. Failures are returned as an error
+        response, except ``AdmissionRejected``, which is raised so the API can
+        answer 503 with a retry delay.
+        """
+        with tracing() if trace else nullcontext() as spans:
+            try:
+                project = project_id(project) if project else None
+                summary, turns = self._history(session_id)
+                follow_up = bool(summary or turns)
+                cached, embedding = await self._prepare_query(query, project, use_cache=not follow_up)
+                if cached is not None:
+                    self._remember(session_id, query, cached["data"]["answer"])
+                    return self._with_trace(cached, spans)
+                version = self.answer_cache.version(project) if self.answer_cache else None
+                
+                # Use Agno to generate response without blocking the event loop
+                with span("query", "generate"):
+                    response = await self._create_agent(project, summary, turns, query, embedding).arun(
+                        query,
+                        stream=False
+                    )
+                self._count_tokens(response.metrics)
+                
+                # Create a structured response for the frontend
+                result = self._format_response(response)
+                self._remember(session_id, query, result["data"]["answer"])
+                if self.answer_cache is not None and not follow_up:
+                    self.answer_cache.put(query, result, version, embedding=embedding, project=project)
+                return self._with_trace(result, spans)
+            except AdmissionRejected:
+                raise
+            except Exception as e:
+                logger.error(f"Error processing query: {str(e)}")
+                return self._with_trace(self._error_response(e), spans)
+
+    async def stream_query_docs(
+        self,
+        query: str,
+        project: Optional[str] = None,
+        trace: bool = False,
+        session_id: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """Stream the answer to a query as ``(event, data)`` pairs.
+
+        Yields a ``token`` event for every content delta from the model, then a
+        single ``done`` event carrying the same payload ``query_docs`` returns,
+        including sources and metadata. Failures end the stream with an
+        ``error`` event in the same shape. Cached answers are sent as one token.
+        ``session_id`` and ``trace`` work as in ``query_docs``; the spans are in
+        the final event's metadata.
+        """
+        answer = []
+        with tracing() if trace else nullcontext() as spans:
+            try:
+                project = project_id(project) if project else None
+                summary, turns = self._history(session_id)
+                follow_up = bool(summary or turns)
+                cached, embedding = await self._prepare_query(query, project, use_cache=not follow_up)
+                if cached is not None:
+                    self._remember(session_id, query, cached["data"]["answer"])
+                    yield "token", {"content": cached["data"]["answer"]}
+                    yield "done", self._with_trace(cached, spans)
+                    return
+                version = self.answer_cache.version(project) if self.answer_cache else None
+                
+                agent = self._create_agent(project, summary, turns, query, embedding)
+                with span("query", "generate"):
+                    async for chunk in await agent.arun(query, stream=True):
+                        if chunk.event == RunEvent.run_response.value and isinstance(chunk.content, str) and chunk.content:
+                            answer.append(chunk.content)
+                            yield "token", {"content": chunk.content}
+                self._count_tokens(agent.run_response.metrics)
+                
+                # The agent accumulates the final run response, including references
+                result = self._format_response(agent.run_response, answer="".join(answer))
+                self._remember(session_id, query, result["data"]["answer"])
+                if self.answer_cache is not None and not follow_up:
+                    self.answer_cache.put(query, result, version, embedding=embedding, project=project)
+                yield "done", self._with_trace(result, spans)
+            except Exception as e:
+                logger.error(f"Error streaming query: {str(e)}")
+                yield "error", self._with_trace(self._error_response(e), spans)
@@ -0,0 +1,281 @@
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+from app.core.config import settings
+from app.core.tokens import estimate_tokens
+
+FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})(.*)$")
+ATX_HEADING_RE = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+SETEXT_UNDERLINE_RE = re.compile(r"^ {0,3}(=+|-+)[ \t]*$")
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Separators tried in order when a block has to be split: lines, sentences, words
+SPLITTERS = [("\n", re.compile(r"\n")), (" ", SENTENCE_END_RE), (" ", re.compile(r"\s+"))]
+
+@dataclass
+class Block:
+    kind: str  # "text" or "code"
+    text: str
+    tokens: int
+
+@dataclass
+class Chunk:
+    title: str
+    heading_path: List[str]
+    content: str
+    tokens: int
+
+@dataclass
+class _ChunkState:
+    heading_path: List[str] = field(default_factory=list)
+    blocks: List[Block] = field(default_factory=list)
+    tokens: int = 0
+    fresh: int = 0  # Blocks not carried over as overlap from the previous chunk
+
+class MarkdownChunker:
+    """Splits markdown into token-bounded chunks directly from its block structure.
+
+    Lines are lexed into blocks (paragraphs, lists, tables, fenced code) and
+    headings. Blocks are packed into chunks of up to ``target_tokens``, a chunk
+    never spans two sections, and consecutive chunks of a section share up to
+    ``overlap_tokens`` of trailing prose. Blocks larger than ``max_tokens`` are
+    split on lines, sentences or words; oversized code fences are split into
+    several complete fences so every chunk stays valid markdown. A section smaller than
+    ``min_tokens`` absorbs its first subsection instead of becoming its own chunk.
+
+    The chunker is incremental: ``feed`` accepts arbitrary pieces of text and
+    returns the chunks completed so far, ``close`` flushes the rest.
+    """
+
+    def __init__(
+        self,
+        target_tokens: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None,
+        min_tokens: Optional[int] = None,
+    ):
+        self.target_tokens = target_tokens or settings.CHUNK_TARGET_TOKENS
+        self.max_tokens = max(max_tokens or settings.CHUNK_MAX_TOKENS, self.target_tokens)
+        self.overlap_tokens = settings.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+        self.min_tokens = settings.CHUNK_MIN_TOKENS if min_tokens is None else min_tokens
+
+        self._pending = ""
+        self._lines: List[str] = []
+        self._fence: Optional[str] = None
+        self._code: List[str] = []
+        self._path: List[Tuple[int, str]] = []
+        self._chunk = _ChunkState()
+        self._out: List[Chunk] = []
+
+    def chunk(self, text: str) -> List[Chunk]:
+        """Chunk a complete document"""
+        return self.feed(text) + self.close()
+
+    def feed(self, text: str) -> List[Chunk]:
+        """Consume more text and return any chunks that are complete"""
+        lines = (self._pending + text).split("\n")
+        self._pending = lines.pop()
+        for line in lines:
+            self._line(line.rstrip("\r"))
+        return self._take()
+
+    def close(self) -> List[Chunk]:
+        """Flush the remaining input and return the final chunks"""
+        if self._pending:
+            self._line(self._pending.rstrip("\r"))
+            self._pending = ""
+        if self._fence is not None:
+            # Unterminated fence: close it so the chunk stays valid markdown
+            self._code.append(self._fence)
+            self._end_code()
+        self._end_text()
+        self._flush(overlap=False)
+        return self._take()
+
+    def _take(self) -> List[Chunk]:
+        out, self._out = self._out, []
+        return out
+
+    # Lexing
+
+    def _line(self, line: str) -> None:
+        if self._fence is not None:
+            self._code.append(line)
+            match = FENCE_RE.match(line)
+            if (
+                match
+                and match.group(1)[0] == self._fence[0]
+                and len(match.group(1)) >= len(self._fence)
+                and not match.group(2).strip()
+            ):
+                self._end_code()
+            return
+
+        match = FENCE_RE.match(line)
+        # A backtick fence's info string cannot contain backticks
+        if match and not (match.group(1)[0] == "`" and "`" in match.group(2)):
+            self._end_text()
+            self._fence = match.group(1)
+            self._code = [line]
+            return
+
+        if not line.strip():
+            self._end_text()
+            return
+
+        match = ATX_HEADING_RE.match(line)
+        if match:
+            self._end_text()
+            self._heading(len(match.group(1)), (match.group(2) or "").strip())
+            return
+
+        match = SETEXT_UNDERLINE_RE.match(line)
+        if match:
+            if len(self._lines) == 1:
+                text = self._lines.pop().strip()
+                self._heading(1 if match.group(1)[0] == "=" else 2, text)
+                return
+            if not self._lines and match.group(1)[0] == "-":
+                # Thematic break
+                return
+
+        self._lines.append(line)
+
+    def _end_text(self) -> None:
+        if self._lines:
+            text = "\n".join(self._lines)
+            self._lines = []
+            self._add_block(Block("text", text, estimate_tokens(text)))
+
+    def _end_code(self) -> None:
+        text = "\n".join(self._code)
+        self._code = []
+        self._fence = None
+        self._add_block(Block("code", text, estimate_tokens(text)))
+
+    # Chunk assembly
+
+    def _heading(self, level: int, text: str) -> None:
+        chunk = self._chunk
+        nested = bool(self._path) and level > self._path[-1][0]
+        while self._path and self._path[-1][0] >= level:
+            self._path.pop()
+        self._path.append((level, text))
+
+        if chunk.fresh and chunk.tokens < self.min_tokens and nested:
+            # Too small to stand alone: keep the parent's chunk and inline the heading
+            heading = f"{'#' * level} {text}"
+            self._add_block(Block("text", heading, estimate_tokens(heading)))
+            return
+
+        self._flush(overlap=False)
+
+    def _add_block(self, block: Block) -> None:
+        if block.tokens > self.max_tokens:
+            for piece in self._split_block(block):
+                self._add_block(piece)
+            return
+
+        chunk = self._chunk
+        total = chunk.tokens + block.tokens
+        # A chunk below min_tokens may grow past the target rather than stand alone
+        if chunk.fresh and total > self.target_tokens and (chunk.tokens >= self.min_tokens or total > self.max_tokens):
+            self._flush(overlap=True)
+            chunk = self._chunk
+            if chunk.tokens + block.tokens > self.max_tokens:
+                chunk.blocks, chunk.tokens = [], 0
+        chunk.blocks.append(block)
+        chunk.tokens += block.tokens
+        chunk.fresh += 1
+
+    def _flush(self, overlap: bool) -> None:
+        chunk = self._chunk
+        if chunk.fresh:
+            body = "\n\n".join(block.text for block in chunk.blocks)
+            breadcrumb = " > ".join(title for title in chunk.heading_path if title)
+            content = f"{breadcrumb}\n\n{body}" if breadcrumb else body
+            self._out.append(Chunk(
+                title=chunk.heading_path[-1] if chunk.heading_path else "",
+                heading_path=list(chunk.heading_path),
+                content=content,
+                tokens=chunk.tokens,
+            ))
+
+        carried = self._overlap(chunk.blocks) if overlap and chunk.fresh else []
+        self._chunk = _ChunkState(
+            heading_path=[title for _, title in self._path],
+            blocks=carried,
+            tokens=sum(block.tokens for block in carried),
+        )
+
+    def _overlap(self, blocks: List[Block]) -> List[Block]:
+        """Trailing prose of a chunk, at most ``overlap_tokens``, to repeat in the next one"""
+        if self.overlap_tokens <= 0:
+            return []
+        carried: List[Block] = []
+        budget = self.overlap_tokens
+        for block in reversed(blocks):
+            if block.kind != "text":
+                break
+            if block.tokens <= budget:
+                carried.insert(0, block)
+                budget -= block.tokens
+                continue
+            # Take the last sentences of a block that does not fit whole
+            tail: List[str] = []
+            for sentence in reversed(SENTENCE_END_RE.split(block.text)):
+                tokens = estimate_tokens(sentence)
+                if tokens > budget:
+                    break
+                tail.insert(0, sentence)
+                budget -= tokens
+            if tail:
+                text = " ".join(tail)
+                carried.insert(0, Block("text", text, estimate_tokens(text)))
+            break
+        return carried
+
+    def _split_block(self, block: Block) -> List[Block]:
+        """Split an oversized block into pieces of at most ``target_tokens``"""
+        if block.kind == "code":
+            lines = block.text.split("\n")
+            opening = lines[0]
+            closing = lines[-1] if len(lines) > 1 else FENCE_RE.match(opening).group(1)
+            fence_tokens = estimate_tokens(opening) + estimate_tokens(closing)
+            return [
+                Block("code", f"{opening}\n{piece}\n{closing}", tokens + fence_tokens)
+                for piece, tokens in self._split_text("\n".join(lines[1:-1]), self.target_tokens - fence_tokens)
+            ]
+        return [Block("text", piece, tokens) for piece, tokens in self._split_text(block.text, self.target_tokens)]
+
+    def _split_text(self, text: str, budget: int, level: int = 0) -> List[Tuple[str, int]]:
+        """Greedily pack lines, then sentences, then words into pieces of at most ``budget`` tokens"""
+        budget = max(budget, 1)
+        if level == len(SPLITTERS):
+            step = max(1, len(text) * budget // estimate_tokens(text))
+            return [self._piece(text[i:i + step]) for i in range(0, len(text), step)]
+
+        separator, pattern = SPLITTERS[level]
+        pieces: List[Tuple[str, int]] = []
+        current: List[str] = []
+        current_tokens = 0
+        for part in pattern.split(text):
+            # Blank lines are kept so code keeps its layout
+            if level and not part.strip():
+                continue
+            tokens = estimate_tokens(part)
+            if current and (tokens > budget or current_tokens + tokens > budget):
+                pieces.append(self._piece(separator.join(current)))
+                current, current_tokens = [], 0
+            if tokens > budget:
+                pieces.extend(self._split_text(part, budget, level + 1))
+                continue
+            current.append(part)
+            current_tokens += tokens
+        if current:
+            pieces.append(self._piece(separator.join(current)))
+        return pieces
+
+    @staticmethod
+    def _piece(text: str) -> Tuple[str, int]:
+        return text, estimate_tokens(text)
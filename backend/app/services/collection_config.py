@@ -0,0 +1,140 @@
+import logging
+from typing import Dict, Optional
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("none", "scalar", "binary")
+
+def vectors_config(dimensions: int) -> models.VectorParams:
+    # Same unnamed cosine vector agno creates, so its reads keep working
+    return models.VectorParams(
+        size=dimensions,
+        distance=models.Distance.COSINE,
+        on_disk=settings.QDRANT_ON_DISK_VECTORS
+    )
+
+def hnsw_config() -> models.HnswConfigDiff:
+    return models.HnswConfigDiff(
+        m=settings.QDRANT_HNSW_M,
+        ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+        on_disk=settings.QDRANT_HNSW_ON_DISK
+    )
+
+def quantization_config() -> Optional[models.QuantizationConfig]:
+    """Quantized copy of the vectors used for the first pass of every search"""
+    mode = settings.QDRANT_QUANTIZATION
+    if mode == "none":
+        return None
+    if mode == "scalar":
+        # int8 per component: 4x smaller, small recall loss
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM
+            )
+        )
+    if mode == "binary":
+        # One bit per component: 32x smaller, needs rescoring to keep recall
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM)
+        )
+    raise ValueError(f"Unknown quantization mode: {mode}, expected one of {QUANTIZATION_MODES}")
+
+def search_params() -> Optional[models.SearchParams]:
+    """Search-time HNSW ef and quantization rescoring, or None to use Qdrant's defaults"""
+    quantization = None
+    if settings.QDRANT_QUANTIZATION != "none":
+        quantization = models.QuantizationSearchParams(
+            rescore=settings.QDRANT_RESCORE,
+            oversampling=settings.QDRANT_OVERSAMPLING
+        )
+    if quantization is None and settings.QDRANT_SEARCH_EF is None:
+        return None
+    return models.SearchParams(hnsw_ef=settings.QDRANT_SEARCH_EF, quantization=quantization)
+
+def collection_options(dimensions: int) -> Dict:
+    return {
+        "vectors_config": vectors_config(dimensions),
+        "hnsw_config": hnsw_config(),
+        "quantization_config": quantization_config(),
+    }
+
+def create_collection(client: QdrantClient, name: str, dimensions: int) -> None:
+    client.create_collection(collection_name=name, **collection_options(dimensions))
+
+def _quantization_mode(config) -> str:
+    if isinstance(config, models.ScalarQuantization):
+        return "scalar"
+    if isinstance(config, models.BinaryQuantization):
+        return "binary"
+    return "none"
+
+def _changes(config) -> Dict:
+    """Updates that bring an existing collection's config in line with the settings"""
+    current_vectors = config.params.vectors
+    changes: Dict = {}
+
+    if bool(getattr(current_vectors, "on_disk", False)) != settings.QDRANT_ON_DISK_VECTORS:
+        changes["vectors_config"] = {"": models.VectorParamsDiff(on_disk=settings.QDRANT_ON_DISK_VECTORS)}
+    hnsw = config.hnsw_config
+    if (
+        hnsw.m != settings.QDRANT_HNSW_M
+        or hnsw.ef_construct != settings.QDRANT_HNSW_EF_CONSTRUCT
+        or bool(hnsw.on_disk) != settings.QDRANT_HNSW_ON_DISK
+    ):
+        changes["hnsw_config"] = hnsw_config()
+    if _quantization_mode(config.quantization_config) != settings.QDRANT_QUANTIZATION:
+        changes["quantization_config"] = quantization_config() or models.Disabled.DISABLED
+    return changes
+
+async def reconcile_collection(client: AsyncQdrantClient, name: str, config) -> bool:
+    """Apply the configured storage, HNSW and quantization settings to an existing collection.
+
+    Returns True if anything was changed; Qdrant then rebuilds the affected
+    index segments in the background. Vector size cannot be changed in place.
+    """
+    changes = _changes(config)
+    if not changes:
+        return False
+    logger.info(f"Updating collection {name}: {', '.join(changes)}")
+    await client.update_collection(collection_name=name, **changes)
+    return True
+
+async def ensure_collection(client: AsyncQdrantClient, name: str, dimensions: int) -> None:
+    """Create the collection, or check and update an existing one, and index the filtered fields.
+
+    Fails if the collection holds vectors of another size. Safe to run
+    repeatedly and from several services: every step is idempotent.
+    """
+    if not await client.collection_exists(name):
+        logger.info(f"Creating collection: {name}")
+        await client.create_collection(collection_name=name, **collection_options(dimensions))
+    else:
+        config = (await client.get_collection(name)).config
+        size = getattr(config.params.vectors, "size", None)
+        if size is not None and size != dimensions:
+            raise ValueError(
+                f"Collection {name} stores {size}-dimensional vectors but the "
+                f"{settings.EMBEDDER_BACKEND} embedder produces {dimensions}; "
+                f"set EMBEDDING_DIMENSIONS or use another QDRANT_COLLECTION_NAME"
+            )
+        await reconcile_collection(client, name, config)
+
+    # Without an index every filtered query scans the payloads of the whole
+    # collection. The project index is marked as a tenant key so Qdrant keeps
+    # each project's points together and searches only that project's slice.
+    # Creating an index that already exists is a no-op.
+    await client.create_payload_index(
+        collection_name=name,
+        field_name="meta_data.url",
+        field_schema=models.PayloadSchemaType.KEYWORD
+    )
+    await client.create_payload_index(
+        collection_name=name,
+        field_name="meta_data.project",
+        field_schema=models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True)
+    )
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from app.core.tokens import estimate_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class Turn:
+    query: str
+    answer: str
+    tokens: int
+
+# (summary so far, turns that left the window) -> new summary
+Summarizer = Callable[[str, List[Turn]], Awaitable[str]]
+
+@dataclass
+class Session:
+    turns: Deque[Turn] = field(default_factory=deque)
+    window_tokens: int = 0
+    summary: str = ""
+    # Turns that left the window and are waiting to be folded into the summary
+    overflow: List[Turn] = field(default_factory=list)
+    last_used: float = field(default_factory=time.monotonic)
+    task: Optional[asyncio.Task] = None
+
+def extractive_summary(summary: str, turns: List[Turn], max_tokens: int) -> str:
+    """Summary without a model: the questions asked, most recent kept when over budget"""
+    lines = [summary] if summary else []
+    lines += [f"- Asked: {truncate_tokens(' '.join(turn.query.split()), 60)}" for turn in turns]
+    text = "\n".join(lines)
+    while estimate_tokens(text) > max_tokens and len(lines) > 1:
+        lines.pop(0)
+        text = "\n".join(lines)
+    return truncate_tokens(text, max_tokens)
+
+class ConversationStore:
+    """Per-session chat history with a bounded prompt footprint.
+
+    Each session keeps its latest turns while they fit in ``window_tokens``.
+    Older turns are folded into a running summary of at most
+    ``summary_tokens`` by a background task, so answering never waits on
+    summarization and the history sent with each turn stays within
+    ``window_tokens + summary_tokens`` however long the conversation runs.
+    Sessions are kept in LRU order; idle ones expire after ``ttl`` seconds
+    and the least recently used are evicted beyond ``max_sessions``.
+    Used from the event loop only.
+    """
+
+    def __init__(self, max_sessions: int, ttl: float, window_tokens: int, summary_tokens: int):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.window_tokens = window_tokens
+        self.summary_tokens = summary_tokens
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.evicted = 0
+        self.summaries = 0
+
+    def _evict(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id)
+        if session.task is not None:
+            session.task.cancel()
+        self.evicted += 1
+
+    def _prune(self) -> None:
+        # LRU order puts the longest idle sessions first
+        deadline = time.monotonic() - self.ttl
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used >= deadline and len(self._sessions) <= self.max_sessions:
+                break
+            self._evict(session_id)
+
+    def _session(self, session_id: str, create: bool) -> Optional[Session]:
+        self._prune()
+        session = self._sessions.get(session_id)
+        if session is None:
+            if not create:
+                return None
+            session = self._sessions[session_id] = Session()
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def history(self, session_id: str) -> Tuple[str, List[Turn]]:
+        """The summary of earlier turns and the turns in the window, oldest first"""
+        session = self._session(session_id, create=False)
+        if session is None:
+            return "", []
+        return session.summary, list(session.turns)
+
+    def append(self, session_id: str, query: str, answer: str, summarizer: Optional[Summarizer] = None) -> None:
+        """Add a turn; turns pushed out of the window are summarized in the background"""
+        session = self._session(session_id, create=True)
+        # A single turn never takes more than the whole window
+        answer = truncate_tokens(answer, max(0, self.window_tokens - estimate_tokens(query)))
+        turn = Turn(query, answer, estimate_tokens(query) + estimate_tokens(answer))
+        session.turns.append(turn)
+        session.window_tokens += turn.tokens
+        while session.window_tokens > self.window_tokens and len(session.turns) > 1:
+            old = session.turns.popleft()
+            session.window_tokens -= old.tokens
+            session.overflow.append(old)
+        self._prune()
+
+        if session.overflow and session.task is None:
+            session.task = asyncio.create_task(self._summarize(session, summarizer))
+
+    async def _summarize(self, session: Session, summarizer: Optional[Summarizer]) -> None:
+        try:
+            # Turns that overflow while a summary is being written are picked up by the next round
+            while session.overflow:
+                turns, session.overflow = session.overflow, []
+                summary = None
+                if summarizer is not None:
+                    try:
+                        summary = await summarizer(session.summary, turns)
+                    except Exception as e:
+                        logger.warning(f"Summarizing conversation failed, keeping an extractive summary: {e}")
+                if not summary:
+                    summary = extractive_summary(session.summary, turns, self.summary_tokens)
+                session.summary = truncate_tokens(summary.strip(), self.summary_tokens)
+                self.summaries += 1
+        finally:
+            session.task = None
+
+    def stats(self) -> Dict:
+        return {
+            "sessions": len(self._sessions),
+            "evicted": self.evicted,
+            "summaries": self.summaries,
+        }
+
+    async def aclose(self) -> None:
+        """Cancel summaries that are still being written"""
+        tasks = [session.task for session in self._sessions.values() if session.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._sessions.clear()
@@ -1,43 +1,83 @@
-import requests
-from typing import List, Dict, Optional
-from bs4 import BeautifulSoup
-import markdown
-from qdrant_client import QdrantClient
-from qdrant_client.http import models
+from contextlib import AsyncExitStack, nullcontext
+from typing import AsyncContextManager, AsyncIterable, AsyncIterator, Callable, List, Dict, Optional, Set
+from openai import AsyncOpenAI, OpenAI
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from app.core.config import settings
+from app.core.executor import get_process_pool, process_pool_workers, run_blocking
+from app.core.metrics import SECTIONS, span
+from app.models.project import project_id
+import asyncio
 import logging
-import uuid
-from agno.agent import Agent
-from agno.models.openai import OpenAIChat
+import re
+import tempfile
+import time
+from pathlib import Path
 from agno.vectordb.qdrant import Qdrant
-from agno.embedder.openai import OpenAIEmbedder
 from agno.document import Document
-import aiohttp
+from app.services.admission import AdmissionController
+from app.services.answer_cache import AnswerCache
+from app.services.chunker import Chunk, MarkdownChunker
+from app.services.collection_config import ensure_collection
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedders import create_embedder
+from app.services.http_fetcher import FetchError, HttpFetcher, create_fetcher
+from app.services.repo_crawler import (
+    CrawlResult,
+    RepoFile,
+    chunk_options,
+    discover,
+    extract_archive,
+    parse_file
+)
+from app.services.lexical_index import LexicalIndex
+from app.services.upload_store import StoredUpload, UploadStore
+from app.services.ingest_pipeline import (
+    EmbeddingPipeline,
+    IngestStats,
+    fingerprint_point_id,
+    section_fingerprint
+)
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+async def _with_end(pieces: AsyncIterable[str]) -> AsyncIterator[Optional[str]]:
+    """The pieces followed by None, so a consumer can flush at the end of the stream"""
+    async for piece in pieces:
+        yield piece
+    yield None
+
 class DocumentService:
-    def __init__(self, api_key = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        openai_client: Optional[OpenAI] = None,
+        async_openai_client: Optional[AsyncOpenAI] = None,
+        qdrant_client: Optional[QdrantClient] = None,
+        async_qdrant_client: Optional[AsyncQdrantClient] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        answer_cache: Optional[AnswerCache] = None,
+        lexical_index: Optional[LexicalIndex] = None,
+        fetcher: Optional[HttpFetcher] = None,
+        admission: Optional[AdmissionController] = None
+    ):
+        """Pre-built clients may be passed in so connections are shared across services.
+
+        Without a ``fetcher`` the service creates its own, with the configured
+        HTTP cache, and ``aclose`` closes it.
+        """
         try:
 
-            api_key = settings.OPENAI_API_KEY
+            api_key = api_key or settings.OPENAI_API_KEY
+            self.answer_cache = answer_cache
+            self.lexical_index = lexical_index
+            self._owns_fetcher = fetcher is None
+            self.fetcher = fetcher or create_fetcher()
 
-            # Initialize OpenAI model for the agent
-            self.model = OpenAIChat(
-                api_key=api_key,
-                id="gpt-4-turbo-preview"
-            )
-            
-            # Initialize embedder
-            self.embedder = OpenAIEmbedder(
-                api_key=api_key,
-                id="text-embedding-3-small", 
-                dimensions=1536
-            )
+            # Initialize embedder (backend chosen in settings)
+            self.embedder = create_embedder(api_key, openai_client, embedding_cache)
             
             # Initialize Qdrant client
-            self.qdrant_client = QdrantClient(url=settings.QDRANT_URL)
+            self.qdrant_client = qdrant_client or QdrantClient(url=settings.QDRANT_URL)
             
             # Initialize Agno vector store
             self.vector_db = Qdrant(
@@ -45,145 +85,491 @@ class DocumentService:
                 embedder=self.embedder,
                 url=settings.QDRANT_URL
             )
+            # Reuse the pooled clients instead of letting agno open its own
+            self.vector_db._client = self.qdrant_client
+            if async_qdrant_client is not None:
+                self.vector_db._async_client = async_qdrant_client
             
-            # Ensure collection exists
-            self._ensure_collection()
+            # Checked on first write rather than here, so building a service never waits on Qdrant
+            self._collection_ready = False
+            self._collection_lock = asyncio.Lock()
+            
+            # Batched embedding and bulk upsert pipeline
+            self.pipeline = EmbeddingPipeline(
+                embedder=self.embedder,
+                client=self.vector_db.async_client,
+                collection=settings.QDRANT_COLLECTION_NAME,
+                # Local embeddings make no API calls to limit
+                admission=admission if settings.EMBEDDER_BACKEND == "openai" else None
+            )
             
         except Exception as e:
             logger.error(f"Failed to initialize services: {e}")
             raise
 
-    def _ensure_collection(self):
-        """Ensure the Qdrant collection exists with proper configuration"""
+    async def aclose(self) -> None:
+        """Close the fetcher if this service created it; shared clients are left to their owner"""
+        if self._owns_fetcher:
+            await self.fetcher.aclose()
+
+    async def ensure_collection(self) -> None:
+        """Create or check the Qdrant collection, once, before the first write"""
+        async with self._collection_lock:
+            if self._collection_ready:
+                return
+            await ensure_collection(
+                self.vector_db.async_client, settings.QDRANT_COLLECTION_NAME, self.embedder.dimensions
+            )
+            self._collection_ready = True
+
+    @staticmethod
+    def get_raw_url(url: str) -> str:
+        """Convert a GitHub blob URL to its raw content URL"""
+        # Example: https://github.com/username/repo/blob/main/README.md
+        # to: https://raw.githubusercontent.com/username/repo/main/README.md
+        url_parts = url.split('/')
+        if 'github.com' not in url_parts:
+            raise ValueError(f"Not a GitHub URL: {url}")
+        # Get the parts after github.com
+        path_parts = url_parts[url_parts.index('github.com') + 1:]
+        # Remove 'blob' if it exists
+        if 'blob' in path_parts:
+            path_parts.remove('blob')
+        return f"{settings.GITHUB_RAW_BASE_URL.rstrip('/')}/{'/'.join(path_parts)}"
+
+    @staticmethod
+    def _document(url: str, project: str, index: int, chunk: Chunk, doc_type: str = "markdown") -> Document:
+        content_hash = section_fingerprint(url, chunk.title, chunk.content, project)
+        return Document(
+            id=fingerprint_point_id(content_hash),
+            name=f"section_{index}",
+            content=chunk.content,
+            meta_data={
+                "url": url,
+                "project": project,
+                "title": chunk.title,
+                "heading_path": chunk.heading_path,
+                "type": doc_type,
+                "content_hash": content_hash
+            }
+        )
+
+    @staticmethod
+    async def _chunk_pieces(pieces: AsyncIterable[str], stats: IngestStats) -> AsyncIterator[List[Chunk]]:
+        """Chunk text pieces as they arrive"""
+        chunker = MarkdownChunker()
+        async for piece in _with_end(pieces):
+            with stats.stage("parse") as parse_stage:
+                chunks = chunker.close() if piece is None else chunker.feed(piece)
+                parse_stage.count += len(chunks)
+            yield chunks
+
+    async def _documents(
+        self,
+        url: str,
+        project: str,
+        chunk_lists: AsyncIterable[List[Chunk]],
+        doc_type: str,
+        seen: Set[str],
+        stats: IngestStats
+    ) -> AsyncIterator[Document]:
+        """Yield a document per chunk as chunks arrive.
+
+        The lexical index is filled in batches along the way; the ids of all
+        yielded documents are collected in ``seen`` so it can be pruned afterwards.
+        """
+        indexed: List[Document] = []
+        index = 0
+        async for chunks in _with_end(chunk_lists):
+            done = chunks is None
+            for chunk in chunks or []:
+                document = self._document(url, project, index, chunk, doc_type)
+                index += 1
+                seen.add(document.id)
+                if self.lexical_index is not None:
+                    indexed.append(document)
+                yield document
+
+            if indexed and (done or len(indexed) >= self.pipeline.batch_size):
+                with stats.stage("lexical_index", count=len(indexed)):
+                    await run_blocking(self.lexical_index.add, url, indexed)
+                indexed = []
+
+    async def store_document(self, url: str, content: str, project: Optional[str] = None) -> Dict:
+        """Store processed document in Qdrant under ``project``, derived from the URL by default"""
+        async def pieces():
+            yield content
+        return await self.store_document_stream(url, pieces(), project=project)
+
+    async def store_document_stream(
+        self,
+        url: str,
+        pieces: AsyncIterable[str],
+        project: Optional[str] = None
+    ) -> Dict:
+        """Store a document that arrives as text pieces, e.g. from ``HttpFetcher`` while it downloads.
+
+        Chunks are embedded and upserted while later pieces are still being
+        read and parsed, so memory stays bounded by the pipeline's in-flight
+        batches rather than the document size.
+        """
+        stats = IngestStats()
+        return await self._store(url, project, self._chunk_pieces(pieces, stats), "markdown", stats)
+
+    async def store_chunks(
+        self,
+        url: str,
+        chunks: List[Chunk],
+        project: Optional[str] = None,
+        doc_type: str = "markdown",
+        existing: Optional[Dict[str, str]] = None
+    ) -> Dict:
+        """Store a document that was already chunked, e.g. in a worker process.
+
+        ``existing`` are the point ids and fingerprints stored for ``url``, if known.
+        """
+        async def chunk_lists():
+            yield chunks
+        return await self._store(url, project, chunk_lists(), doc_type, IngestStats(), existing)
+
+    async def _store(
+        self,
+        url: str,
+        project: Optional[str],
+        chunk_lists: AsyncIterable[List[Chunk]],
+        doc_type: str,
+        stats: IngestStats,
+        existing: Optional[Dict[str, str]] = None
+    ) -> Dict:
         try:
-            if not self.vector_db.exists():
-                logger.info(f"Creating collection: {settings.QDRANT_COLLECTION_NAME}")
-                self.vector_db.create()
+            await self.ensure_collection()
+            project = project or project_id(url)
+            seen: Set[str] = set()
+            with stats.stage("total"):
+                # Embed and upsert new or changed sections, delete stale ones
+                documents = self._documents(url, project, chunk_lists, doc_type, seen, stats)
+                await self.pipeline.sync_stream(url, documents, stats, existing)
+
+                # Keep the BM25 index in step with the vectors
+                if self.lexical_index is not None:
+                    with stats.stage("lexical_index"):
+                        await run_blocking(self.lexical_index.prune, url, seen)
+
+            # Cached answers may quote sections that just changed
+            changed = stats.unchanged < stats.sections or stats.deleted > 0
+            if self.answer_cache is not None and changed:
+                self.answer_cache.invalidate(project)
+
+            SECTIONS.inc(stats.sections - stats.unchanged, result="embedded")
+            SECTIONS.inc(stats.unchanged, result="unchanged")
+            SECTIONS.inc(stats.deleted, result="deleted")
+            logger.debug(
+                f"Stored document from {url}: {stats.sections} sections, "
+                f"{stats.unchanged} unchanged, {stats.deleted} deleted"
+            )
+            return stats.to_dict()
         except Exception as e:
-            logger.error(f"Failed to ensure collection exists: {e}")
+            logger.error(f"Error storing document: {str(e)}")
+            logger.exception("Full traceback:")
             raise
 
-    async def fetch_github_markdown(self, url: str) -> str:
-        """Fetch markdown content from a GitHub URL."""
-        try:
-            # Convert GitHub URL to raw content URL
-            # Example: https://github.com/username/repo/blob/main/README.md
-            # to: https://raw.githubusercontent.com/username/repo/main/README.md
-            url_parts = url.split('/')
-            if 'github.com' in url_parts:
-                # Find the index of 'github.com'
-                github_index = url_parts.index('github.com')
-                # Get the parts after github.com
-                path_parts = url_parts[github_index + 1:]
-                
-                # Remove 'blob' if it exists
-                if 'blob' in path_parts:
-                    blob_index = path_parts.index('blob')
-                    path_parts.pop(blob_index)  # Remove 'blob'
-                
-                # Construct the raw URL
-                raw_url = f"https://raw.githubusercontent.com/{'/'.join(path_parts)}"
-                logger.info(f"Fetching markdown from: {raw_url}")
-                
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(raw_url) as response:
-                        if response.status == 200:
-                            return await response.text()
-                        else:
-                            logger.error(f"Error fetching markdown: {response.status} {response.reason} for url: {raw_url}")
-                            raise Exception(f"Failed to fetch markdown content: {response.status} {response.reason}")
-        except Exception as e:
-            logger.error(f"Error fetching markdown: {str(e)}")
-            raise Exception(f"Failed to fetch markdown content: {str(e)}")
+    @staticmethod
+    def get_readme_url(repo_url: str) -> str:
+        """Return the README.md blob URL for a GitHub repository URL"""
+        # If the URL already contains 'blob/main/README.md', use it as is
+        if 'blob/main/README.md' in repo_url:
+            return repo_url
+        # Remove trailing slash if present
+        repo_url = repo_url.rstrip('/')
+        # Construct the README URL
+        return f"{repo_url}/blob/main/README.md"
+
+    async def process_github_repo(
+        self,
+        repo_url: str,
+        fetch_limiter: Optional[Callable[[], AsyncContextManager]] = None,
+        force: bool = False
+    ):
+        """Process a GitHub repository's README.md
 
-    def process_markdown(self, content: str) -> List[Dict]:
-        """Process markdown content into chunks for embedding"""
+        ``fetch_limiter`` returns a context that is entered for each request and
+        left as soon as the body has been received, before parsing and embedding.
+        A README that has not changed since it was last processed is skipped
+        unless ``force`` is set.
+        """
         try:
-            # Convert markdown to HTML
-            html = markdown.markdown(content)
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # Split into sections (h1, h2, h3 headers)
-            sections = []
-            current_section = {"title": "", "content": ""}
-            
-            for element in soup.find_all(['h1', 'h2', 'h3', 'p']):
-                if element.name in ['h1', 'h2', 'h3']:
-                    if current_section["content"]:
-                        sections.append(current_section)
-                    current_section = {
-                        "title": element.get_text(),
-                        "content": element.get_text()
-                    }
-                else:
-                    current_section["content"] += "\n" + element.get_text()
-            
-            if current_section["content"]:
-                sections.append(current_section)
-            
-            logger.info(f"Processed markdown into {len(sections)} sections")
-            return sections
+            readme_url = self.get_readme_url(repo_url)
+            project = project_id(repo_url)
+            logger.info(f"Processing GitHub repo: {readme_url}")
+            try:
+                return await self._process_readme(readme_url, project, force, fetch_limiter)
+            except FetchError as e:
+                # The default branch may not be called main
+                fallback = readme_url.replace("/blob/main/", "/blob/HEAD/", 1)
+                if e.status != 404 or fallback == readme_url:
+                    raise
+                logger.info(f"No README on main, trying the default branch: {fallback}")
+                return await self._process_readme(fallback, project, force, fetch_limiter)
         except Exception as e:
-            logger.error(f"Error processing markdown: {e}")
+            logger.error(f"Error processing GitHub repo: {str(e)}")
+            logger.exception("Full traceback:")
             raise
 
-    async def store_document(self, url: str, content: str):
-        """Store processed document in Qdrant"""
+    @staticmethod
+    async def _fetch_slot(fetch_limiter: Optional[Callable[[], AsyncContextManager]]) -> AsyncExitStack:
+        """Enter a fetch limiter slot; ``aclose`` releases it and may be called again"""
+        slot = AsyncExitStack()
+        await slot.enter_async_context(fetch_limiter() if fetch_limiter is not None else nullcontext())
+        return slot
+
+    @staticmethod
+    async def _spooled_pieces(spool) -> AsyncIterator[str]:
+        while True:
+            piece = await run_blocking(spool.read, settings.FETCH_CHUNK_BYTES)
+            if not piece:
+                return
+            yield piece
+
+    async def _process_readme(
+        self,
+        readme_url: str,
+        project: str,
+        force: bool,
+        fetch_limiter: Optional[Callable[[], AsyncContextManager]] = None
+    ):
+        # The body is spooled to disk so the host's fetch slot is not held while it
+        # is parsed and embedded; chunks are still embedded as they are parsed.
+        # The fetch stays open until then, so validators are only kept on success
+        raw_url = self.get_raw_url(readme_url)
+        logger.info(f"Fetching markdown from: {raw_url}")
+        slot = await self._fetch_slot(fetch_limiter)
         try:
-            logger.info("Processing markdown into sections")
-            sections = self.process_markdown(content)
-            logger.info(f"Created {len(sections)} sections")
-            
-            for i, section in enumerate(sections):
-                logger.info(f"Processing section {i+1}/{len(sections)}")
+            async with self.fetcher.get(raw_url, conditional=not force) as response:
+                if response.not_modified:
+                    # The points may have been deleted since, e.g. with the collection
+                    await self.ensure_collection()
+                    if await self.pipeline.existing_fingerprints(readme_url):
+                        logger.info(f"{readme_url} has not changed since it was last processed, skipping")
+                        return {"url": readme_url, "project": project, "stats": None, "not_modified": True}
+                    logger.info(f"{readme_url} has not changed but is not indexed, ingesting the cached copy")
+                spool = await run_blocking(tempfile.TemporaryFile, "w+", encoding="utf-8")
                 try:
-                    logger.info("Storing section in Qdrant")
-                    # Create Agno Document
-                    doc = Document(
-                        name=f"section_{i}",
-                        content=section["content"],
-                        meta_data={
-                            "url": url,
-                            "title": section["title"],
-                            "type": "markdown"
-                        }
+                    async for piece in response.iter_text():
+                        await run_blocking(spool.write, piece)
+                    await slot.aclose()
+                    await run_blocking(spool.seek, 0)
+                    stats = await self.store_document_stream(readme_url, self._spooled_pieces(spool), project=project)
+                finally:
+                    await run_blocking(spool.close)
+        finally:
+            await slot.aclose()
+        await self._remove_other_readmes(readme_url, project)
+        if stats["sections"]:
+            return {"url": readme_url, "project": project, "stats": stats, "not_modified": False}
+        logger.error("Failed to fetch markdown content")
+        return False
+
+    async def _remove_other_readmes(self, readme_url: str, project: str) -> None:
+        """Remove copies of the README stored under another ref, e.g. by a repository crawl of HEAD"""
+        readme = re.compile(rf"https://github\.com/{re.escape(project)}/blob/[^/]+/readme\.md")
+        stored = await self.pipeline.fingerprints_by_url(project)
+        others = [url for url in stored if url != readme_url and readme.fullmatch(url.lower())]
+        await self._remove_urls(project, stored, others)
+
+    async def _is_indexed(self, project: str, url_prefix: str) -> bool:
+        """Whether ``project`` has points stored under ``url_prefix``; a 304 alone does not mean it has"""
+        await self.ensure_collection()
+        stored = await self.pipeline.fingerprints_by_url(project)
+        return any(url.startswith(url_prefix) and points for url, points in stored.items())
+
+    async def process_repository(
+        self,
+        source: str,
+        project: Optional[str] = None,
+        ref: str = "HEAD",
+        fetch_limiter: Optional[Callable[[], AsyncContextManager]] = None,
+        force: bool = False
+    ) -> Dict:
+        """Ingest every documentation file of a repository.
+
+        ``source`` is a GitHub repository URL, downloaded as a tarball of ``ref``
+        (the default branch unless given), or the path of a local checkout.
+        Files with an extension in ``ALLOWED_EXTENSIONS`` and at most
+        ``REPO_MAX_FILE_BYTES`` are parsed in the process pool, and each file is
+        embedded as soon as it has been parsed. Files ingested from the same
+        source before that no longer exist are removed. An unchanged tarball is
+        skipped unless ``force`` is set.
+        """
+        try:
+            start = time.perf_counter()
+            extensions = {extension.lower() for extension in settings.ALLOWED_EXTENSIONS}
+            with tempfile.TemporaryDirectory(prefix="repo-") as tmp:
+                if Path(source).is_dir():
+                    root = Path(source).resolve()
+                    crawl = await run_blocking(discover, root, extensions, settings.REPO_MAX_FILE_BYTES)
+                    return await self._ingest_files(
+                        crawl, project or root.name.lower(), f"{root.as_uri()}/", start, downloaded=0
                     )
-                    
-                    # Insert document
-                    await self.vector_db.async_insert([doc])
-                    logger.info("Successfully stored section")
-                except Exception as e:
-                    logger.error(f"Error processing section {i+1}: {str(e)}")
-                    logger.exception("Full traceback:")
-                    raise
-            
-            logger.info(f"Stored document from {url} with {len(sections)} sections")
+
+                repo = project_id(source)
+                if len(repo.split("/")) != 2:
+                    raise ValueError(f"Not a GitHub repository or local directory: {source}")
+                project = project or repo
+                archive_url = f"{settings.GITHUB_ARCHIVE_BASE_URL.rstrip('/')}/{repo}/tar.gz/{ref}"
+                archive = Path(tmp) / "archive.tar.gz"
+                logger.info(f"Fetching repository archive from: {archive_url}")
+                base_url = f"https://github.com/{repo}/blob/{ref}/"
+                slot = await self._fetch_slot(fetch_limiter)
+                try:
+                    conditional = not force
+                    while True:
+                        async with self.fetcher.get(
+                            archive_url,
+                            conditional=conditional,
+                            keep_body=False,
+                            max_bytes=settings.REPO_MAX_ARCHIVE_BYTES
+                        ) as response:
+                            if response.not_modified:
+                                if await self._is_indexed(project, base_url):
+                                    logger.info(f"{archive_url} has not changed since it was last processed, skipping")
+                                    return {"source": source, "project": project, "stats": None, "not_modified": True}
+                                # Only the validators are cached, so the archive has to be downloaded again
+                                logger.info(f"{archive_url} has not changed but is not indexed, fetching it again")
+                                conditional = False
+                                continue
+                            out = await run_blocking(open, archive, "wb")
+                            try:
+                                async for data in response.iter_bytes():
+                                    await run_blocking(out.write, data)
+                            finally:
+                                await run_blocking(out.close)
+                            # Downloaded: other fetches to the host need not wait for parsing and embedding
+                            await slot.aclose()
+                            crawl = await run_blocking(
+                                extract_archive, archive, Path(tmp) / "repo", extensions, settings.REPO_MAX_FILE_BYTES
+                            )
+                            await run_blocking(archive.unlink)
+                            # Inside the fetch so the archive's validators are only kept if ingestion succeeds
+                            # Documents of other refs of the repository are pruned too, so only one copy is indexed
+                            return await self._ingest_files(
+                                crawl, project, base_url, start,
+                                downloaded=response.size, prune_prefix=f"https://github.com/{repo}/blob/"
+                            )
+                finally:
+                    await slot.aclose()
         except Exception as e:
-            logger.error(f"Error storing document: {str(e)}")
+            logger.error(f"Error processing repository {source}: {str(e)}")
             logger.exception("Full traceback:")
             raise
 
-    async def process_github_repo(self, repo_url: str):
-        """Process a GitHub repository's README.md"""
+    @staticmethod
+    async def _parse_file(local_path: Path, extension: str, options) -> List[Chunk]:
+        """Parse and chunk a file in the process pool, or in a thread when there is a single CPU"""
+        args = (parse_file, str(local_path), extension, options)
+        with span("ingest", "parse"):
+            if process_pool_workers() > 1:
+                return await asyncio.get_running_loop().run_in_executor(get_process_pool(), *args)
+            return await run_blocking(*args)
+
+    async def process_upload(self, upload: StoredUpload, upload_store: UploadStore) -> Dict:
+        """Parse, chunk and embed an uploaded file stored by ``upload_store``.
+
+        The outcome is recorded in the store, so the same content is not
+        ingested again for the project unless it fails here.
+        """
         try:
-            # If the URL already contains 'blob/main/README.md', use it as is
-            if 'blob/main/README.md' in repo_url:
-                readme_url = repo_url
-            else:
-                # Remove trailing slash if present
-                repo_url = repo_url.rstrip('/')
-                # Construct the README URL
-                readme_url = f"{repo_url}/blob/main/README.md"
-            
-            logger.info(f"Processing GitHub repo: {readme_url}")
-            content = await self.fetch_github_markdown(readme_url)
-            if content:
-                logger.info("Successfully fetched markdown content")
-                await self.store_document(readme_url, content)
-                return True
-            logger.error("Failed to fetch markdown content")
-            return False
+            chunks = await self._parse_file(upload.path, upload.extension, chunk_options())
+            stats = await self.store_chunks(upload.url, chunks, upload.project, doc_type=upload.extension)
         except Exception as e:
-            logger.error(f"Error processing GitHub repo: {str(e)}")
-            logger.exception("Full traceback:")
-            raise 
\ No newline at end of file
+            logger.error(f"Error ingesting upload {upload.url}: {e}")
+            await run_blocking(upload_store.mark, upload, "error")
+            raise
+        await run_blocking(upload_store.mark, upload, "ingested")
+        return {"url": upload.url, "project": upload.project, "sha256": upload.sha256, "stats": stats}
+
+    async def _remove_urls(self, project: str, stored: Dict[str, Dict[str, str]], urls: List[str]) -> int:
+        """Delete the points and lexical rows of ``urls``, as listed in ``stored``; returns the points deleted"""
+        deleted = 0
+        for url in urls:
+            await self.pipeline.delete(stored[url])
+            deleted += len(stored[url])
+            if self.lexical_index is not None:
+                await run_blocking(self.lexical_index.sync, url, [])
+        if urls and self.answer_cache is not None:
+            self.answer_cache.invalidate(project)
+        return deleted
+
+    async def _ingest_files(
+        self,
+        crawl: CrawlResult,
+        project: str,
+        base_url: str,
+        start: float,
+        downloaded: int,
+        prune_prefix: Optional[str] = None
+    ) -> Dict:
+        """Parse files in the process pool and store each one as soon as it is parsed.
+
+        Stored URLs under ``prune_prefix`` (``base_url`` by default) that the
+        crawl no longer produced are removed afterwards.
+        """
+        options = chunk_options()
+        semaphore = asyncio.Semaphore(settings.REPO_FILE_CONCURRENCY)
+        totals = IngestStats()
+        failed: Dict[str, str] = {}
+        parse_start = time.perf_counter()
+        await self.ensure_collection()
+        # One scroll for the whole project instead of one per file
+        stored = await self.pipeline.fingerprints_by_url(project)
+
+        async def ingest(file: RepoFile):
+            async with semaphore:
+                try:
+                    chunks = await self._parse_file(file.local_path, file.extension, options)
+                    url = base_url + file.path
+                    stats = await self.store_chunks(
+                        url, chunks, project, doc_type=file.extension, existing=stored.get(url, {})
+                    )
+                except Exception as e:
+                    logger.error(f"Error ingesting {file.path}: {e}")
+                    failed[file.path] = str(e)
+                    return
+                totals.sections += stats["sections"]
+                totals.unchanged += stats["unchanged"]
+                totals.deleted += stats["deleted"]
+                totals.batches += stats["batches"]
+                totals.tokens += stats["tokens"]
+
+        await asyncio.gather(*[ingest(file) for file in crawl.files])
+
+        # Remove files of this source that were ingested before and are gone now,
+        # including those stored under another ref of the same repository
+        current = {base_url + file.path for file in crawl.files}
+        prefix = (prune_prefix or base_url).lower()
+        stale = [url for url in stored if url.lower().startswith(prefix) and url not in current]
+        totals.deleted += await self._remove_urls(project, stored, stale)
+
+        elapsed = time.perf_counter() - start
+        file_bytes = sum(file.size for file in crawl.files)
+        result = {
+            "source": base_url,
+            "project": project,
+            "files": len(crawl.files),
+            "failed": failed,
+            "skipped": crawl.skipped,
+            "removed_files": len(stale),
+            "bytes": file_bytes,
+            "downloaded_bytes": downloaded,
+            "seconds": round(elapsed, 3),
+            "parse_and_embed_seconds": round(time.perf_counter() - parse_start, 3),
+            "files_per_second": round(len(crawl.files) / elapsed, 2) if elapsed else 0.0,
+            "mb_per_second": round(file_bytes / 1e6 / elapsed, 3) if elapsed else 0.0,
+            "stats": totals.to_dict(),
+            "not_modified": False,
+        }
+        logger.info(
+            f"Ingested {result['files']} files ({file_bytes / 1e6:.1f} MB) from {base_url} in {elapsed:.2f}s: "
+            f"{result['files_per_second']} files/s, {result['mb_per_second']} MB/s, "
+            f"{totals.sections} sections, {len(failed)} failed"
+        )
+        return result
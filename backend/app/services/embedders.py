@@ -0,0 +1,139 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import re
+import zlib
+import numpy as np
+from openai import OpenAI
+from agno.embedder.base import Embedder
+from agno.embedder.openai import OpenAIEmbedder
+from app.core.config import settings
+from app.core.executor import get_process_pool, process_pool_workers
+from app.core.metrics import TOKENS
+from app.services.embedding_cache import CachedEmbedder, EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+EMBEDDER_BACKENDS = ("openai", "local")
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+@dataclass
+class OpenAIBatchEmbedder(OpenAIEmbedder):
+    """OpenAI embedder that can embed many texts with a single API request"""
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts, returning vectors in the same order as the input"""
+        if not texts:
+            return []
+
+        request_params: Dict[str, Any] = {
+            "input": texts,
+            "model": self.id,
+            "encoding_format": self.encoding_format,
+        }
+        if self.user is not None:
+            request_params["user"] = self.user
+        if self.id.startswith("text-embedding-3"):
+            request_params["dimensions"] = self.dimensions
+        if self.request_params:
+            request_params.update(self.request_params)
+
+        response = self.client.embeddings.create(**request_params)
+        if response.usage is not None:
+            TOKENS.inc(response.usage.total_tokens, kind="embedding")
+        # The API does not guarantee ordering, so sort by the input index
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+def _features(text: str) -> Tuple[List[int], List[float]]:
+    """Hashed word unigrams and bigrams of a text, with their weights"""
+    words = TOKEN_RE.findall(text.lower())
+    bigrams = [f"{first} {second}" for first, second in zip(words, words[1:])]
+    hashes = [zlib.crc32(feature.encode()) for feature in words + bigrams]
+    return hashes, [1.0] * len(words) + [0.5] * len(bigrams)
+
+def hash_embed(texts: List[str], dimensions: int) -> np.ndarray:
+    """Embed texts as L2-normalized signed feature-hashing vectors, one row per text.
+
+    Tokenizing and hashing is a loop over words; every text of the batch is
+    then accumulated into the output matrix with a single ``bincount``.
+    Module-level so worker processes can run it.
+    """
+    rows: List[int] = []
+    hashes: List[int] = []
+    weights: List[float] = []
+    for row, text in enumerate(texts):
+        text_hashes, text_weights = _features(text)
+        rows.extend([row] * len(text_hashes))
+        hashes.extend(text_hashes)
+        weights.extend(text_weights)
+
+    hashed = np.asarray(hashes, dtype=np.uint64)
+    signs = np.where(hashed & 0x80000000, 1.0, -1.0) * np.asarray(weights)
+    flat = np.asarray(rows, dtype=np.int64) * dimensions + (hashed % dimensions).astype(np.int64)
+    matrix = np.bincount(flat, weights=signs, minlength=len(texts) * dimensions).reshape(len(texts), dimensions)
+    # Sublinear term frequency, so repeated words do not dominate
+    matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return (matrix / np.where(norms == 0, 1.0, norms)).astype(np.float32)
+
+@dataclass
+class LexicalHashingEmbedder(Embedder):
+    """Lexical fallback embedder: feature hashing of words and word pairs, not a language model.
+
+    Two texts are only similar if they share words, so synonyms and paraphrases
+    do not match; use it for offline development, tests and benchmarks, not as
+    a replacement for the openai backend. Needs no model download or network
+    and is deterministic across processes, so vectors can be stored. Batches
+    larger than ``shard_size`` are split across the shared process pool when it
+    has more than one worker.
+    """
+
+    # Unchanged from when the class was called LocalHashingEmbedder, so stored snapshots stay compatible
+    id: str = "local-hashing-v1"
+    dimensions: Optional[int] = 1536
+    shard_size: int = 256
+
+    def get_embedding(self, text: str) -> List[float]:
+        return hash_embed([text], self.dimensions)[0].tolist()
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts, returning vectors in the same order as the input"""
+        if not texts:
+            return []
+        if len(texts) <= self.shard_size or process_pool_workers() < 2:
+            return hash_embed(texts, self.dimensions).tolist()
+        shards = [texts[i:i + self.shard_size] for i in range(0, len(texts), self.shard_size)]
+        matrices = get_process_pool().map(hash_embed, shards, [self.dimensions] * len(shards))
+        return np.vstack(list(matrices)).tolist()
+
+def create_embedder(
+    api_key: str,
+    openai_client: Optional[OpenAI] = None,
+    embedding_cache: Optional[EmbeddingCache] = None
+) -> Embedder:
+    """Build the embedder selected by ``EMBEDDER_BACKEND``.
+
+    Remote embeddings are wrapped in the embedding cache when one is given.
+    Local ones are cheaper to recompute than to look up, so they are not.
+    """
+    backend = settings.EMBEDDER_BACKEND
+    if backend == "local":
+        return LexicalHashingEmbedder(
+            dimensions=settings.EMBEDDING_DIMENSIONS,
+            shard_size=settings.LOCAL_EMBEDDER_SHARD_SIZE
+        )
+    if backend != "openai":
+        raise ValueError(f"Unknown embedder backend: {backend}, expected one of {EMBEDDER_BACKENDS}")
+
+    embedder = OpenAIBatchEmbedder(
+        api_key=api_key,
+        id=settings.EMBEDDING_MODEL,
+        dimensions=settings.EMBEDDING_DIMENSIONS,
+        openai_client=openai_client
+    )
+    if embedding_cache is not None:
+        return CachedEmbedder(embedder=embedder, cache=embedding_cache)
+    return embedder
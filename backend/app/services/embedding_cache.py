@@ -0,0 +1,207 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from hashlib import sha256
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from agno.embedder.base import Embedder
+
+logger = logging.getLogger(__name__)
+
+# Bump to invalidate every cached vector, e.g. after changing normalize_text
+CACHE_VERSION = 1
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so formatting-only differences share a cache entry"""
+    return " ".join(text.split())
+
+class EmbeddingCache:
+    """Two-tier embedding cache: an in-memory LRU in front of a SQLite store.
+
+    Entries are keyed by a hash of the cache version, embedding model id,
+    dimensions and whitespace-normalized text. A vector is a pure function of
+    those inputs, so entries never go stale and need no TTL: switching model or
+    dimensions simply produces new keys, and the unused old entries age out of
+    both tiers by least-recent use. Bump ``CACHE_VERSION`` to drop everything.
+    """
+
+    def __init__(self, path: str, max_memory_items: int, max_disk_items: int):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._writes_since_prune = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model_id: str, dimensions: Optional[int], text: str) -> str:
+        return sha256(f"{CACHE_VERSION}\x00{model_id}\x00{dimensions}\x00{normalize_text(text)}".encode()).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors for whichever of ``keys`` are present"""
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is None:
+                    missing.append(key)
+                    continue
+                self._memory.move_to_end(key)
+                found[key] = vector.tolist()
+                self.memory_hits += 1
+
+            if missing:
+                placeholders = ",".join("?" * len(missing))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", missing
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    self._remember(key, vector)
+                    found[key] = vector.tolist()
+                self.disk_hits += len(rows)
+                self.misses += len(missing) - len(rows)
+                if rows:
+                    now = time.time()
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, key) for key, _ in rows]
+                    )
+                    self._conn.commit()
+        return found
+
+    def put_many(self, items: Sequence[Tuple[str, List[float]]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            rows = []
+            for key, vector in items:
+                array = np.asarray(vector, dtype=np.float32)
+                self._remember(key, array)
+                rows.append((key, array.tobytes(), now))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._writes_since_prune += len(rows)
+            # Pruning needs a COUNT, so only do it once in a while
+            if self._writes_since_prune >= 1000:
+                self._prune_disk()
+            self._conn.commit()
+
+    def _prune_disk(self) -> None:
+        self._writes_since_prune = 0
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_disk_items
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (excess,)
+            )
+            logger.info(f"Evicted {excess} embeddings from the disk cache")
+
+    def stats(self) -> Dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_items": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._prune_disk()
+            self._conn.commit()
+            self._conn.close()
+        logger.info(f"Closed embedding cache: {self.stats()}")
+
+@dataclass
+class CachedEmbedder(Embedder):
+    """Embedder wrapper that serves repeated texts from an EmbeddingCache"""
+
+    embedder: Optional[Embedder] = None
+    cache: Optional[EmbeddingCache] = None
+    id: str = ""
+
+    def __post_init__(self):
+        self.dimensions = self.embedder.dimensions
+        self.id = getattr(self.embedder, "id", type(self.embedder).__name__)
+
+    def _key(self, text: str) -> str:
+        return self.cache.make_key(self.id, self.dimensions, text)
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embeddings([text])[0]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        key = self._key(text)
+        cached = self.cache.get_many([key])
+        if key in cached:
+            return cached[key], None
+        embedding, usage = self.embedder.get_embedding_and_usage(text)
+        if embedding:
+            self.cache.put_many([(key, embedding)])
+        return embedding, usage
+
+    def cached_embedding(self, text: str) -> Optional[List[float]]:
+        """The cached vector of ``text``, or None without calling the wrapped embedder"""
+        key = self._key(text)
+        return self.cache.get_many([key]).get(key)
+
+    def embed_uncached(self, text: str) -> List[float]:
+        """Embed ``text`` with the wrapped embedder and cache it, after ``cached_embedding`` missed"""
+        embedding = self.embedder.get_embedding(text)
+        if embedding:
+            self.cache.put_many([(self._key(text), embedding)])
+        return embedding
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts, only sending cache misses to the wrapped embedder"""
+        keys = [self._key(text) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        # Embed each distinct missing text once, even if it repeats in the batch
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            missing_texts = list(missing.values())
+            if hasattr(self.embedder, "get_embeddings"):
+                vectors = self.embedder.get_embeddings(missing_texts)
+            else:
+                vectors = [self.embedder.get_embedding(text) for text in missing_texts]
+            new_items = [(key, vector) for key, vector in zip(missing.keys(), vectors) if vector]
+            self.cache.put_many(new_items)
+            cached.update(new_items)
+
+        return [cached.get(key, []) for key in keys]
@@ -0,0 +1,302 @@
+import asyncio
+import codecs
+import logging
+import random
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from hashlib import sha256
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+import aiohttp
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.core.metrics import span
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+class FetchError(Exception):
+    """A response other than 200 (or 304 for a conditional request)"""
+
+    def __init__(self, url: str, status: int, reason: Optional[str]):
+        super().__init__(f"Failed to fetch {url}: {status} {reason}")
+        self.url = url
+        self.status = status
+
+@dataclass
+class CacheEntry:
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    size: int
+    body_path: Path
+
+class HttpCache:
+    """Validators and bodies of fetched documents, for conditional requests.
+
+    ETag and Last-Modified headers are kept in SQLite and each body in a file
+    named by the hash of its URL. An entry is only written once a body has been
+    downloaded and processed completely, so a 304 always refers to a document
+    that was fully ingested.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.bodies = self.path / "bodies"
+        self.bodies.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path / "http_cache.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, size INTEGER NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def body_path(self, url: str) -> Path:
+        return self.bodies / sha256(url.encode()).hexdigest()
+
+    def get(self, url: str, require_body: bool = True) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, size FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = CacheEntry(url, row[0], row[1], row[2], self.body_path(url))
+        # Without the body a 304 could not be served, so do not ask for one
+        return entry if not require_body or entry.body_path.exists() else None
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], size: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, size, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, size, time.time())
+            )
+            self._conn.commit()
+
+    def touch(self, url: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class FetchResponse:
+    """A document being fetched; ``not_modified`` when the cached copy is still current.
+
+    The body is read incrementally with ``iter_bytes`` or ``iter_text``. For a
+    304 these replay the cached body. Bodies over ``max_bytes`` are rejected
+    while they stream in.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        response: aiohttp.ClientResponse,
+        cached: Optional[CacheEntry],
+        spool: Optional[Path],
+        max_bytes: int
+    ):
+        self.url = url
+        self.status = response.status
+        self.not_modified = response.status == 304
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+        self.complete = False
+        self.size = 0
+        self._response = response
+        self._cached = cached
+        self._spool = spool
+        self._charset = response.charset or "utf-8"
+        self._max_bytes = max_bytes
+
+    async def iter_bytes(self) -> AsyncIterator[bytes]:
+        if self.not_modified:
+            async for data in self._iter_cached():
+                yield data
+            self.complete = True
+            return
+
+        limit = self._max_bytes
+        length = self._response.content_length
+        # Content-Length is the compressed size when the server compresses; the body is checked as it arrives too
+        if length is not None and length > limit:
+            raise ValueError(f"Document at {self.url} is {length} bytes, limit is {limit}")
+        spool = await run_blocking(open, self._spool, "wb") if self._spool is not None else None
+        try:
+            async for data in self._response.content.iter_chunked(settings.FETCH_CHUNK_BYTES):
+                self.size += len(data)
+                if self.size > limit:
+                    raise ValueError(f"Document at {self.url} exceeds the {limit} byte limit")
+                if spool is not None:
+                    await run_blocking(spool.write, data)
+                yield data
+        finally:
+            if spool is not None:
+                await run_blocking(spool.close)
+        self.complete = True
+
+    async def _iter_cached(self) -> AsyncIterator[bytes]:
+        with await run_blocking(open, self._cached.body_path, "rb") as body:
+            while True:
+                data = await run_blocking(body.read, settings.FETCH_CHUNK_BYTES)
+                if not data:
+                    return
+                yield data
+
+    async def iter_text(self) -> AsyncIterator[str]:
+        """Decoded text pieces; a multi-byte character may span two reads"""
+        decoder = codecs.getincrementaldecoder(self._charset)(errors="replace")
+        async for data in self.iter_bytes():
+            text = decoder.decode(data)
+            if text:
+                yield text
+        text = decoder.decode(b"", final=True)
+        if text:
+            yield text
+
+    async def text(self) -> str:
+        return "".join([piece async for piece in self.iter_text()])
+
+class HttpFetcher:
+    """Fetches documents over one pooled aiohttp session, with retries and conditional requests.
+
+    Connections are kept alive and capped in total and per host, and responses
+    may be compressed. 429 and 5xx responses and connection errors are retried
+    with exponential backoff, honouring Retry-After. With a cache, a repeated
+    fetch sends the stored validators so an unchanged document costs a 304.
+    """
+
+    def __init__(self, cache: Optional[HttpCache] = None):
+        self.cache = cache
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.requests = 0
+        self.not_modified = 0
+        self.retries = 0
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # Created on first use so it binds to the running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.FETCH_MAX_CONNECTIONS,
+                limit_per_host=settings.FETCH_MAX_CONNECTIONS_PER_HOST,
+                keepalive_timeout=settings.FETCH_KEEPALIVE_SECONDS,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=settings.FETCH_TIMEOUT),
+                headers={"Accept-Encoding": "gzip, deflate", "User-Agent": settings.PROJECT_NAME}
+            )
+        return self._session
+
+    @asynccontextmanager
+    async def get(
+        self,
+        url: str,
+        conditional: bool = True,
+        keep_body: bool = True,
+        max_bytes: Optional[int] = None
+    ) -> AsyncIterator[FetchResponse]:
+        """Request ``url`` and yield the response for streaming.
+
+        The cache entry is updated only if the body was read completely and the
+        block exits without an error, so callers can make it depend on having
+        processed the document successfully. With ``keep_body=False`` only the
+        validators are cached, e.g. for large archives; the body of a 304 can
+        then not be read. Bodies are limited to ``max_bytes``, by default
+        ``MAX_DOCUMENT_BYTES``.
+        """
+        max_bytes = max_bytes or settings.MAX_DOCUMENT_BYTES
+        cached = None
+        if self.cache is not None and conditional:
+            cached = await run_blocking(self.cache.get, url, keep_body)
+        headers: Dict[str, str] = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        # Time to response headers; bodies are timed by whoever consumes them
+        with span("ingest", "fetch"):
+            response = await self._request(url, headers)
+        spool = None
+        try:
+            if response.status == 304 and cached is not None:
+                self.not_modified += 1
+                logger.debug(f"Not modified: {url}")
+                yield FetchResponse(url, response, cached, None, max_bytes)
+                await run_blocking(self.cache.touch, url)
+                return
+            if response.status != 200:
+                logger.error(f"Error fetching {url}: {response.status} {response.reason}")
+                raise FetchError(url, response.status, response.reason)
+
+            if self.cache is not None and keep_body:
+                spool = self.cache.body_path(url).with_suffix(".part")
+            fetched = FetchResponse(url, response, None, spool, max_bytes)
+            yield fetched
+            if self.cache is not None and fetched.complete and (fetched.etag or fetched.last_modified):
+                if spool is not None:
+                    await run_blocking(spool.replace, self.cache.body_path(url))
+                    spool = None
+                await run_blocking(self.cache.put, url, fetched.etag, fetched.last_modified, fetched.size)
+        finally:
+            response.release()
+            if spool is not None:
+                await run_blocking(spool.unlink, True)
+
+    async def _request(self, url: str, headers: Dict[str, str]) -> aiohttp.ClientResponse:
+        for attempt in range(settings.FETCH_RETRIES + 1):
+            self.requests += 1
+            last = attempt == settings.FETCH_RETRIES
+            try:
+                response = await self.session.get(url, headers=headers)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if last:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"Fetching {url} failed ({e!r}), retrying in {delay:.1f}s")
+            else:
+                if response.status not in RETRY_STATUSES or last:
+                    return response
+                delay = self._backoff(attempt, response.headers.get("Retry-After"))
+                response.release()
+                logger.warning(f"Fetching {url} returned {response.status}, retrying in {delay:.1f}s")
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+        """Exponential backoff with jitter; a numeric Retry-After takes precedence"""
+        if retry_after is not None and retry_after.isdigit():
+            return min(float(retry_after), settings.FETCH_BACKOFF_MAX_SECONDS)
+        delay = min(settings.FETCH_BACKOFF_SECONDS * 2 ** attempt, settings.FETCH_BACKOFF_MAX_SECONDS)
+        return delay * random.uniform(0.5, 1.0)
+
+    def stats(self) -> Dict:
+        return {"requests": self.requests, "not_modified": self.not_modified, "retries": self.retries}
+
+    async def aclose(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self.cache is not None:
+            self.cache.close()
+
+def create_fetcher() -> HttpFetcher:
+    """Fetcher with the conditional request cache configured in settings"""
+    cache = None
+    if settings.FETCH_CACHE_ENABLED:
+        cache = HttpCache(settings.FETCH_CACHE_PATH or str(Path(settings.DATA_DIR) / "http_cache"))
+    return HttpFetcher(cache=cache)
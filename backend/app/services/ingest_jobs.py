@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+from pydantic import BaseModel
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class UrlProgress(BaseModel):
+    url: str
+    status: str = "queued"  # queued, running, success, error
+    data: Optional[Any] = None
+    error: Optional[str] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+class IngestJob(BaseModel):
+    id: str
+    status: str = "queued"  # queued, running, completed
+    created_at: float
+    finished_at: Optional[float] = None
+    total: int = 0
+    completed: int = 0
+    failed: int = 0
+    results: List[UrlProgress] = []
+
+class HostRateLimiter:
+    """Caps concurrent requests and the request rate towards a single host"""
+
+    def __init__(self, concurrency: int, requests_per_second: float):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def limit(self):
+        async with self._semaphore:
+            async with self._lock:
+                now = time.monotonic()
+                wait = self._next_slot - now
+                self._next_slot = max(now, self._next_slot) + self._interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+            yield
+
+class IngestJobManager:
+    """Runs repository ingestion jobs in the background on the event loop.
+
+    Every URL of every job competes for one global semaphore, and fetches are
+    additionally limited per host. Finished jobs are kept in memory for polling,
+    bounded by ``INGEST_JOB_HISTORY``.
+    """
+
+    def __init__(self):
+        self._semaphore = asyncio.Semaphore(settings.INGEST_MAX_CONCURRENCY)
+        self._host_limiters: Dict[str, HostRateLimiter] = {}
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _host_limiter(self, url: str) -> HostRateLimiter:
+        host = urlparse(url).netloc
+        limiter = self._host_limiters.get(host)
+        if limiter is None:
+            limiter = HostRateLimiter(settings.INGEST_PER_HOST_CONCURRENCY, settings.INGEST_PER_HOST_RATE)
+            self._host_limiters[host] = limiter
+        return limiter
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs once the history limit is exceeded"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status == "completed"]
+        for job_id in finished[:max(0, len(self._jobs) - settings.INGEST_JOB_HISTORY)]:
+            del self._jobs[job_id]
+
+    def submit(
+        self,
+        urls: List[str],
+        document_service,
+        handler: Optional[Callable[[str], Awaitable[Any]]] = None
+    ) -> IngestJob:
+        """Queue a job that ingests every URL and return it immediately.
+
+        URLs are GitHub repositories unless a ``handler`` is given, which is
+        awaited for each URL instead, without the per-host fetch limits.
+        """
+        job = IngestJob(
+            id=str(uuid.uuid4()),
+            created_at=time.time(),
+            total=len(urls),
+            results=[UrlProgress(url=url) for url in urls]
+        )
+        self._jobs[job.id] = job
+        self._prune()
+
+        task = asyncio.create_task(self._run_job(job, document_service, handler))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        logger.info(f"Queued ingest job {job.id} with {job.total} URLs")
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self._jobs.get(job_id)
+
+    async def _run_job(self, job: IngestJob, document_service, handler) -> None:
+        job.status = "running"
+        await asyncio.gather(*[self._run_url(job, progress, document_service, handler) for progress in job.results])
+        job.status = "completed"
+        job.finished_at = time.time()
+        logger.info(f"Ingest job {job.id} finished: {job.completed} succeeded, {job.failed} failed")
+
+    async def _run_url(self, job: IngestJob, progress: UrlProgress, document_service, handler) -> None:
+        async with self._semaphore:
+            progress.status = "running"
+            progress.started_at = time.time()
+            try:
+                if handler is not None:
+                    progress.data = await handler(progress.url)
+                else:
+                    limiter = self._host_limiter(document_service.get_readme_url(progress.url))
+                    progress.data = await document_service.process_github_repo(
+                        progress.url,
+                        fetch_limiter=limiter.limit
+                    )
+                progress.status = "success"
+                job.completed += 1
+            except Exception as e:
+                progress.status = "error"
+                progress.error = str(e)
+                job.failed += 1
+            finally:
+                progress.finished_at = time.time()
+
+    async def aclose(self) -> None:
+        """Cancel jobs that are still running"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
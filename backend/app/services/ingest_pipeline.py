@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import uuid
+from hashlib import md5, sha256
+from typing import AsyncIterable, Dict, Iterable, List, Optional, Set
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models
+from agno.document import Document
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.core.metrics import span
+from app.core.tokens import estimate_tokens
+from app.services.admission import AdmissionController, Priority
+
+logger = logging.getLogger(__name__)
+
+SCROLL_PAGE_SIZE = 1000
+
+def section_fingerprint(url: str, title: str, content: str, project: str = "") -> str:
+    """Hash that changes whenever a section's source, project, title or content changes"""
+    return sha256("\x00".join([url, project, title, content]).encode()).hexdigest()
+
+def fingerprint_point_id(fingerprint: str) -> str:
+    """Deterministic Qdrant point id for a section fingerprint"""
+    return str(uuid.UUID(hex=fingerprint[:32]))
+
+@dataclass
+class StageStats:
+    count: int = 0
+    seconds: float = 0.0
+
+@dataclass
+class IngestStats:
+    """Per-stage counts and timings for a single ingestion run"""
+    sections: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    batches: int = 0
+    tokens: int = 0
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+
+    @contextmanager
+    def stage(self, name: str, count: int = 0):
+        """Time a pipeline stage and add ``count`` processed items to it; also recorded as a metric span"""
+        stats = self.stages.setdefault(name, StageStats())
+        start = time.perf_counter()
+        try:
+            with span("ingest", name):
+                yield stats
+        finally:
+            stats.seconds += time.perf_counter() - start
+            stats.count += count
+
+    def to_dict(self) -> Dict:
+        return {
+            "sections": self.sections,
+            "unchanged": self.unchanged,
+            "deleted": self.deleted,
+            "batches": self.batches,
+            "tokens": self.tokens,
+            "stages": {
+                name: {"count": stage.count, "seconds": round(stage.seconds, 4)}
+                for name, stage in self.stages.items()
+            },
+        }
+
+class EmbeddingPipeline:
+    """Embeds documents in size- and token-bounded batches and bulk upserts them to Qdrant.
+
+    Each batch is embedded with a single embedder call and written with a single
+    upsert. Up to ``concurrency`` batches are in flight at the same time. With
+    an ``admission`` controller each embedding call first waits for it as bulk
+    work, behind any chat calls.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        client: AsyncQdrantClient,
+        collection: str,
+        batch_size: Optional[int] = None,
+        max_batch_tokens: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        admission: Optional[AdmissionController] = None,
+    ):
+        self.embedder = embedder
+        self.admission = admission
+        self.client = client
+        self.collection = collection
+        self.batch_size = batch_size or settings.EMBED_BATCH_SIZE
+        self.max_batch_tokens = max_batch_tokens or settings.EMBED_BATCH_MAX_TOKENS
+        self.concurrency = concurrency or settings.EMBED_CONCURRENCY
+
+    @staticmethod
+    def _to_point(doc: Document, vector: List[float]) -> models.PointStruct:
+        # Same payload layout as agno's Qdrant.insert so search keeps working. Documents
+        # without an explicit id fall back to agno's content-hash id
+        cleaned_content = doc.content.replace("\x00", "\ufffd")
+        return models.PointStruct(
+            id=doc.id or md5(cleaned_content.encode()).hexdigest(),
+            vector=vector,
+            payload={
+                "name": doc.name,
+                "meta_data": doc.meta_data,
+                "content": cleaned_content,
+                "usage": doc.usage,
+            },
+        )
+
+    async def _embed_and_upsert(self, batch: List[Document], stats: IngestStats):
+        texts = [doc.content for doc in batch]
+        if self.admission is not None:
+            with stats.stage("admission"):
+                await self.admission.acquire(Priority.BULK, sum(estimate_tokens(text) for text in texts))
+        with stats.stage("embed", count=len(batch)):
+            vectors = await run_blocking(self.embedder.get_embeddings, texts)
+        if len(vectors) != len(batch):
+            raise Exception(f"Embedder returned {len(vectors)} vectors for {len(batch)} documents")
+
+        points = [self._to_point(doc, vector) for doc, vector in zip(batch, vectors)]
+        with stats.stage("upsert", count=len(points)):
+            await self.client.upsert(collection_name=self.collection, points=points, wait=True)
+
+    async def existing_fingerprints(self, url: str) -> Dict[str, str]:
+        """Map point id to content hash for every point already stored for ``url``"""
+        fingerprints: Dict[str, str] = {}
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=self.collection,
+                scroll_filter=models.Filter(
+                    must=[models.FieldCondition(key="meta_data.url", match=models.MatchValue(value=url))]
+                ),
+                limit=SCROLL_PAGE_SIZE,
+                offset=offset,
+                with_payload=["meta_data.content_hash"],
+                with_vectors=False,
+            )
+            for point in points:
+                meta_data = (point.payload or {}).get("meta_data") or {}
+                fingerprints[str(point.id)] = meta_data.get("content_hash", "")
+            if offset is None:
+                return fingerprints
+
+    async def fingerprints_by_url(self, project: str) -> Dict[str, Dict[str, str]]:
+        """``existing_fingerprints`` for every source URL of ``project``, in a single scroll"""
+        by_url: Dict[str, Dict[str, str]] = {}
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=self.collection,
+                scroll_filter=models.Filter(
+                    must=[models.FieldCondition(key="meta_data.project", match=models.MatchValue(value=project))]
+                ),
+                limit=SCROLL_PAGE_SIZE,
+                offset=offset,
+                with_payload=["meta_data.url", "meta_data.content_hash"],
+                with_vectors=False,
+            )
+            for point in points:
+                meta_data = (point.payload or {}).get("meta_data") or {}
+                by_url.setdefault(meta_data.get("url", ""), {})[str(point.id)] = meta_data.get("content_hash", "")
+            if offset is None:
+                return by_url
+
+    async def delete(self, point_ids: Iterable[str]) -> None:
+        point_ids = list(point_ids)
+        if point_ids:
+            await self.client.delete(
+                collection_name=self.collection,
+                points_selector=models.PointIdsList(points=point_ids),
+                wait=True,
+            )
+
+    async def sync_stream(
+        self,
+        url: str,
+        documents: AsyncIterable[Document],
+        stats: Optional[IngestStats] = None,
+        existing: Optional[Dict[str, str]] = None
+    ) -> IngestStats:
+        """Make the points stored for ``url`` match ``documents`` as they are produced.
+
+        Documents must carry fingerprint-derived ids, so only new or changed
+        ones are embedded and upserted. Each batch is embedded as soon as it fills, so embedding overlaps parsing.
+        At most ``concurrency`` batches are in flight; beyond that the producer is
+        not advanced, so a slow embedder holds back parsing instead of letting
+        documents pile up in memory. Stale points are only deleted once the
+        stream completes, so a failed stream leaves the previous points in place.
+        ``existing`` may be passed when the stored fingerprints are already known.
+        """
+        stats = stats or IngestStats()
+        if existing is None:
+            with stats.stage("diff"):
+                existing = await self.existing_fingerprints(url)
+
+        seen: Set[str] = set()
+        pending: Set[asyncio.Task] = set()
+        batch: List[Document] = []
+        batch_tokens = 0
+
+        async def submit(batch: List[Document], tokens: int):
+            while len(pending) >= self.concurrency:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(done)
+                for task in done:
+                    task.result()
+            stats.batches += 1
+            stats.tokens += tokens
+            pending.add(asyncio.create_task(self._embed_and_upsert(batch, stats)))
+
+        try:
+            async for doc in documents:
+                stats.sections += 1
+                new = doc.id not in seen and doc.id not in existing
+                seen.add(doc.id)
+                if not new:
+                    stats.unchanged += 1
+                    continue
+                tokens = estimate_tokens(doc.content)
+                if batch and (len(batch) >= self.batch_size or batch_tokens + tokens > self.max_batch_tokens):
+                    await submit(batch, batch_tokens)
+                    batch, batch_tokens = [], 0
+                batch.append(doc)
+                batch_tokens += tokens
+            if batch:
+                await submit(batch, batch_tokens)
+            await asyncio.gather(*pending)
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            raise
+
+        stale = [point_id for point_id in existing if point_id not in seen]
+        with stats.stage("delete", count=len(stale)):
+            await self.delete(stale)
+        stats.deleted += len(stale)
+
+        logger.debug(
+            f"Streamed {stats.sections} sections for {url} into {stats.batches} batches "
+            f"({stats.tokens} tokens): {stats.to_dict()['stages']}"
+        )
+        return stats
@@ -0,0 +1,142 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+from agno.document import Document
+
+logger = logging.getLogger(__name__)
+
+TERM_RE = re.compile(r"[^\W_]+")
+IDENTIFIER_RE = re.compile(r"\w*(?:\d\w*[a-z]|[a-z]\w*\d|_)\w*", re.IGNORECASE)
+
+def match_expression(query: str) -> Optional[str]:
+    """FTS5 MATCH expression for a free-text query.
+
+    Every term is OR-ed so partial matches still rank. Identifiers such as
+    ``BMI270`` or ``bmi270_reg_read_spi`` are also added as phrases: the default
+    tokenizer splits them into consecutive tokens, and matching the whole
+    sequence scores far higher than matching its parts separately.
+    """
+    terms = dict.fromkeys(term.lower() for term in TERM_RE.findall(query))
+    if not terms:
+        return None
+    clauses = [f'"{term}"' for term in terms]
+    for identifier in dict.fromkeys(IDENTIFIER_RE.findall(query)):
+        parts = TERM_RE.findall(identifier)
+        if len(parts) > 1:
+            clauses.append(f'"{" ".join(parts).lower()}"')
+    return " OR ".join(clauses)
+
+class LexicalIndex:
+    """BM25 full-text index of the sections stored in Qdrant, kept in SQLite FTS5.
+
+    Sections are stored under the same point ids as their vectors, so results
+    from both indexes can be fused by id. ``sync`` mirrors
+    ``EmbeddingPipeline.sync_stream`` for one source URL: rows no longer
+    produced by the source are deleted and new ones inserted. ``add`` and ``prune`` do the same in two steps, for
+    sources that are indexed while they are still being parsed.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sections (
+                rowid INTEGER PRIMARY KEY,
+                point_id TEXT NOT NULL UNIQUE,
+                url TEXT NOT NULL,
+                project TEXT,
+                name TEXT,
+                title TEXT NOT NULL,
+                content TEXT NOT NULL,
+                meta_data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sections_url ON sections(url);
+            CREATE INDEX IF NOT EXISTS idx_sections_project ON sections(project);
+            CREATE VIRTUAL TABLE IF NOT EXISTS sections_fts USING fts5(
+                title, content, content='sections', content_rowid='rowid'
+            );
+            CREATE TRIGGER IF NOT EXISTS sections_ai AFTER INSERT ON sections BEGIN
+                INSERT INTO sections_fts(rowid, title, content) VALUES (new.rowid, new.title, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS sections_ad AFTER DELETE ON sections BEGIN
+                INSERT INTO sections_fts(sections_fts, rowid, title, content)
+                VALUES ('delete', old.rowid, old.title, old.content);
+            END;
+        """)
+        self._conn.commit()
+
+    def sync(self, url: str, documents: List[Document]) -> int:
+        """Make the rows stored for ``url`` match ``documents``; returns the number inserted"""
+        inserted = self.add(url, documents)
+        self.prune(url, {doc.id for doc in documents})
+        return inserted
+
+    def add(self, url: str, documents: Iterable[Document]) -> int:
+        """Insert sections that are not indexed yet; returns the number inserted"""
+        rows = [
+            (
+                doc.id,
+                url,
+                doc.meta_data.get("project"),
+                doc.name,
+                doc.meta_data.get("title", ""),
+                doc.content,
+                json.dumps(doc.meta_data)
+            )
+            for doc in documents
+        ]
+        with self._lock:
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO sections (point_id, url, project, name, title, content, meta_data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def prune(self, url: str, keep: Set[str]) -> int:
+        """Delete the rows for ``url`` whose point ids are not in ``keep``; returns the number deleted"""
+        with self._lock:
+            existing = [row[0] for row in self._conn.execute("SELECT point_id FROM sections WHERE url = ?", (url,))]
+            stale = [(point_id,) for point_id in existing if point_id not in keep]
+            self._conn.executemany("DELETE FROM sections WHERE point_id = ?", stale)
+            self._conn.commit()
+        logger.debug(f"Lexical index for {url}: {len(stale)} deleted")
+        return len(stale)
+
+    def search(self, query: str, limit: int, project: Optional[str] = None) -> List[Dict]:
+        """Best BM25 matches, as dicts with id, name, meta_data, content and score (higher is better)"""
+        expression = match_expression(query)
+        if expression is None:
+            return []
+        sql = (
+            "SELECT s.point_id, s.name, s.meta_data, s.content, bm25(sections_fts, 2.0, 1.0) AS rank "
+            "FROM sections_fts JOIN sections s ON s.rowid = sections_fts.rowid "
+            "WHERE sections_fts MATCH ?"
+        )
+        params: list = [expression]
+        if project:
+            sql += " AND s.project = ?"
+            params.append(project)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        # bm25() is lower-is-better and negative for matches
+        return [
+            {"id": point_id, "name": name, "meta_data": json.loads(meta_data), "content": content, "score": -rank}
+            for point_id, name, meta_data, content, rank in rows
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
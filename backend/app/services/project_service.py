@@ -1,63 +1,142 @@
 import json
-import os
+import sqlite3
+import threading
+import time
 import logging
-from typing import List, Dict
-from pydantic import BaseModel
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
+from app.core.config import settings
+from app.models.project import Project, project_id
 
 logger = logging.getLogger(__name__)
 
-class Project(BaseModel):
-    name: str
-    readmeUrl: str
-    description: str
+CACHE_MAX_ENTRIES = 256  # Lookups by id or name are keyed by caller input, so the cache is bounded
 
 class ProjectService:
-    def __init__(self):
-        # Create data directory in the app folder
-        self.data_dir = Path(__file__).parent.parent.parent / "data"
-        self.data_dir.mkdir(exist_ok=True)  # Creates the data directory if it doesn't exist
-        self.projects_file = self.data_dir / "projects.json"
-        logger.info(f"Projects file path: {self.projects_file}")
-        self._ensure_projects_file()  # Creates the JSON file if it doesn't exist
-
-    def _ensure_projects_file(self):
-        """Ensure the projects file exists"""
-        if not self.projects_file.exists():
-            logger.info("Creating new projects.json file")
-            with open(self.projects_file, 'w') as f:
-                json.dump([], f)  # Creates an empty JSON array
-        else:
-            logger.info("Projects file already exists")
-
-    def get_projects(self) -> List[Project]:
-        """Get all projects from the JSON file"""
+    """Project registry stored in SQLite (WAL).
+
+    Projects are keyed by their normalized ``owner/repo`` id, so adding the same
+    repository twice updates the existing row instead of duplicating it. Reads
+    are served from a small in-process LRU cache that every write clears; pages
+    are sliced from the cached full list. A legacy
+    ``projects.json`` in the data directory is imported once and renamed.
+    """
+
+    def __init__(self, data_dir: Optional[str] = None):
+        self.data_dir = Path(data_dir or settings.DATA_DIR)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.data_dir / "projects.sqlite3"
+        logger.info(f"Projects database path: {self.db_path}")
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple, object]" = OrderedDict()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS projects ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "project TEXT NOT NULL UNIQUE, "
+            "name TEXT NOT NULL, "
+            "readme_url TEXT NOT NULL, "
+            "description TEXT NOT NULL, "
+            "created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_name ON projects(name)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_readme_url ON projects(readme_url)")
+        self._conn.commit()
+        self._migrate_json()
+
+    def _migrate_json(self):
+        """Import projects from the legacy JSON file, then rename it so it is not read again"""
+        projects_file = self.data_dir / "projects.json"
+        if not projects_file.exists():
+            return
         try:
-            logger.info(f"Reading projects from {self.projects_file}")
-            with open(self.projects_file, 'r') as f:
-                projects_data = json.load(f)
-                logger.info(f"Found {len(projects_data)} projects")
-                return [Project(**project) for project in projects_data]
+            with open(projects_file, 'r') as f:
+                projects_data = json.load(f) if projects_file.stat().st_size else []
+            for project in projects_data:
+                self.add_project(project["name"], project["readmeUrl"], project.get("description", ""))
+            projects_file.rename(projects_file.with_name("projects.json.migrated"))
+            logger.info(f"Migrated {len(projects_data)} projects from {projects_file}")
         except Exception as e:
-            logger.error(f"Error reading projects: {e}")
-            return []
+            logger.error(f"Error migrating projects from {projects_file}: {e}")
+            raise
+
+    @staticmethod
+    def _to_project(row: sqlite3.Row) -> Project:
+        return Project(
+            name=row["name"],
+            readmeUrl=row["readme_url"],
+            description=row["description"],
+            project=row["project"]
+        )
+
+    def _remember(self, key: Tuple, value) -> None:
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+
+    def _cached(self, key: Tuple, query: str, params: Tuple):
+        """Run a read query through the cache; rows are converted to projects once.
+
+        Returns the cached list itself, which callers must not modify.
+        """
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+            else:
+                rows = self._conn.execute(query, params).fetchall()
+                self._remember(key, [self._to_project(row) for row in rows])
+            return self._cache[key]
+
+    def get_projects(self, offset: int = 0, limit: Optional[int] = None) -> List[Project]:
+        """Get a page of projects in insertion order"""
+        projects = self._cached(("all",), "SELECT * FROM projects ORDER BY id", ())
+        return projects[offset:] if limit is None else projects[offset:offset + limit]
+
+    def get_project(self, repo: str) -> Optional[Project]:
+        """Look a project up by repository URL, README URL or ``owner/repo`` id"""
+        rows = self._cached(("project", project_id(repo)), "SELECT * FROM projects WHERE project = ?", (project_id(repo),))
+        return rows[0] if rows else None
+
+    def find_by_name(self, name: str) -> List[Project]:
+        return list(self._cached(("name", name), "SELECT * FROM projects WHERE name = ? ORDER BY id", (name,)))
+
+    def count(self) -> int:
+        with self._lock:
+            if ("count",) not in self._cache:
+                (count,) = self._conn.execute("SELECT COUNT(*) FROM projects").fetchone()
+                self._remember(("count",), count)
+            return self._cache[("count",)]
 
     def add_project(self, name: str, readmeUrl: str, description: str) -> Project:
-        """Add a new project to the JSON file"""
+        """Add a project, or update it if the repository is already registered"""
         try:
-            projects = self.get_projects()
             new_project = Project(
                 name=name,
                 readmeUrl=readmeUrl,
-                description=description
+                description=description,
+                project=project_id(readmeUrl)
             )
-            projects.append(new_project)
-            
-            logger.info(f"Writing {len(projects)} projects to {self.projects_file}")
-            with open(self.projects_file, 'w') as f:
-                json.dump([project.model_dump() for project in projects], f, indent=2)
-                        
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO projects (project, name, readme_url, description, created_at) "
+                    "VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(project) DO UPDATE SET "
+                    "name = excluded.name, readme_url = excluded.readme_url, description = excluded.description",
+                    (new_project.project, name, readmeUrl, description, time.time())
+                )
+                self._conn.commit()
+                self._cache.clear()
             return new_project
         except Exception as e:
             logger.error(f"Error adding project: {e}")
-            raise 
\ No newline at end of file
+            raise
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
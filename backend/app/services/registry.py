@@ -0,0 +1,452 @@
+import asyncio
+import importlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.core.metrics import family
+from app.services.admission import AdmissionController, Priority
+from app.services.conversation_store import ConversationStore
+from app.services.ingest_jobs import IngestJobManager
+from app.services.project_service import ProjectService
+from app.services.repo_crawler import available_parsers
+from app.services.upload_store import UploadStore
+
+# The SDKs behind these take seconds to import; they are loaded on first use
+# or by warm_up, so importing the app (and starting a replica) stays fast
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI, OpenAI
+    from qdrant_client import AsyncQdrantClient, QdrantClient
+    from app.services.answer_cache import AnswerCache
+    from app.services.chat_service import ChatService
+    from app.services.document_service import DocumentService
+    from app.services.embedding_cache import EmbeddingCache
+    from app.services.http_fetcher import HttpFetcher
+    from app.services.lexical_index import LexicalIndex
+    from app.services.reranker import LexicalReranker
+
+logger = logging.getLogger(__name__)
+
+# Imported in the background by warm_up, in dependency order
+WARM_UP_MODULES = ("app.services.document_service", "app.services.chat_service")
+
+class ServiceRegistry:
+    """Process-wide owner of pooled clients and the services built on top of them.
+
+    One instance lives on ``app.state`` for the lifetime of the application. HTTP
+    and Qdrant connections are shared by every service, while services are keyed
+    by OpenAI API key and kept in a small LRU so a burst of distinct keys cannot
+    grow the registry without bound.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._http_client: "Optional[httpx.Client]" = None
+        self._async_http_client: "Optional[httpx.AsyncClient]" = None
+        self._qdrant_client: "Optional[QdrantClient]" = None
+        self._async_qdrant_client: "Optional[AsyncQdrantClient]" = None
+        self._openai_clients: "OrderedDict[str, Tuple[OpenAI, AsyncOpenAI]]" = OrderedDict()
+        self._chat_services: "OrderedDict[str, ChatService]" = OrderedDict()
+        self._document_services: "OrderedDict[str, DocumentService]" = OrderedDict()
+        self._ingest_jobs: Optional[IngestJobManager] = None
+        self._embedding_cache: "Optional[EmbeddingCache]" = None
+        self._answer_cache: "Optional[AnswerCache]" = None
+        self._project_service: Optional[ProjectService] = None
+        self._lexical_index: "Optional[LexicalIndex]" = None
+        self._reranker: "Optional[LexicalReranker]" = None
+        self._http_fetcher: "Optional[HttpFetcher]" = None
+        self._upload_store: Optional[UploadStore] = None
+        self._conversation_store: Optional[ConversationStore] = None
+        self._admission: Optional[AdmissionController] = None
+        # Readiness: name -> "pending", "ok" or the last error, see warm_up
+        self._checks: Dict[str, str] = {name: "pending" for name in ("imports", "storage", "qdrant")}
+        self._started = time.monotonic()
+        self._ready_seconds: Optional[float] = None
+
+    def _http_limits(self) -> "httpx.Limits":
+        import httpx
+        return httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS
+        )
+
+    @property
+    def http_client(self) -> "httpx.Client":
+        if self._http_client is None:
+            import httpx
+            self._http_client = httpx.Client(limits=self._http_limits(), timeout=settings.HTTP_TIMEOUT)
+        return self._http_client
+
+    @property
+    def async_http_client(self) -> "httpx.AsyncClient":
+        if self._async_http_client is None:
+            import httpx
+            self._async_http_client = httpx.AsyncClient(limits=self._http_limits(), timeout=settings.HTTP_TIMEOUT)
+        return self._async_http_client
+
+    @property
+    def qdrant_client(self) -> "QdrantClient":
+        if self._qdrant_client is None:
+            from qdrant_client import QdrantClient
+            self._qdrant_client = QdrantClient(url=settings.QDRANT_URL)
+        return self._qdrant_client
+
+    @property
+    def async_qdrant_client(self) -> "AsyncQdrantClient":
+        if self._async_qdrant_client is None:
+            from qdrant_client import AsyncQdrantClient
+            self._async_qdrant_client = AsyncQdrantClient(url=settings.QDRANT_URL)
+        return self._async_qdrant_client
+
+    @property
+    def embedding_cache(self) -> "Optional[EmbeddingCache]":
+        """Embedding cache shared by ingest and query, or None when disabled"""
+        if self._embedding_cache is None and settings.EMBEDDING_CACHE_ENABLED:
+            from app.services.embedding_cache import EmbeddingCache
+            self._embedding_cache = EmbeddingCache(
+                path=settings.EMBEDDING_CACHE_PATH or str(Path(settings.DATA_DIR) / "embedding_cache.sqlite3"),
+                max_memory_items=settings.EMBEDDING_CACHE_MEMORY_ITEMS,
+                max_disk_items=settings.EMBEDDING_CACHE_DISK_ITEMS
+            )
+        return self._embedding_cache
+
+    @property
+    def answer_cache(self) -> "Optional[AnswerCache]":
+        """Answer cache shared by chat (reads) and ingest (invalidation), or None when disabled"""
+        if self._answer_cache is None and settings.ANSWER_CACHE_ENABLED:
+            from app.services.answer_cache import AnswerCache
+            self._answer_cache = AnswerCache(
+                ttl=settings.ANSWER_CACHE_TTL_SECONDS,
+                similarity_threshold=settings.ANSWER_CACHE_SIMILARITY,
+                max_entries=settings.ANSWER_CACHE_MAX_ENTRIES
+            )
+        return self._answer_cache
+
+    @property
+    def lexical_index(self) -> "LexicalIndex":
+        """BM25 index shared by ingest (writes) and chat (sparse retrieval)"""
+        if self._lexical_index is None:
+            from app.services.lexical_index import LexicalIndex
+            self._lexical_index = LexicalIndex(
+                settings.LEXICAL_INDEX_PATH or str(Path(settings.DATA_DIR) / "lexical_index.sqlite3")
+            )
+        return self._lexical_index
+
+    @property
+    def reranker(self) -> "Optional[LexicalReranker]":
+        """Reranker shared by all chat services so its score cache is too, or None when disabled"""
+        if self._reranker is None and settings.RERANK_ENABLED:
+            from app.services.reranker import LexicalReranker
+            self._reranker = LexicalReranker(
+                prior_weight=settings.RERANK_PRIOR_WEIGHT,
+                cache_size=settings.RERANK_CACHE_SIZE
+            )
+        return self._reranker
+
+    @property
+    def http_fetcher(self) -> "HttpFetcher":
+        """Document fetcher with one connection pool and conditional request cache for all ingestion"""
+        if self._http_fetcher is None:
+            from app.services.http_fetcher import create_fetcher
+            self._http_fetcher = create_fetcher()
+        return self._http_fetcher
+
+    @property
+    def conversation_store(self) -> ConversationStore:
+        """Chat histories, shared by all chat services so a session survives a change of API key"""
+        if self._conversation_store is None:
+            self._conversation_store = ConversationStore(
+                max_sessions=settings.CONVERSATION_MAX_SESSIONS,
+                ttl=settings.CONVERSATION_TTL_SECONDS,
+                window_tokens=settings.CONVERSATION_WINDOW_TOKENS,
+                summary_tokens=settings.CONVERSATION_SUMMARY_TOKENS
+            )
+        return self._conversation_store
+
+    @property
+    def admission(self) -> AdmissionController:
+        """Rate limiter for every OpenAI call, shared so chat and ingestion draw on the same limits"""
+        if self._admission is None:
+            self._admission = AdmissionController(
+                requests_per_minute=settings.OPENAI_REQUESTS_PER_MINUTE,
+                tokens_per_minute=settings.OPENAI_TOKENS_PER_MINUTE,
+                burst_seconds=settings.ADMISSION_BURST_SECONDS,
+                reserve=settings.ADMISSION_INTERACTIVE_RESERVE,
+                queue_sizes={
+                    Priority.INTERACTIVE: settings.ADMISSION_INTERACTIVE_QUEUE,
+                    Priority.BULK: settings.ADMISSION_BULK_QUEUE,
+                },
+                max_waits={Priority.INTERACTIVE: settings.ADMISSION_INTERACTIVE_MAX_WAIT, Priority.BULK: None}
+            )
+        return self._admission
+
+    @property
+    def upload_store(self) -> UploadStore:
+        """Uploaded files and the record of which contents each project has ingested"""
+        with self._lock:
+            if self._upload_store is None:
+                extensions = {extension.lower() for extension in settings.ALLOWED_EXTENSIONS} & available_parsers()
+                self._upload_store = UploadStore(settings.UPLOAD_DIR, extensions, settings.UPLOAD_MAX_FILE_BYTES)
+            return self._upload_store
+
+    @property
+    def project_service(self) -> ProjectService:
+        with self._lock:
+            if self._project_service is None:
+                self._project_service = ProjectService()
+            return self._project_service
+
+    @property
+    def ingest_jobs(self) -> IngestJobManager:
+        if self._ingest_jobs is None:
+            self._ingest_jobs = IngestJobManager()
+        return self._ingest_jobs
+
+    @staticmethod
+    def _remember(cache: OrderedDict, key: str, value) -> None:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > settings.SERVICE_CACHE_SIZE:
+            cache.popitem(last=False)
+
+    def _openai_clients_for(self, api_key: str) -> "Tuple[OpenAI, AsyncOpenAI]":
+        clients = self._openai_clients.get(api_key)
+        if clients is None:
+            from openai import AsyncOpenAI, OpenAI
+            clients = (
+                OpenAI(api_key=api_key, base_url=settings.OPENAI_BASE_URL, http_client=self.http_client),
+                AsyncOpenAI(api_key=api_key, base_url=settings.OPENAI_BASE_URL, http_client=self.async_http_client)
+            )
+        self._remember(self._openai_clients, api_key, clients)
+        return clients
+
+    def get_chat_service(self, api_key: str) -> "ChatService":
+        """Return the shared ChatService for an API key, creating it on first use"""
+        from app.services.chat_service import ChatService
+        with self._lock:
+            service = self._chat_services.get(api_key)
+            if service is None:
+                logger.info("Creating ChatService")
+                openai_client, async_openai_client = self._openai_clients_for(api_key)
+                service = ChatService(
+                    api_key=api_key,
+                    openai_client=openai_client,
+                    async_openai_client=async_openai_client,
+                    qdrant_client=self.qdrant_client,
+                    async_qdrant_client=self.async_qdrant_client,
+                    embedding_cache=self.embedding_cache,
+                    answer_cache=self.answer_cache,
+                    lexical_index=self.lexical_index,
+                    reranker=self.reranker,
+                    conversation_store=self.conversation_store,
+                    admission=self.admission
+                )
+            self._remember(self._chat_services, api_key, service)
+            return service
+
+    def get_document_service(self, api_key: str) -> "DocumentService":
+        """Return the shared DocumentService for an API key, creating it on first use"""
+        from app.services.document_service import DocumentService
+        with self._lock:
+            service = self._document_services.get(api_key)
+            if service is None:
+                logger.info("Creating DocumentService")
+                openai_client, async_openai_client = self._openai_clients_for(api_key)
+                service = DocumentService(
+                    api_key=api_key,
+                    openai_client=openai_client,
+                    async_openai_client=async_openai_client,
+                    qdrant_client=self.qdrant_client,
+                    async_qdrant_client=self.async_qdrant_client,
+                    embedding_cache=self.embedding_cache,
+                    answer_cache=self.answer_cache,
+                    lexical_index=self.lexical_index,
+                    fetcher=self.http_fetcher,
+                    admission=self.admission
+                )
+            self._remember(self._document_services, api_key, service)
+            return service
+
+    async def chat_service(self, api_key: str) -> "ChatService":
+        """``get_chat_service`` in a worker thread, for use on the event loop.
+
+        The first call imports the service modules, which ``warm_up`` may be
+        importing at the same time; waiting for the import lock on the loop
+        would stall every other request.
+        """
+        return await run_blocking(self.get_chat_service, api_key)
+
+    async def document_service(self, api_key: str) -> "DocumentService":
+        """``get_document_service`` in a worker thread, see ``chat_service``"""
+        return await run_blocking(self.get_document_service, api_key)
+
+    def _open_stores(self) -> None:
+        with self._lock:
+            self.embedding_cache
+            self.answer_cache
+            self.lexical_index
+            self.reranker
+        # These take the lock themselves
+        self.project_service
+        self.upload_store
+
+    async def warm_up(self) -> None:
+        """Do ahead of time what the first requests would otherwise wait for.
+
+        Started in the background by the application lifespan, so the server
+        accepts connections (and answers ``/health``) right away while the
+        heavy modules are imported in a thread, the local stores are opened and
+        the Qdrant collection is created or checked. Qdrant is retried until it
+        is reachable. ``readiness`` reports the progress.
+        """
+        try:
+            for name in WARM_UP_MODULES:
+                await run_blocking(importlib.import_module, name)
+            self._checks["imports"] = "ok"
+        except Exception as e:
+            logger.error(f"Importing services failed: {e}")
+            self._checks["imports"] = f"error: {e}"
+
+        try:
+            await run_blocking(self._open_stores)
+            self._checks["storage"] = "ok"
+        except Exception as e:
+            logger.error(f"Opening local stores failed: {e}")
+            self._checks["storage"] = f"error: {e}"
+
+        from app.services.collection_config import ensure_collection
+        delay = settings.WARM_UP_RETRY_SECONDS
+        while True:
+            try:
+                await ensure_collection(
+                    self.async_qdrant_client, settings.QDRANT_COLLECTION_NAME, settings.EMBEDDING_DIMENSIONS
+                )
+                self._checks["qdrant"] = "ok"
+                break
+            except ValueError as e:
+                # The collection was built for another embedder; retrying cannot fix that
+                logger.error(str(e))
+                self._checks["qdrant"] = f"error: {e}"
+                break
+            except Exception as e:
+                logger.warning(f"Qdrant is not ready, retrying in {delay:.1f}s: {e}")
+                self._checks["qdrant"] = f"error: {e}"
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, settings.WARM_UP_RETRY_MAX_SECONDS)
+
+        if self.ready:
+            self._ready_seconds = round(time.monotonic() - self._started, 3)
+            logger.info(f"Services ready {self._ready_seconds:.2f}s after start")
+
+    @property
+    def ready(self) -> bool:
+        return all(status == "ok" for status in self._checks.values())
+
+    def readiness(self) -> Dict:
+        """Whether warm_up has finished, and the state of each of its steps"""
+        return {"ready": self.ready, "checks": dict(self._checks), "ready_seconds": self._ready_seconds}
+
+    def metric_families(self) -> List[List[str]]:
+        """Counters kept by the shared caches and the fetcher, read when metrics are scraped"""
+        lookups = []
+        if self._embedding_cache is not None:
+            stats = self._embedding_cache.stats()
+            lookups += [
+                ({"cache": "embedding", "result": "memory_hit"}, stats["memory_hits"]),
+                ({"cache": "embedding", "result": "disk_hit"}, stats["disk_hits"]),
+                ({"cache": "embedding", "result": "miss"}, stats["misses"]),
+            ]
+        if self._answer_cache is not None:
+            stats = self._answer_cache.stats()
+            lookups += [
+                ({"cache": "answer", "result": "exact_hit"}, stats["exact_hits"]),
+                ({"cache": "answer", "result": "semantic_hit"}, stats["semantic_hits"]),
+                ({"cache": "answer", "result": "miss"}, stats["misses"]),
+            ]
+        if self._reranker is not None:
+            stats = self._reranker.stats()
+            lookups += [
+                ({"cache": "rerank", "result": "hit"}, stats["hits"]),
+                ({"cache": "rerank", "result": "miss"}, stats["misses"]),
+            ]
+        families = [family("docs_agent_cache_lookups_total", "counter", "Cache lookups by result", lookups)]
+
+        if self._http_fetcher is not None:
+            stats = self._http_fetcher.stats()
+            families.append(family("docs_agent_fetch_requests_total", "counter", "Document fetch requests by outcome", [
+                ({"result": "not_modified"}, stats["not_modified"]),
+                ({"result": "retried"}, stats["retries"]),
+                ({"result": "sent"}, stats["requests"]),
+            ]))
+        if self._admission is not None:
+            stats = self._admission.stats()
+            families += [
+                family("docs_agent_admission_queued", "gauge", "Model calls waiting for the rate limiter", [
+                    ({"priority": priority}, counts["queued"]) for priority, counts in stats.items()
+                ]),
+                family("docs_agent_admission_calls_total", "counter", "Model calls by rate limiter outcome", [
+                    ({"priority": priority, "result": result}, counts[result])
+                    for priority, counts in stats.items() for result in ("admitted", "rejected")
+                ]),
+            ]
+        if self._conversation_store is not None:
+            stats = self._conversation_store.stats()
+            families += [
+                family("docs_agent_conversation_sessions", "gauge", "Chat sessions in memory", [({}, stats["sessions"])]),
+                family("docs_agent_conversation_evictions_total", "counter", "Chat sessions expired or evicted", [
+                    ({}, stats["evicted"])
+                ]),
+                family("docs_agent_conversation_summaries_total", "counter", "Conversation summaries written", [
+                    ({}, stats["summaries"])
+                ]),
+            ]
+        return families
+
+    async def aclose(self) -> None:
+        """Close all pooled connections. Called from the application lifespan on shutdown"""
+        if self._ingest_jobs is not None:
+            await self._ingest_jobs.aclose()
+            self._ingest_jobs = None
+
+        if self._conversation_store is not None:
+            await self._conversation_store.aclose()
+            self._conversation_store = None
+
+        with self._lock:
+            self._chat_services.clear()
+            self._document_services.clear()
+            self._openai_clients.clear()
+
+        if self._http_fetcher is not None:
+            await self._http_fetcher.aclose()
+            self._http_fetcher = None
+        if self._qdrant_client is not None:
+            self._qdrant_client.close()
+            self._qdrant_client = None
+        if self._async_qdrant_client is not None:
+            await self._async_qdrant_client.close()
+            self._async_qdrant_client = None
+        if self._http_client is not None:
+            self._http_client.close()
+            self._http_client = None
+        if self._async_http_client is not None:
+            await self._async_http_client.aclose()
+            self._async_http_client = None
+        if self._embedding_cache is not None:
+            self._embedding_cache.close()
+            self._embedding_cache = None
+        if self._lexical_index is not None:
+            self._lexical_index.close()
+            self._lexical_index = None
+        if self._upload_store is not None:
+            self._upload_store.close()
+            self._upload_store = None
+        if self._project_service is not None:
+            self._project_service.close()
+            self._project_service = None
+        logger.info("Closed service registry connections")
@@ -0,0 +1,145 @@
+import importlib.util
+import logging
+import os
+import tarfile
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from app.services.chunker import Chunk, MarkdownChunker
+
+logger = logging.getLogger(__name__)
+
+# Dependency, build and VCS directories; hidden directories are skipped too
+SKIP_DIRS = frozenset({"node_modules", "vendor", "venv", "site-packages", "__pycache__"})
+
+@dataclass
+class RepoFile:
+    path: str  # Relative POSIX path inside the repository
+    local_path: Path
+    size: int
+
+    @property
+    def extension(self) -> str:
+        return PurePosixPath(self.path).suffix.lower().lstrip(".")
+
+@dataclass
+class CrawlResult:
+    files: List[RepoFile] = field(default_factory=list)
+    skipped: Dict[str, int] = field(default_factory=dict)  # Reason -> number of files
+
+    def skip(self, reason: str) -> None:
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+def _skipped_dir(name: str) -> bool:
+    return name.startswith(".") or name in SKIP_DIRS
+
+def _accept(result: CrawlResult, path: str, size: int, extensions: Set[str], max_bytes: int) -> bool:
+    extension = PurePosixPath(path).suffix.lower().lstrip(".")
+    if extension not in extensions:
+        return False
+    if size > max_bytes:
+        result.skip("too_large")
+        return False
+    if extension not in available_parsers():
+        result.skip(f"no_parser_{extension}")
+        return False
+    return True
+
+def discover(root: Path, extensions: Set[str], max_bytes: int) -> CrawlResult:
+    """Documentation files under a local checkout, in path order"""
+    result = CrawlResult()
+    for directory, dirs, names in os.walk(root):
+        dirs[:] = sorted(name for name in dirs if not _skipped_dir(name))
+        for name in sorted(names):
+            local_path = Path(directory) / name
+            if not local_path.is_file() or local_path.is_symlink():
+                continue
+            path = local_path.relative_to(root).as_posix()
+            size = local_path.stat().st_size
+            if _accept(result, path, size, extensions, max_bytes):
+                result.files.append(RepoFile(path, local_path, size))
+    return result
+
+def extract_archive(archive: Path, dest: Path, extensions: Set[str], max_bytes: int) -> CrawlResult:
+    """Extract the documentation files of a repository tarball into ``dest``.
+
+    GitHub archives wrap everything in one ``<repo>-<ref>/`` directory, which is
+    stripped. Only regular files with safe relative paths are extracted.
+    """
+    result = CrawlResult()
+    with tarfile.open(archive, "r:*") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            parts = PurePosixPath(member.name).parts[1:]
+            if not parts or any(part in ("", "..") for part in parts) or PurePosixPath(member.name).is_absolute():
+                continue
+            if any(_skipped_dir(part) for part in parts[:-1]):
+                continue
+            path = "/".join(parts)
+            if not _accept(result, path, member.size, extensions, max_bytes):
+                continue
+            local_path = dest.joinpath(*parts)
+            local_path.parent.mkdir(parents=True, exist_ok=True)
+            with tar.extractfile(member) as source, open(local_path, "wb") as target:
+                while data := source.read(1 << 20):
+                    target.write(data)
+            result.files.append(RepoFile(path, local_path, member.size))
+    result.files.sort(key=lambda file: file.path)
+    return result
+
+# Parsers turn a file into markdown text for the chunker
+
+def _markdown(path: Path) -> str:
+    return path.read_text(encoding="utf-8", errors="replace")
+
+def _pdf(path: Path) -> str:
+    from pypdf import PdfReader
+    pages = [page.extract_text() or "" for page in PdfReader(str(path)).pages]
+    return "\n\n".join(page.strip() for page in pages if page.strip())
+
+def _docx(path: Path) -> str:
+    import docx
+    lines = []
+    for paragraph in docx.Document(str(path)).paragraphs:
+        text = paragraph.text.strip()
+        if not text:
+            continue
+        style = paragraph.style.name if paragraph.style is not None else ""
+        level = style.removeprefix("Heading ").strip()
+        # Word headings become markdown headings so chunks keep their section path
+        lines.append(f"{'#' * min(int(level), 6)} {text}" if level.isdigit() else text)
+    return "\n\n".join(lines)
+
+# Extension -> (parser, optional module it needs)
+PARSERS: Dict[str, Tuple[Callable[[Path], str], Optional[str]]] = {
+    "md": (_markdown, None),
+    "markdown": (_markdown, None),
+    "pdf": (_pdf, "pypdf"),
+    "docx": (_docx, "docx"),  # python-docx
+}
+
+_available: Optional[Set[str]] = None
+
+def available_parsers() -> Set[str]:
+    """Extensions that can be parsed with the installed packages"""
+    global _available
+    if _available is None:
+        _available = set()
+        for extension, (_, module) in PARSERS.items():
+            if module is None or importlib.util.find_spec(module) is not None:
+                _available.add(extension)
+            else:
+                logger.warning(f"Install {module} to ingest .{extension} files; they are skipped for now")
+    return _available
+
+def parse_file(local_path: str, extension: str, chunk_options: Tuple[int, int, int, int]) -> List[Chunk]:
+    """Parse and chunk one file. Runs in a worker process, so it only takes picklable arguments"""
+    parser, _ = PARSERS[extension]
+    text = parser(Path(local_path))
+    return MarkdownChunker(*chunk_options).chunk(text)
+
+def chunk_options(chunker: Optional[MarkdownChunker] = None) -> Tuple[int, int, int, int]:
+    """Chunker settings of this process, passed to workers that may see different settings"""
+    chunker = chunker or MarkdownChunker()
+    return chunker.target_tokens, chunker.max_tokens, chunker.overlap_tokens, chunker.min_tokens
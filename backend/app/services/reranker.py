@@ -0,0 +1,111 @@
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from app.core.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+TERM_RE = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or say says "
+    "should that the this to what when where which who why will with you your".split()
+)
+
+def query_terms(query: str) -> List[str]:
+    terms = [term for term in TERM_RE.findall(query.lower()) if term not in STOPWORDS]
+    return list(dict.fromkeys(terms)) or list(dict.fromkeys(TERM_RE.findall(query.lower())))
+
+def trim_to_budget(results: List[Dict], budget: int) -> List[Dict]:
+    """Keep results in order while their contents fit in ``budget`` tokens; the first always stays"""
+    kept = []
+    used = 0
+    for result in results:
+        tokens = estimate_tokens(result["content"])
+        if kept and used + tokens > budget:
+            break
+        kept.append(result)
+        used += tokens
+    return kept
+
+class LexicalReranker:
+    """Reorders retrieved candidates by query-term overlap, scored with NumPy.
+
+    Candidates are scored with BM25 over the candidate set itself (term
+    frequencies saturate, long passages are normalized, and terms rare among
+    the candidates weigh most), multiplied by the fraction of distinct query
+    terms the passage covers. The result is blended with the first-stage rank
+    so a strong retrieval signal is not discarded. Scores are cached per query
+    and candidate set, since the agent often repeats its own searches.
+    """
+
+    def __init__(self, prior_weight: float = 0.3, cache_size: int = 1024, k1: float = 1.2, b: float = 0.75):
+        self.prior_weight = prior_weight
+        self.cache_size = cache_size
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def score(self, query: str, passages: Sequence[str]) -> np.ndarray:
+        """Lexical relevance of each passage to the query, scaled to [0, 1]"""
+        terms = query_terms(query)
+        if not terms or not passages:
+            return np.zeros(len(passages), dtype=np.float32)
+
+        vocabulary = {term: i for i, term in enumerate(terms)}
+        counts = np.zeros((len(passages), len(terms)), dtype=np.float32)
+        lengths = np.empty(len(passages), dtype=np.float32)
+        for row, passage in enumerate(passages):
+            ids = [vocabulary.get(token, -1) for token in TERM_RE.findall(passage.lower())]
+            lengths[row] = len(ids)
+            ids = np.asarray(ids, dtype=np.int64)
+            counts[row] = np.bincount(ids[ids >= 0], minlength=len(terms))
+
+        document_frequency = (counts > 0).sum(axis=0)
+        idf = np.log1p((len(passages) - document_frequency + 0.5) / (document_frequency + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * lengths / max(lengths.mean(), 1.0))
+        bm25 = (counts * (self.k1 + 1) / (counts + norm[:, None])) @ idf
+        coverage = (counts > 0).mean(axis=1)
+        scores = bm25 * coverage
+        top = scores.max()
+        return scores / top if top > 0 else scores
+
+    def _cached_score(self, query: str, results: List[Dict]) -> np.ndarray:
+        key = (" ".join(query.lower().split()), tuple(result["id"] for result in results))
+        with self._lock:
+            scores = self._cache.get(key)
+            if scores is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return scores
+        scores = self.score(query, [result["content"] for result in results])
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = scores
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return scores
+
+    def rerank(self, query: str, results: List[Dict]) -> List[Dict]:
+        """Return ``results`` (best first from the first stage) reordered by the blended score"""
+        if len(results) < 2:
+            return results
+        lexical = self._cached_score(query, results)
+        prior = 1.0 - np.arange(len(results), dtype=np.float32) / len(results)
+        blended = (1 - self.prior_weight) * lexical + self.prior_weight * prior
+        order = np.argsort(-blended, kind="stable")
+        return [{**results[i], "rerank_score": float(blended[i])} for i in order]
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,324 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from agno.document import Document
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.services.collection_config import ensure_collection
+from app.services.embedders import LexicalHashingEmbedder
+from app.services.ingest_pipeline import SCROLL_PAGE_SIZE
+from app.services.lexical_index import LexicalIndex
+from app.services.project_service import ProjectService
+from app.services.registry import ServiceRegistry
+
+logger = logging.getLogger(__name__)
+
+# File layout: a preamble starting with MAGIC, the vectors as one row-major
+# little-endian float32 matrix, one JSON line per point with its id and
+# payload (in the same order as the rows), a JSON footer with the header,
+# and the trailer: the footer's length and MAGIC again. The footer comes last
+# so export can stream points without knowing their count up front.
+MAGIC = b"WDSNAP\x00\x01"  # The last byte is the format version
+PREAMBLE_SIZE = 64  # Keeps the vector matrix aligned for memory mapping
+TRAILER = struct.Struct("<Q8s")
+VECTOR_DTYPE = np.dtype("<f4")
+
+IMPORT_BATCH_SIZE = 256  # Points per upsert request
+IMPORT_CONCURRENCY = 4  # Upserts in flight
+
+def embedder_identity() -> Dict:
+    """Backend, model and vector size of the configured embedder; vectors are only comparable within one"""
+    backend = settings.EMBEDDER_BACKEND
+    model = settings.EMBEDDING_MODEL if backend == "openai" else LexicalHashingEmbedder.id
+    return {"backend": backend, "model": model, "dimensions": settings.EMBEDDING_DIMENSIONS}
+
+def check_compatible(header: Dict) -> None:
+    """Fail unless the snapshot's vectors come from the configured embedder"""
+    expected = embedder_identity()
+    found = header["embedder"]
+    if found != expected:
+        raise ValueError(
+            f"Snapshot vectors come from {found['backend']} embedder {found['model']} "
+            f"({found['dimensions']} dimensions) but this deployment embeds queries with "
+            f"{expected['backend']} embedder {expected['model']} ({expected['dimensions']} dimensions); "
+            f"set EMBEDDER_BACKEND, EMBEDDING_MODEL and EMBEDDING_DIMENSIONS to match or re-ingest"
+        )
+
+class SnapshotWriter:
+    """Streams points into a snapshot file.
+
+    Vectors go straight into the file and payloads into a side file that is
+    appended on ``finish``. Both are written under temporary names, so an
+    interrupted export never leaves a truncated snapshot at ``path``.
+    """
+
+    def __init__(self, path: str, dimensions: int):
+        self.path = Path(path)
+        self.dimensions = dimensions
+        self.count = 0
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._records_path = self.path.with_name(self.path.name + ".records.tmp")
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(MAGIC.ljust(PREAMBLE_SIZE, b"\x00"))
+        self._records = open(self._records_path, "wb")
+
+    def write(self, ids: List, vectors: List[List[float]], payloads: List[Dict]) -> None:
+        if not ids:
+            return
+        matrix = np.asarray(vectors, dtype=VECTOR_DTYPE)
+        if matrix.shape != (len(ids), self.dimensions):
+            raise ValueError(f"Expected {len(ids)} vectors of {self.dimensions} dimensions, got shape {matrix.shape}")
+        self._file.write(matrix.tobytes())
+        self._records.writelines(
+            json.dumps({"id": point_id, "payload": payload}, ensure_ascii=False).encode() + b"\n"
+            for point_id, payload in zip(ids, payloads)
+        )
+        self.count += len(ids)
+
+    def finish(self, header: Dict) -> Dict:
+        """Append payloads and footer and move the file into place; returns the full header"""
+        records_offset = self._file.tell()
+        self._records.close()
+        with open(self._records_path, "rb") as records:
+            shutil.copyfileobj(records, self._file, length=1 << 20)
+        header = {
+            **header,
+            "count": self.count,
+            "dimensions": self.dimensions,
+            "vectors_offset": PREAMBLE_SIZE,
+            "records_offset": records_offset,
+        }
+        footer = json.dumps(header, ensure_ascii=False).encode()
+        self._file.write(footer)
+        self._file.write(TRAILER.pack(len(footer), MAGIC))
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        self._records_path.unlink()
+        return header
+
+    def abort(self) -> None:
+        self._file.close()
+        self._records.close()
+        self._tmp_path.unlink(missing_ok=True)
+        self._records_path.unlink(missing_ok=True)
+
+class Snapshot:
+    """Read side of a snapshot file: the header, memory-mapped vectors and chunked records"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a snapshot of this format version")
+            f.seek(-TRAILER.size, os.SEEK_END)
+            footer_length, magic = TRAILER.unpack(f.read(TRAILER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} is truncated")
+            f.seek(-TRAILER.size - footer_length, os.SEEK_END)
+            self.header: Dict = json.loads(f.read(footer_length))
+
+        self.count: int = self.header["count"]
+        self.dimensions: int = self.header["dimensions"]
+        if self.count:
+            self.vectors = np.memmap(
+                self.path, dtype=VECTOR_DTYPE, mode="r",
+                offset=self.header["vectors_offset"], shape=(self.count, self.dimensions)
+            )
+        else:
+            self.vectors = np.empty((0, self.dimensions), dtype=VECTOR_DTYPE)
+
+    def chunks(self, size: int) -> Iterator[Tuple[List, List[List[float]], List[Dict]]]:
+        """Ids, vectors and payloads of ``size`` points at a time; only one chunk is held in memory"""
+        with open(self.path, "rb") as f:
+            f.seek(self.header["records_offset"])
+            for start in range(0, self.count, size):
+                end = min(start + size, self.count)
+                records = [json.loads(f.readline()) for _ in range(end - start)]
+                yield (
+                    [record["id"] for record in records],
+                    self.vectors[start:end].tolist(),
+                    [record["payload"] for record in records]
+                )
+
+async def _collection_dimensions(client: AsyncQdrantClient, collection: str) -> int:
+    if not await client.collection_exists(collection):
+        raise ValueError(f"Collection {collection} does not exist")
+    vectors = (await client.get_collection(collection)).config.params.vectors
+    size = getattr(vectors, "size", None)
+    if size is None:
+        raise ValueError(f"Collection {collection} has named vectors, which snapshots do not support")
+    return size
+
+async def export_snapshot(
+    client: AsyncQdrantClient,
+    collection: str,
+    projects: ProjectService,
+    path: str,
+    page_size: int = SCROLL_PAGE_SIZE
+) -> Dict:
+    """Write every point of ``collection`` and the project list to a snapshot file.
+
+    Points are scrolled a page at a time, so memory use does not grow with the
+    collection. Points written while the export runs may or may not be included.
+    """
+    start = time.perf_counter()
+    dimensions = await _collection_dimensions(client, collection)
+    embedder = embedder_identity()
+    if dimensions != embedder["dimensions"]:
+        raise ValueError(
+            f"Collection {collection} stores {dimensions}-dimensional vectors but EMBEDDING_DIMENSIONS "
+            f"is {embedder['dimensions']}; export with the settings the collection was built with"
+        )
+
+    writer = SnapshotWriter(path, dimensions)
+    try:
+        offset = None
+        while True:
+            points, offset = await client.scroll(
+                collection_name=collection,
+                limit=page_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            await run_blocking(
+                writer.write,
+                [point.id for point in points],
+                [point.vector for point in points],
+                [point.payload or {} for point in points]
+            )
+            if offset is None:
+                break
+        header = await run_blocking(writer.finish, {
+            "created_at": time.time(),
+            "collection": collection,
+            "embedder": embedder,
+            "projects": [project.model_dump() for project in projects.get_projects()],
+        })
+    except BaseException:
+        writer.abort()
+        raise
+
+    seconds = time.perf_counter() - start
+    logger.info(f"Exported {header['count']} points of {collection} to {path} in {seconds:.1f}s")
+    return {"points": header["count"], "projects": len(header["projects"]), "seconds": round(seconds, 2)}
+
+async def _restore_chunk(
+    client: AsyncQdrantClient,
+    collection: str,
+    lexical_index: Optional[LexicalIndex],
+    ids: List,
+    vectors: List[List[float]],
+    payloads: List[Dict]
+) -> None:
+    await client.upsert(
+        collection_name=collection,
+        points=models.Batch(ids=ids, vectors=vectors, payloads=payloads),
+        wait=True,
+    )
+    if lexical_index is None:
+        return
+    by_url: Dict[str, List[Document]] = {}
+    for point_id, payload in zip(ids, payloads):
+        meta_data = payload.get("meta_data") or {}
+        by_url.setdefault(meta_data.get("url", ""), []).append(Document(
+            id=str(point_id),
+            name=payload.get("name"),
+            content=payload.get("content", ""),
+            meta_data=meta_data
+        ))
+    for url, documents in by_url.items():
+        await run_blocking(lexical_index.add, url, documents)
+
+async def import_snapshot(
+    client: AsyncQdrantClient,
+    collection: str,
+    projects: ProjectService,
+    path: str,
+    lexical_index: Optional[LexicalIndex] = None,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    concurrency: int = IMPORT_CONCURRENCY
+) -> Dict:
+    """Restore a snapshot into ``collection``, creating it if needed, and register its projects.
+
+    Fails before writing anything if the snapshot was made with another
+    embedder. Chunks are read from the file in a worker thread while up to
+    ``concurrency`` upserts are in flight, and the lexical index is rebuilt
+    from the payloads along the way. Points are upserted by id, so importing
+    into a collection that already has some of them is safe.
+    """
+    start = time.perf_counter()
+    snapshot = Snapshot(path)
+    check_compatible(snapshot.header)
+    await ensure_collection(client, collection, snapshot.dimensions)
+
+    chunks = snapshot.chunks(batch_size)
+    pending = set()
+    try:
+        while True:
+            chunk = await run_blocking(next, chunks, None)
+            if chunk is None:
+                break
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+            pending.add(asyncio.create_task(_restore_chunk(client, collection, lexical_index, *chunk)))
+        await asyncio.gather(*pending)
+    finally:
+        for task in pending:
+            task.cancel()
+        chunks.close()
+
+    for project in snapshot.header["projects"]:
+        projects.add_project(project["name"], project["readmeUrl"], project["description"])
+
+    seconds = time.perf_counter() - start
+    logger.info(f"Imported {snapshot.count} points from {path} into {collection} in {seconds:.1f}s")
+    return {"points": snapshot.count, "projects": len(snapshot.header["projects"]), "seconds": round(seconds, 2)}
+
+async def _run(args) -> Dict:
+    if args.command == "info":
+        return {key: value for key, value in Snapshot(args.path).header.items() if key != "projects"}
+
+    registry = ServiceRegistry()
+    try:
+        if args.command == "export":
+            return await export_snapshot(
+                registry.async_qdrant_client, settings.QDRANT_COLLECTION_NAME, registry.project_service, args.path
+            )
+        return await import_snapshot(
+            registry.async_qdrant_client,
+            settings.QDRANT_COLLECTION_NAME,
+            registry.project_service,
+            args.path,
+            lexical_index=registry.lexical_index,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency
+        )
+    finally:
+        await registry.aclose()
+
+def main():
+    """Command line entry point: ``python -m app.services.snapshot export|import|info PATH``"""
+    parser = argparse.ArgumentParser(description="Export or import the indexed corpus as a snapshot file")
+    parser.add_argument("command", choices=("export", "import", "info"))
+    parser.add_argument("path")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="Points per upsert on import")
+    parser.add_argument("--concurrency", type=int, default=IMPORT_CONCURRENCY, help="Upserts in flight on import")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(asyncio.run(_run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
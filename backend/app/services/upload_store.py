@@ -0,0 +1,237 @@
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from hashlib import sha256
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Set
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+def clean_filename(filename: str) -> str:
+    """Relative POSIX path of an uploaded file, without empty, ``.`` or ``..`` parts"""
+    parts = [part for part in filename.replace("\\", "/").split("/") if part not in ("", ".", "..")]
+    return "/".join(parts)
+
+@dataclass
+class StoredUpload:
+    filename: str
+    project: str
+    size: int = 0
+    sha256: Optional[str] = None
+    path: Optional[Path] = None  # Content-addressed copy in the upload directory
+    status: str = "queued"  # queued, duplicate or rejected
+    detail: Optional[str] = None
+
+    @property
+    def url(self) -> str:
+        return f"upload://{self.project}/{self.filename}"
+
+    @property
+    def extension(self) -> str:
+        return PurePosixPath(self.filename).suffix.lower().lstrip(".")
+
+class UploadStore:
+    """Content-addressed storage for uploaded documents.
+
+    Files are kept once per content hash under ``objects/``, whatever their name
+    or project. A SQLite table records which contents each project has queued
+    or ingested, so re-uploading a file that is already there costs no parsing
+    or embedding. Uploading changed content under the same name replaces the
+    previous version, since both map to the same document URL.
+    """
+
+    def __init__(self, directory: str, extensions: Set[str], max_file_bytes: int):
+        self.directory = Path(directory)
+        self.objects = self.directory / "objects"
+        self.incoming = self.directory / "incoming"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.incoming.mkdir(parents=True, exist_ok=True)
+        self.extensions = {extension.lower() for extension in extensions}
+        self.max_file_bytes = max_file_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.directory / "uploads.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            "project TEXT NOT NULL, sha256 TEXT NOT NULL, filename TEXT NOT NULL, size INTEGER NOT NULL, "
+            "status TEXT NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (project, sha256))"
+        )
+        self._conn.commit()
+
+    def receiver(self, boundary: bytes, project: str, force: bool = False) -> "MultipartReceiver":
+        return MultipartReceiver(self, boundary, project, force)
+
+    def claim(self, upload: StoredUpload, force: bool) -> Optional[str]:
+        """Record ``upload`` as queued; returns the name it duplicates if its content is already there"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT filename, status FROM uploads WHERE project = ? AND sha256 = ?",
+                (upload.project, upload.sha256)
+            ).fetchone()
+            if row is not None and row[1] != "error" and not force:
+                return row[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO uploads (project, sha256, filename, size, status, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?)",
+                (upload.project, upload.sha256, upload.filename, upload.size, time.time())
+            )
+            self._conn.commit()
+        return None
+
+    def mark(self, upload: StoredUpload, status: str) -> None:
+        """Record the outcome of ingesting ``upload``: ingested or error"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE uploads SET status = ?, updated_at = ? WHERE project = ? AND sha256 = ?",
+                (status, time.time(), upload.project, upload.sha256)
+            )
+            if status == "ingested":
+                # Earlier contents of the same file were replaced in the index
+                self._conn.execute(
+                    "DELETE FROM uploads WHERE project = ? AND filename = ? AND sha256 != ?",
+                    (upload.project, upload.filename, upload.sha256)
+                )
+            self._conn.commit()
+
+    def forget(self, upload: StoredUpload) -> None:
+        """Drop the record of an upload that will not be ingested"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM uploads WHERE project = ? AND sha256 = ? AND status = 'queued'",
+                (upload.project, upload.sha256)
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class MultipartReceiver:
+    """Writes the files of a multipart/form-data body to the upload store as it arrives.
+
+    Each part is hashed and written to disk chunk by chunk, so memory use does
+    not depend on the file sizes. Feed the body with ``write`` and call
+    ``finish``; both block on disk I/O and are meant for a worker thread.
+    Fields without a filename are ignored.
+    """
+
+    def __init__(self, store: UploadStore, boundary: bytes, project: str, force: bool):
+        self.store = store
+        self.project = project
+        self.force = force
+        self.uploads: List[StoredUpload] = []
+        self._headers: Dict[bytes, bytes] = {}
+        self._field = b""
+        self._value = b""
+        self._current: Optional[StoredUpload] = None
+        self._file = None
+        self._temp: Optional[Path] = None
+        self._hash = None
+        self._parser = MultipartParser(boundary, callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def write(self, chunk: bytes) -> None:
+        self._parser.write(chunk)
+
+    def finish(self) -> List[StoredUpload]:
+        self._parser.finalize()
+        if self._current is not None:
+            raise ValueError("Multipart body ended in the middle of a file")
+        # Two files with one name map to one document; the last one wins
+        latest = {upload.filename: upload for upload in self.uploads if upload.status == "queued"}
+        for upload in self.uploads:
+            if upload.status == "queued" and latest[upload.filename] is not upload:
+                upload.status, upload.detail = "rejected", "Replaced by a later file with the same name"
+                self.store.forget(upload)
+        return self.uploads
+
+    def abort(self) -> None:
+        """Clean up after an error: nothing of an unfinished body is ingested"""
+        self._discard()
+        for upload in self.uploads:
+            if upload.status == "queued":
+                self.store.forget(upload)
+
+    # Parser callbacks
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._field.lower()] = self._value
+        self._field, self._value = b"", b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        filename = options.get(b"filename")
+        if filename is None:
+            return
+        upload = StoredUpload(filename=clean_filename(filename.decode("utf-8", "replace")), project=self.project)
+        self._current = upload
+        if not upload.filename or upload.extension not in self.store.extensions:
+            upload.status, upload.detail = "rejected", f"Allowed extensions: {sorted(self.store.extensions)}"
+            return
+        self._temp = self.store.incoming / uuid.uuid4().hex
+        self._file = open(self._temp, "wb")
+        self._hash = sha256()
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        upload = self._current
+        if upload is None or self._file is None:
+            return
+        upload.size += end - start
+        if upload.size > self.store.max_file_bytes:
+            upload.status, upload.detail = "rejected", f"Larger than {self.store.max_file_bytes} bytes"
+            self._discard()
+            return
+        chunk = data[start:end]
+        self._file.write(chunk)
+        self._hash.update(chunk)
+
+    def _on_part_end(self) -> None:
+        upload = self._current
+        if upload is None:
+            return
+        self._current = None
+        self.uploads.append(upload)
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        upload.sha256 = self._hash.hexdigest()
+        upload.path = self.store.objects / f"{upload.sha256}.{upload.extension}"
+        if upload.path.exists():
+            self._temp.unlink()
+        else:
+            self._temp.replace(upload.path)
+        self._temp = None
+
+        duplicate = self.store.claim(upload, self.force)
+        if duplicate is not None:
+            upload.status, upload.detail = "duplicate", f"Same content as {duplicate}"
+
+    def _discard(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._temp is not None:
+            self._temp.unlink(missing_ok=True)
+            self._temp = None
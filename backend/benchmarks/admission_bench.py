@@ -0,0 +1,146 @@
+"""Chat latency under a large import, with the OpenAI rate limiter in the way.
+
+Runs the app in-process against the fake OpenAI server with a tight request
+rate limit. Chat queries arrive at a steady rate, first alone and then while
+an upload of ``--docs`` documents is embedding. With priorities, chat calls
+go ahead of queued embedding calls and bulk work leaves the reserved share of
+the buckets alone, so chat latency should barely move while the import takes
+longer. ``--fifo`` serves every call in one class for comparison.
+
+Run from ``backend/``::
+
+    python -m benchmarks.admission_bench --docs 300 --rpm 600
+    python -m benchmarks.admission_bench --docs 300 --rpm 600 --fifo
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+
+import httpx
+from benchmarks.crawl_bench import make_repo
+from benchmarks.e2e_bench import DEFAULT_FILE, percentiles, use_memory_qdrant, wait_for_job, wait_for_ready
+from benchmarks.fake_openai import FakeOpenAI
+from app.core.config import settings
+from app.services.admission import AdmissionController, Priority
+
+class FifoController(AdmissionController):
+    """Same limits, but chat waits in line with ingestion"""
+
+    async def acquire(self, priority: Priority, tokens: float) -> None:
+        await super().acquire(Priority.BULK, tokens)
+
+async def chat_load(client: httpx.AsyncClient, queries: int, rate: float, tag: str) -> Dict:
+    latencies: List[float] = []
+    rejected = 0
+
+    async def ask(i: int):
+        nonlocal rejected
+        start = time.perf_counter()
+        response = await client.post("/api/chat/query", json={"query": f"{tag} question {i} about part {i % 7}"})
+        if response.status_code == 503:
+            rejected += 1
+            return
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+    tasks = []
+    for i in range(queries):
+        tasks.append(asyncio.create_task(ask(i)))
+        await asyncio.sleep(1 / rate)
+    await asyncio.gather(*tasks)
+    return {"queries": queries, "rejected": rejected, **(percentiles(latencies) if len(latencies) > 1 else {})}
+
+async def run(args) -> None:
+    text = args.file.read_text(encoding="utf-8")
+    with tempfile.TemporaryDirectory(prefix="admission-") as tmp:
+        repo = Path(tmp) / "corpus"
+        make_repo(repo, text, args.docs)
+        files = [
+            ("files", (path.relative_to(repo).as_posix(), path.read_bytes()))
+            for path in sorted(repo.rglob("*.md")) if "node_modules" not in path.parts
+        ]
+        openai = await FakeOpenAI(
+            latency=args.completion_latency, embedding_latency=args.embedding_latency, search_first=True
+        ).start()
+
+        settings.OPENAI_BASE_URL = openai.base_url
+        settings.DATA_DIR = tmp
+        settings.UPLOAD_DIR = str(Path(tmp) / "uploads")
+        settings.ANSWER_CACHE_ENABLED = False
+        settings.EMBEDDING_CACHE_ENABLED = False
+        settings.QDRANT_COLLECTION_NAME = "admission_bench"
+        settings.OPENAI_REQUESTS_PER_MINUTE = args.rpm
+        settings.OPENAI_TOKENS_PER_MINUTE = 0
+        # Small batches, so the import is many embedding calls competing with chat
+        settings.EMBED_BATCH_SIZE = 4
+
+        from app.main import app, lifespan
+
+        async with lifespan(app):
+            registry = app.state.registry
+            use_memory_qdrant(registry)
+            if args.fifo:
+                limiter = registry.admission
+                registry._admission = FifoController(
+                    requests_per_minute=args.rpm,
+                    tokens_per_minute=0,
+                    burst_seconds=settings.ADMISSION_BURST_SECONDS,
+                    reserve=0.0,
+                    queue_sizes=limiter.queue_sizes,
+                    max_waits={Priority.BULK: None}
+                )
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+                await wait_for_ready(client)
+                alone = await chat_load(client, args.queries, args.rate, "alone")
+
+                start = time.perf_counter()
+                response = await client.post("/api/documents/upload", params={"project": "bench/upload"}, files=files)
+                response.raise_for_status()
+                job = asyncio.create_task(wait_for_job(client, response.json()["job_id"]))
+                # Let the embedding queue fill up before chat arrives
+                await asyncio.sleep(1.0)
+                during = await chat_load(client, args.queries, args.rate, "during")
+                finished = await job
+                import_seconds = time.perf_counter() - start
+                stats = registry.admission.stats()
+
+        await openai.stop()
+
+    print(f"{'FIFO' if args.fifo else 'priority'} admission, {args.rpm} requests/min, "
+          f"{args.queries} queries at {args.rate}/s, {args.docs} docs\n")
+    for name, result in (("chat alone", alone), ("chat during import", during)):
+        if "p50_ms" in result:
+            print(f"{name:<20} p50 {result['p50_ms']:>8.0f} ms  p95 {result['p95_ms']:>8.0f} ms  "
+                  f"max {result['max_ms']:>8.0f} ms  {result['rejected']} rejected")
+        else:
+            print(f"{name:<20} all {result['rejected']} rejected")
+    print(f"{'import':<20} {finished['completed']} docs in {import_seconds:.1f}s, {finished['failed']} failed")
+    for priority, counts in stats.items():
+        print(f"{priority:<20} {counts['admitted']} admitted, {counts['rejected']} rejected")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", type=Path, default=DEFAULT_FILE, help="Source of the synthetic corpus")
+    parser.add_argument("--docs", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--rate", type=float, default=2.0, help="Chat queries per second")
+    parser.add_argument("--rpm", type=int, default=600, help="OpenAI requests per minute")
+    parser.add_argument("--completion-latency", type=float, default=0.2)
+    parser.add_argument("--embedding-latency", type=float, default=0.05)
+    parser.add_argument("--fifo", action="store_true", help="Serve chat and ingestion in one class")
+    args = parser.parse_args()
+    for name in ("httpx", "aiohttp.access"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Load test for the chat path.
+
+Fires concurrent requests at ``/api/chat/chat`` against a fake OpenAI server
+with a fixed completion latency while probing ``/health``. If the chat path
+blocks the event loop, requests serialize (wall time ~ requests x latency)
+and health probes stall for a full completion; if it is async they overlap.
+
+The first request is sent while the service registry is still warming up, so
+a chat path that imports the heavy modules on the event loop shows up as a
+gap between health probes. The concurrent requests are timed once ``/ready``
+succeeds. ``tests/test_chat_load.py`` runs this in a fresh interpreter.
+
+Run from ``backend/``::
+
+    python -m benchmarks.chat_load --requests 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-load-test")
+os.environ.setdefault("OPENROUTER_API_KEY", "load-test")
+
+import httpx
+from benchmarks.e2e_bench import use_memory_qdrant
+from benchmarks.fake_openai import FakeOpenAI
+from app.core.config import settings
+
+async def run(num_requests: int, latency: float) -> bool:
+    fake = await FakeOpenAI(latency=latency).start()
+    settings.OPENAI_BASE_URL = fake.base_url
+    settings.EMBEDDING_CACHE_ENABLED = False
+    settings.ANSWER_CACHE_ENABLED = False
+
+    from app.main import app, lifespan
+
+    health_latencies = []
+    probe_starts = []
+    done = asyncio.Event()
+
+    async with lifespan(app):
+        use_memory_qdrant(app.state.registry)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=120) as client:
+
+            async def chat(i: int) -> float:
+                start = time.perf_counter()
+                response = await client.post("/api/chat/chat", json={"message": f"question {i}"})
+                response.raise_for_status()
+                return time.perf_counter() - start
+
+            async def probe_health():
+                while not done.is_set():
+                    start = time.perf_counter()
+                    probe_starts.append(start)
+                    await client.get("/health")
+                    health_latencies.append(time.perf_counter() - start)
+                    await asyncio.sleep(0.02)
+
+            prober = asyncio.create_task(probe_health())
+            # Cold: waits for the service modules, which warm-up is importing
+            cold = await chat(-1)
+            while (await client.get("/ready")).status_code != 200:
+                await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            latencies = await asyncio.gather(*[chat(i) for i in range(num_requests)])
+            wall = time.perf_counter() - start
+            done.set()
+            await prober
+
+    await fake.stop()
+
+    # A stall can fall between probes, so the gap between their starts counts too
+    max_gap = max(later - earlier for earlier, later in zip(probe_starts, probe_starts[1:]))
+    serial = sum(latencies)
+    overlap = serial / wall if wall else 0.0
+    print(f"requests:            {num_requests}")
+    print(f"completion latency:  {latency:.3f}s")
+    print(f"wall time:           {wall:.3f}s")
+    print(f"sum of latencies:    {serial:.3f}s")
+    print(f"overlap factor:      {overlap:.1f}x")
+    print(f"request p50:         {statistics.median(latencies):.3f}s")
+    print(f"cold request:        {cold:.3f}s")
+    print(f"/health max latency: {max(health_latencies):.3f}s over {len(health_latencies)} probes")
+    print(f"/health max gap:     {max_gap:.3f}s")
+
+    # Serialized requests would take num_requests * latency; require at least 4x better
+    passed = wall < num_requests * latency / 4 and max(health_latencies) < latency and max_gap < latency
+    print("PASS: requests overlapped" if passed else "FAIL: requests did not overlap")
+    return passed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake completion latency in seconds")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args.requests, args.latency)) else 1)
+
+if __name__ == "__main__":
+    main()
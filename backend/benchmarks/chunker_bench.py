@@ -0,0 +1,117 @@
+"""Chunker benchmark: MarkdownChunker against the legacy h1/h2/h3 splitter.
+
+Reports throughput, chunk-size distribution in tokens, how much of the input
+text survives chunking, and whether code fences come out intact. The legacy
+splitter renders markdown to HTML and keeps only headings and paragraphs, so
+code, lists and tables are lost and section size is unbounded.
+
+Run from ``backend/``::
+
+    python -m benchmarks.chunker_bench --file ../testdata/bosch.md --repeat 20
+"""
+import argparse
+import os
+import re
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+
+import markdown
+from bs4 import BeautifulSoup
+from app.core.config import settings
+from app.core.tokens import estimate_tokens
+from app.services.chunker import MarkdownChunker
+
+DEFAULT_FILE = Path(__file__).resolve().parents[2] / "testdata" / "bosch.md"
+WORD_RE = re.compile(r"\w+")
+
+def legacy_split(content: str) -> List[str]:
+    """The section splitter DocumentService.process_markdown used before MarkdownChunker"""
+    soup = BeautifulSoup(markdown.markdown(content), "html.parser")
+    sections = []
+    current = ""
+    for element in soup.find_all(["h1", "h2", "h3", "p"]):
+        if element.name in ["h1", "h2", "h3"]:
+            if current:
+                sections.append(current)
+            current = element.get_text()
+        else:
+            current += "\n" + element.get_text()
+    if current:
+        sections.append(current)
+    return sections
+
+def chunker_split(content: str) -> List[str]:
+    return [chunk.content for chunk in MarkdownChunker().chunk(content)]
+
+def percentile(values: List[int], q: float) -> int:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def measure(split: Callable[[str], List[str]], content: str, repeat: int) -> Dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = split(content)
+        timings.append(time.perf_counter() - start)
+
+    tokens = [estimate_tokens(chunk) for chunk in chunks]
+    input_words = set(WORD_RE.findall(content))
+    output_words = set(WORD_RE.findall("\n".join(chunks)))
+    seconds = statistics.median(timings)
+    return {
+        "chunks": len(chunks),
+        "seconds": seconds,
+        "mb_per_s": len(content.encode()) / 1e6 / seconds if seconds else 0.0,
+        "tokens_total": sum(tokens),
+        "tokens_min": min(tokens) if tokens else 0,
+        "tokens_p50": percentile(tokens, 0.5) if tokens else 0,
+        "tokens_p95": percentile(tokens, 0.95) if tokens else 0,
+        "tokens_max": max(tokens) if tokens else 0,
+        "over_max": sum(1 for t in tokens if t > settings.CHUNK_MAX_TOKENS),
+        "word_coverage": len(input_words & output_words) / len(input_words) if input_words else 1.0,
+        "broken_fences": sum(1 for chunk in chunks if chunk.count("```") % 2),
+        "input_fences": content.count("```") // 2,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", type=Path, default=DEFAULT_FILE)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    content = args.file.read_text(encoding="utf-8")
+    print(f"input: {args.file} ({len(content.encode()) / 1e3:.1f} kB, ~{estimate_tokens(content)} tokens)")
+    print(
+        f"chunker: target={settings.CHUNK_TARGET_TOKENS} max={settings.CHUNK_MAX_TOKENS} "
+        f"overlap={settings.CHUNK_OVERLAP_TOKENS} min={settings.CHUNK_MIN_TOKENS}"
+    )
+
+    results = {
+        "legacy": measure(legacy_split, content, args.repeat),
+        "chunker": measure(chunker_split, content, args.repeat),
+    }
+    rows = [
+        ("chunks", "{}"),
+        ("seconds", "{:.4f}"),
+        ("mb_per_s", "{:.2f}"),
+        ("tokens_total", "{}"),
+        ("tokens_min", "{}"),
+        ("tokens_p50", "{}"),
+        ("tokens_p95", "{}"),
+        ("tokens_max", "{}"),
+        ("over_max", "{}"),
+        ("word_coverage", "{:.3f}"),
+        ("broken_fences", "{}"),
+        ("input_fences", "{}"),
+    ]
+    print(f"{'':<15}{'legacy':>12}{'chunker':>12}")
+    for name, fmt in rows:
+        print(f"{name:<15}{fmt.format(results['legacy'][name]):>12}{fmt.format(results['chunker'][name]):>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Repository crawl benchmark: whole-repository ingestion throughput.
+
+Generates a repository with ``--files`` markdown documents (sections of a
+markdown file with unique text each) spread over ``docs/`` directories, plus
+source files and a ``node_modules`` tree that must be skipped. It is ingested
+with ``DocumentService.process_repository`` twice:
+
+* ``local``: from the checkout directory;
+* ``tarball``: packed as a GitHub archive and served by the fake GitHub server,
+  downloaded, extracted and crawled.
+
+Each run reports files/s and MB/s end to end. Parsing uses the process pool
+when it has more than one worker (``--workers``), in-process threads otherwise.
+Embeddings come from the lexical hashing embedder and Qdrant runs in memory.
+
+Run from ``backend/``::
+
+    python -m benchmarks.crawl_bench --files 500 --workers 4
+"""
+import argparse
+import asyncio
+import io
+import os
+import tarfile
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+from benchmarks.fake_github import FakeGitHub
+from app.core.config import settings
+from app.core.executor import process_pool_workers, shutdown_executor
+from app.services.chunker import MarkdownChunker
+
+DEFAULT_FILE = Path(__file__).resolve().parents[2] / "testdata" / "bosch.md"
+
+def make_repo(root: Path, text: str, files: int) -> None:
+    chunks = [chunk.content for chunk in MarkdownChunker().chunk(text)]
+    for i in range(files):
+        path = root / "docs" / f"part{i % 10}" / f"page{i}.md"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        body = "\n\n".join(f"## Part {j}\n\n{chunks[(i + j) % len(chunks)]}" for j in range(4))
+        path.write_text(f"# Page {i}\n\nUnique marker page{i}.\n\n{body}", encoding="utf-8")
+        (root / "src").mkdir(exist_ok=True)
+        (root / "src" / f"module{i}.py").write_text(f"VALUE = {i}\n")
+    (root / "README.md").write_text(f"# Bench repository\n\n{chunks[0]}", encoding="utf-8")
+    vendored = root / "node_modules" / "dep"
+    vendored.mkdir(parents=True)
+    (vendored / "README.md").write_text("# Vendored\n\nShould be skipped.\n")
+
+def make_tarball(root: Path) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        tar.add(root, arcname="repo-0123abc")
+    return buffer.getvalue()
+
+def report(name: str, result: dict) -> None:
+    print(
+        f"{name:<10}{result['files']:>7}{result['bytes'] / 1e6:>8.1f}{result['seconds']:>9.2f}"
+        f"{result['files_per_second']:>9.1f}{result['mb_per_second']:>8.2f}{result['stats']['sections']:>10}"
+        f"{len(result['failed']):>8}  {result['skipped']}"
+    )
+
+async def run(args) -> None:
+    if args.workers:
+        settings.PROCESS_POOL_WORKERS = args.workers
+    settings.EMBEDDER_BACKEND = "local"
+    settings.QDRANT_COLLECTION_NAME = "crawl_bench"
+
+    from app.services.document_service import DocumentService
+    from app.services.http_fetcher import HttpFetcher
+
+    async_qdrant_client = AsyncQdrantClient(location=":memory:")
+    await async_qdrant_client.create_collection(
+        settings.QDRANT_COLLECTION_NAME,
+        vectors_config=models.VectorParams(size=settings.EMBEDDING_DIMENSIONS, distance=models.Distance.COSINE)
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "repo"
+        make_repo(root, args.file.read_text(encoding="utf-8"), args.files)
+        github = await FakeGitHub({"bench/repo/tar.gz/HEAD": make_tarball(root)}).start()
+        settings.GITHUB_ARCHIVE_BASE_URL = github.base_url
+
+        fetcher = HttpFetcher()
+        service = DocumentService(
+            qdrant_client=QdrantClient(location=":memory:"),
+            async_qdrant_client=async_qdrant_client,
+            fetcher=fetcher
+        )
+        pool = f"{process_pool_workers()} process workers" if process_pool_workers() > 1 else "in-process parsing"
+        print(f"{args.files} generated docs, {pool}\n")
+        print(f"{'source':<10}{'files':>7}{'MB':>8}{'seconds':>9}{'files/s':>9}{'MB/s':>8}{'sections':>10}{'failed':>8}  skipped")
+        report("local", await service.process_repository(str(root), project="bench/local"))
+        report("tarball", await service.process_repository("https://github.com/bench/repo"))
+        await fetcher.aclose()
+        await github.stop()
+
+    await async_qdrant_client.close()
+    shutdown_executor()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", type=Path, default=DEFAULT_FILE)
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=0, help="Process pool size, default one per CPU")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""End-to-end benchmark of the FastAPI app with local stand-ins for its services.
+
+Drives the real application from ``app.main`` in-process (through its
+lifespan and HTTP routes) against the fake OpenAI server (deterministic
+embeddings, canned completions that first call the knowledge search tool)
+and the fake GitHub server. Qdrant runs in memory unless ``--qdrant-url``
+points at a server. After ``/ready`` succeeds (timed as the cold start):
+
+* ``readme``: ``/process-github`` on ``testdata/bosch.md`` served as a README;
+* ``repository``: ``/process-repository`` on a tarball of ``--docs``
+  synthetic markdown documents;
+* ``upload``: the same documents through ``/upload``, until the job is done;
+* ``query``: ``--queries`` distinct questions at ``--concurrency`` against
+  ``/api/chat/query``, reporting p50/p95/p99 latency and throughput.
+
+Results, with per-stage latencies from the metrics registry and peak RSS,
+are printed and written as JSON with ``--output``. ``--compare`` prints the
+change of every number against an earlier results file.
+
+Run from ``backend/``::
+
+    python -m benchmarks.e2e_bench --docs 200 --queries 200 --concurrency 16 --output e2e.json
+    python -m benchmarks.e2e_bench --compare e2e.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+
+import httpx
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from benchmarks.crawl_bench import make_repo, make_tarball
+from benchmarks.fake_github import FakeGitHub
+from benchmarks.fake_openai import FakeOpenAI
+from app.core.config import settings
+
+DEFAULT_FILE = Path(__file__).resolve().parents[2] / "testdata" / "bosch.md"
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+    }
+
+def stage_latencies() -> Dict[str, Dict]:
+    from app.core.metrics import STAGE_SECONDS
+    return {
+        f"{pipeline}.{stage}": {"count": count, "mean_ms": round(total / count * 1000, 3) if count else 0.0}
+        for (pipeline, stage), (count, total) in sorted(STAGE_SECONDS.totals().items())
+    }
+
+def use_memory_qdrant(registry) -> None:
+    """Point the registry at in-memory Qdrant; the collection is created on first write"""
+    registry._qdrant_client = QdrantClient(location=":memory:")
+    registry._async_qdrant_client = AsyncQdrantClient(location=":memory:")
+
+async def wait_for_ready(client: httpx.AsyncClient) -> float:
+    """Seconds until ``/ready`` succeeds, so warm-up does not count against the first phase"""
+    start = time.perf_counter()
+    while (await client.get("/ready")).status_code != 200:
+        await asyncio.sleep(0.05)
+    return round(time.perf_counter() - start, 3)
+
+async def wait_for_job(client: httpx.AsyncClient, job_id: str) -> Dict:
+    while True:
+        job = (await client.get(f"/api/documents/jobs/{job_id}")).json()
+        if job["status"] == "completed":
+            return job
+        await asyncio.sleep(0.05)
+
+async def ingest_phases(client: httpx.AsyncClient, text: str, repo: Path, docs: int) -> Dict[str, Dict]:
+    results = {}
+
+    start = time.perf_counter()
+    response = await client.post("/api/documents/process-github", json={"repo_url": "https://github.com/bench/bosch"})
+    response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    sections = response.json()["data"]["stats"]["sections"]
+    results["readme"] = {
+        "seconds": round(elapsed, 3),
+        "sections": sections,
+        "sections_per_second": round(sections / elapsed, 1),
+        "mb_per_second": round(len(text.encode()) / 1e6 / elapsed, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    start = time.perf_counter()
+    response = await client.post("/api/documents/process-repository", json={"repo_url": "https://github.com/bench/corpus"})
+    response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    data = response.json()["data"]
+    results["repository"] = {
+        "seconds": round(elapsed, 3),
+        "docs": data["files"],
+        "failed": len(data["failed"]),
+        "sections": data["stats"]["sections"],
+        "docs_per_second": round(data["files"] / elapsed, 1),
+        "mb_per_second": round(data["bytes"] / 1e6 / elapsed, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    files = [
+        ("files", (path.relative_to(repo).as_posix(), path.read_bytes()))
+        for path in sorted(repo.rglob("*.md")) if "node_modules" not in path.parts
+    ]
+    start = time.perf_counter()
+    response = await client.post("/api/documents/upload", params={"project": "bench/upload"}, files=files)
+    response.raise_for_status()
+    job = await wait_for_job(client, response.json()["job_id"])
+    elapsed = time.perf_counter() - start
+    results["upload"] = {
+        "seconds": round(elapsed, 3),
+        "docs": job["completed"],
+        "failed": job["failed"],
+        "docs_per_second": round(job["completed"] / elapsed, 1),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    return results
+
+async def query_phase(client: httpx.AsyncClient, questions: List[str], concurrency: int) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def ask(question: str):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/api/chat/query", json={"query": question, "project": "bench/corpus"})
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200 or response.json()["status"] != "success":
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[ask(question) for question in questions])
+    elapsed = time.perf_counter() - start
+    return {
+        "queries": len(questions),
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "queries_per_second": round(len(questions) / elapsed, 2),
+        **percentiles(latencies),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+async def run(args) -> Dict:
+    text = args.file.read_text(encoding="utf-8")
+    with tempfile.TemporaryDirectory(prefix="e2e-") as tmp:
+        repo = Path(tmp) / "corpus"
+        make_repo(repo, text, args.docs)
+        openai = await FakeOpenAI(latency=args.completion_latency, search_first=True).start()
+        github = await FakeGitHub({
+            "bench/bosch/main/README.md": text,
+            "bench/corpus/tar.gz/HEAD": make_tarball(repo),
+        }).start()
+
+        settings.OPENAI_BASE_URL = openai.base_url
+        settings.GITHUB_RAW_BASE_URL = github.base_url
+        settings.GITHUB_ARCHIVE_BASE_URL = github.base_url
+        settings.DATA_DIR = tmp
+        settings.UPLOAD_DIR = str(Path(tmp) / "uploads")
+        settings.EMBEDDER_BACKEND = args.embedder
+        settings.ANSWER_CACHE_ENABLED = args.answer_cache
+        settings.QDRANT_COLLECTION_NAME = "e2e_bench"
+        # Unlimited by default, so the run measures the app rather than the rate limiter
+        settings.OPENAI_REQUESTS_PER_MINUTE = args.rpm
+        settings.OPENAI_TOKENS_PER_MINUTE = args.tpm
+        if args.qdrant_url:
+            settings.QDRANT_URL = args.qdrant_url
+        if args.workers:
+            settings.PROCESS_POOL_WORKERS = args.workers
+
+        from app.main import app, lifespan
+
+        async with lifespan(app):
+            if not args.qdrant_url:
+                use_memory_qdrant(app.state.registry)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+                ready_seconds = await wait_for_ready(client)
+                ingest = await ingest_phases(client, text, repo, args.docs)
+                questions = [f"What does page {i % args.docs} say about part {i % 7}? (#{i})" for i in range(args.queries)]
+                query = await query_phase(client, questions, args.concurrency)
+
+        await openai.stop()
+        await github.stop()
+
+    return {
+        "benchmark": "e2e",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "docs": args.docs,
+            "queries": args.queries,
+            "concurrency": args.concurrency,
+            "completion_latency": args.completion_latency,
+            "embedder": args.embedder,
+            "answer_cache": args.answer_cache,
+            "rpm": args.rpm,
+            "tpm": args.tpm,
+            "qdrant": args.qdrant_url or ":memory:",
+            "cpus": os.cpu_count(),
+        },
+        "ready_seconds": ready_seconds,
+        "ingest": ingest,
+        "query": query,
+        "stages": stage_latencies(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    numbers = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            numbers.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            numbers[name] = value
+    return numbers
+
+def compare(baseline: Dict, current: Dict) -> None:
+    before, after = flatten(baseline), flatten(current)
+    print(f"\n{'metric':<44}{'baseline':>12}{'current':>12}{'change':>9}   ({baseline['commit']} -> {current['commit']})")
+    for name, value in after.items():
+        if name.startswith("config."):
+            continue
+        if name not in before:
+            print(f"{name:<44}{'-':>12}{value:>12}{'new':>9}")
+            continue
+        old = before[name]
+        change = f"{(value - old) / old * 100:+.1f}%" if old else ""
+        print(f"{name:<44}{old:>12}{value:>12}{change:>9}")
+
+def report(results: Dict) -> None:
+    config = results["config"]
+    print(f"{config['docs']} docs, {config['queries']} queries at concurrency {config['concurrency']}, "
+          f"{config['embedder']} embedder, Qdrant {config['qdrant']}, commit {results['commit']}\n")
+    print(f"ready after       {results['ready_seconds']:>8.2f}s")
+    for name, phase in results["ingest"].items():
+        rate = phase.get("docs_per_second", phase.get("sections_per_second"))
+        unit = "docs/s" if "docs_per_second" in phase else "sections/s"
+        print(f"ingest {name:<12}{phase['seconds']:>8.2f}s {rate:>9.1f} {unit}")
+    query = results["query"]
+    print(
+        f"query             {query['seconds']:>8.2f}s {query['queries_per_second']:>9.1f} queries/s  "
+        f"p50 {query['p50_ms']:.0f} ms  p95 {query['p95_ms']:.0f} ms  p99 {query['p99_ms']:.0f} ms  "
+        f"{query['errors']} errors"
+    )
+    print(f"peak RSS          {results['peak_rss_mb']:.0f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", type=Path, default=DEFAULT_FILE, help="README and source of the synthetic corpus")
+    parser.add_argument("--docs", type=int, default=200, help="Synthetic documents")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--completion-latency", type=float, default=0.05, help="Fake model latency per call")
+    parser.add_argument("--embedder", choices=["openai", "local"], default="openai", help="openai uses the fake server")
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the answer cache on")
+    parser.add_argument("--rpm", type=int, default=0, help="OpenAI requests per minute, 0 for no limit")
+    parser.add_argument("--tpm", type=int, default=0, help="OpenAI tokens per minute, 0 for no limit")
+    parser.add_argument("--qdrant-url", help="Qdrant server to use instead of in-memory")
+    parser.add_argument("--workers", type=int, default=0, help="Process pool size, default one per CPU")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    parser.add_argument("--compare", type=Path, help="Earlier results to compare against")
+    args = parser.parse_args()
+    # One line per request to the app and the fake servers drowns the report
+    for name in ("httpx", "aiohttp.access"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    results = asyncio.run(run(args))
+    report(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"\nWrote {args.output}")
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Embedding throughput benchmark: remote OpenAI path vs the lexical hashing embedder.
+
+Embeds the same documents, chunked from a markdown file and repeated with a
+unique suffix each, through:
+
+* ``openai``: ``OpenAIBatchEmbedder`` against the fake OpenAI server with a
+  per-request latency standing in for the network and API, in batches of
+  ``EMBED_BATCH_SIZE`` with ``EMBED_CONCURRENCY`` requests in flight, as the
+  ingest pipeline does;
+* ``local``: ``LexicalHashingEmbedder`` in-process;
+* ``local-pool``: ``LexicalHashingEmbedder`` sharded across the process pool
+  (only faster than in-process with more than one CPU).
+
+Run from ``backend/``::
+
+    python -m benchmarks.embedder_bench --docs 5000 --api-latency 0.3
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+
+from openai import OpenAI
+from benchmarks.fake_openai import FakeOpenAI
+from app.core.config import settings
+from app.core.executor import get_process_pool, process_pool_workers, shutdown_executor
+from app.services.chunker import MarkdownChunker
+from app.services.embedders import LexicalHashingEmbedder, OpenAIBatchEmbedder
+
+DEFAULT_FILE = Path(__file__).resolve().parents[2] / "testdata" / "bosch.md"
+
+def make_docs(path: Path, count: int) -> List[str]:
+    chunks = [chunk.content for chunk in MarkdownChunker().chunk(path.read_text(encoding="utf-8"))]
+    return [f"{chunks[i % len(chunks)]}\n\n(copy {i})" for i in range(count)]
+
+def embed_batched(embed: Callable[[List[str]], List[List[float]]], docs: List[str], batch_size: int, concurrency: int):
+    batches = [docs[i:i + batch_size] for i in range(0, len(docs), batch_size)]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return [vector for vectors in pool.map(embed, batches) for vector in vectors]
+
+def measure(name: str, embed: Callable[[], List[List[float]]], num_docs: int) -> None:
+    start = time.perf_counter()
+    vectors = embed()
+    elapsed = time.perf_counter() - start
+    assert len(vectors) == num_docs
+    print(f"{name:<12}{elapsed:>10.2f}{num_docs / elapsed:>12.0f}{len(vectors[0]):>8}")
+
+async def run(args) -> None:
+    docs = make_docs(args.file, args.docs)
+    print(f"{len(docs)} docs, {sum(len(doc) for doc in docs) / 1e6:.1f} MB, {process_pool_workers()} pool workers")
+    print(f"{'backend':<12}{'seconds':>10}{'docs/s':>12}{'dims':>8}")
+
+    fake = await FakeOpenAI(latency=0, embedding_latency=args.api_latency).start()
+    remote = OpenAIBatchEmbedder(
+        api_key=settings.OPENAI_API_KEY,
+        id=settings.EMBEDDING_MODEL,
+        dimensions=settings.EMBEDDING_DIMENSIONS,
+        openai_client=OpenAI(api_key=settings.OPENAI_API_KEY, base_url=fake.base_url)
+    )
+    await asyncio.to_thread(
+        measure,
+        "openai",
+        lambda: embed_batched(remote.get_embeddings, docs, settings.EMBED_BATCH_SIZE, settings.EMBED_CONCURRENCY),
+        len(docs)
+    )
+    await fake.stop()
+
+    inline = LexicalHashingEmbedder(dimensions=settings.EMBEDDING_DIMENSIONS, shard_size=len(docs))
+    measure("local", lambda: inline.get_embeddings(docs), len(docs))
+
+    if process_pool_workers() > 1:
+        pooled = LexicalHashingEmbedder(dimensions=settings.EMBEDDING_DIMENSIONS, shard_size=args.shard_size)
+        # Start the workers before timing
+        list(get_process_pool().map(abs, range(process_pool_workers())))
+        measure("local-pool", lambda: pooled.get_embeddings(docs), len(docs))
+    else:
+        print("local-pool  skipped: one CPU")
+    shutdown_executor()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", type=Path, default=DEFAULT_FILE)
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--api-latency", type=float, default=0.3, help="Fake embeddings request latency in seconds")
+    parser.add_argument("--shard-size", type=int, default=settings.LOCAL_EMBEDDER_SHARD_SIZE)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
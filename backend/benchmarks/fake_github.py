@@ -0,0 +1,74 @@
+"""Minimal raw.githubusercontent.com stand-in for benchmarks and load tests.
+
+Serves files from a dict at ``/{owner}/{repo}/{branch}/{path}`` with ETag and
+Last-Modified validators, answers matching conditional requests with 304,
+compresses bodies when the client accepts gzip, and can fail a number of
+requests with 503 + Retry-After to exercise retries. Point
+``GITHUB_RAW_BASE_URL`` at ``base_url``; repository tarballs can be served the
+same way at ``{owner}/{repo}/tar.gz/{ref}`` for ``GITHUB_ARCHIVE_BASE_URL``.
+"""
+import asyncio
+import gzip
+from email.utils import formatdate
+from hashlib import sha256
+from typing import Dict, Tuple, Union
+from aiohttp import web
+
+class FakeGitHub:
+    def __init__(self, files: Dict[str, Union[str, bytes]], latency: float = 0.0, fail_first: int = 0, host: str = "127.0.0.1", port: int = 0):
+        self.files: Dict[str, Tuple[bytes, str, str]] = {}
+        for path, text in files.items():
+            self.put(path, text)
+        self.latency = latency
+        self.fail_first = fail_first
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._runner = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def put(self, path: str, text: Union[str, bytes]) -> None:
+        """Add or change a file; its validators change with it"""
+        body = text.encode() if isinstance(text, str) else text
+        etag = f'"{sha256(body).hexdigest()[:16]}"'
+        self.files[path.strip("/")] = (body, etag, formatdate(usegmt=True))
+
+    async def _raw(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        if self.fail_first > 0:
+            self.fail_first -= 1
+            return web.Response(status=503, headers={"Retry-After": "0"})
+
+        entry = self.files.get(request.match_info["path"])
+        if entry is None:
+            return web.Response(status=404, reason="Not Found")
+        body, etag, last_modified = entry
+        headers = {"ETag": etag, "Last-Modified": last_modified, "Content-Type": "text/plain; charset=utf-8"}
+        if request.headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers=headers)
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        self.bytes_sent += len(body)
+        return web.Response(body=body, headers=headers)
+
+    async def start(self) -> "FakeGitHub":
+        app = web.Application()
+        app.router.add_get("/{path:.+}", self._raw)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
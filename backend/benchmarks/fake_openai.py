@@ -0,0 +1,160 @@
+"""Minimal OpenAI-compatible server for benchmarks and load tests.
+
+Serves ``/v1/chat/completions`` (plain and streaming) with a canned answer
+after a configurable delay, and ``/v1/embeddings`` with deterministic
+bag-of-words vectors, so the backend can be exercised without network access
+or API spend. Texts sharing words get similar embeddings, which is enough for
+retrieval and cache behaviour to be meaningful.
+
+With ``search_first`` a non-streaming completion that offers the
+``search_knowledge_base`` tool first calls it with the user's question, as a
+real model would, so agent runs exercise retrieval too.
+"""
+import asyncio
+import base64
+import json
+import re
+import time
+import zlib
+from typing import Optional
+import numpy as np
+from aiohttp import web
+
+CANNED_ANSWER = "This is a canned answer from the fake OpenAI server."
+
+class FakeOpenAI:
+    def __init__(
+        self,
+        latency: float = 0.5,
+        embedding_latency: float = 0.0,
+        search_first: bool = False,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        self.latency = latency
+        self.search_first = search_first
+        self.embedding_latency = embedding_latency
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self._runner = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def _chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.requests += 1
+        created = int(time.time())
+
+        if body.get("stream"):
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            words = CANNED_ANSWER.split(" ")
+            for word in words:
+                await asyncio.sleep(self.latency / len(words))
+                chunk = {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"role": "assistant", "content": word + " "}, "finish_reason": None}],
+                }
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            final = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body["model"],
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            await response.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+            return response
+
+        await asyncio.sleep(self.latency)
+        tool = self._search_tool(body) if self.search_first else None
+        if tool is not None:
+            question = next(m["content"] for m in reversed(body["messages"]) if m["role"] == "user")
+            call = {
+                "id": f"call-{self.requests}",
+                "type": "function",
+                "function": {"name": tool, "arguments": json.dumps({"query": question})},
+            }
+            return web.json_response({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": created,
+                "model": body["model"],
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": None, "tool_calls": [call]},
+                    "finish_reason": "tool_calls",
+                }],
+                "usage": {"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110},
+            })
+        return web.json_response({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": created,
+            "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": CANNED_ANSWER}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110},
+        })
+
+    @staticmethod
+    def _search_tool(body) -> Optional[str]:
+        """Name of the knowledge search tool if it is offered and was not called yet in this run"""
+        if any(message["role"] == "tool" for message in body["messages"]):
+            return None
+        # Agents running async offer it as async_search_knowledge_base
+        names = [tool.get("function", {}).get("name", "") for tool in body.get("tools") or []]
+        return next((name for name in names if name.endswith("search_knowledge_base")), None)
+
+    @staticmethod
+    def embed(text: str, dimensions: int) -> np.ndarray:
+        """Hash each word into a bucket with a pseudo-random sign, then L2-normalize"""
+        vector = np.zeros(dimensions, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = zlib.crc32(word.encode())
+            vector[digest % dimensions] += 1.0 if digest & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def _embeddings(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.requests += 1
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dimensions = body.get("dimensions") or 1536
+        await asyncio.sleep(self.embedding_latency)
+
+        data = []
+        for index, text in enumerate(inputs):
+            vector = self.embed(text, dimensions)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode()
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        tokens = sum(len(text.split()) for text in inputs)
+        return web.json_response({
+            "object": "list",
+            "data": data,
+            "model": body["model"],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    async def start(self) -> "FakeOpenAI":
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._chat_completions)
+        app.router.add_post("/v1/embeddings", self._embeddings)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
@@ -0,0 +1,77 @@
+"""Import-time budget for the backend.
+
+Imports ``app.main`` in fresh interpreters with ``-X importtime`` and fails
+if the best run exceeds ``--budget-ms``, or if any of the heavy SDKs that the
+service registry loads lazily (agno, qdrant_client, openai, aiohttp) was
+imported. Both keep cold starts of autoscaled replicas fast: the server can
+accept connections before the SDKs are loaded in the background. Prints the
+modules with the largest self time so regressions are easy to pin down.
+
+Run from ``backend/``::
+
+    python -m benchmarks.import_budget --budget-ms 1000
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+LAZY_MODULES = ("agno", "qdrant_client", "openai", "aiohttp")
+
+# import time: self [us] | cumulative | imported package
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+PROBE = (
+    "import sys, app.main; "
+    f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+)
+
+def import_once() -> Tuple[float, Dict[str, int], List[str]]:
+    """Milliseconds to import app.main, self time per module in us, and lazy modules that got loaded"""
+    env = {"OPENAI_API_KEY": "sk-budget", "OPENROUTER_API_KEY": "budget", **os.environ}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE], capture_output=True, text=True, env=env, check=True
+    )
+    self_times: Dict[str, int] = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        self_times[name] = int(self_us)
+        if name == "app.main":
+            total = int(cumulative_us)
+    loaded = [name for name in result.stdout.strip().split(",") if name]
+    return total / 1000, self_times, loaded
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    parser.add_argument("--runs", type=int, default=3, help="Best of this many runs is compared to the budget")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list")
+    args = parser.parse_args()
+
+    runs = [import_once() for _ in range(args.runs)]
+    best, self_times, loaded = min(runs, key=lambda run: run[0])
+
+    print(f"import app.main:     {best:.0f} ms best of {args.runs} (budget {args.budget_ms:.0f} ms)")
+    print("slowest modules by self time:")
+    for name, self_us in sorted(self_times.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    passed = True
+    if loaded:
+        print(f"FAIL: imported at startup although loaded lazily: {', '.join(loaded)}")
+        passed = False
+    if best > args.budget_ms:
+        print(f"FAIL: over budget by {best - args.budget_ms:.0f} ms")
+        passed = False
+    if passed:
+        print("PASS: within budget")
+    sys.exit(0 if passed else 1)
+
+if __name__ == "__main__":
+    main()
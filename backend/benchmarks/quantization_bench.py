@@ -0,0 +1,169 @@
+"""Vector storage benchmark: recall, memory and latency of the collection settings.
+
+Builds a synthetic corpus whose variance decays across dimensions, like
+Matryoshka-trained embeddings, so leading dimensions carry most of the signal.
+Queries are perturbed copies of corpus vectors; ground truth is exact float32
+cosine top-k. Each configuration is measured for:
+
+* float32 vectors (``QDRANT_QUANTIZATION=none``), also truncated to fewer
+  dimensions (``EMBEDDING_DIMENSIONS``);
+* int8 scalar quantization (``scalar``) and 1-bit binary quantization
+  (``binary``), with and without rescoring the oversampled quantized candidates
+  against the original vectors (``QDRANT_RESCORE``, ``QDRANT_OVERSAMPLING``).
+
+By default the search is emulated with brute force in NumPy, which isolates the
+recall cost of each representation from HNSW; memory is the estimated resident
+size of vectors plus HNSW links (``QDRANT_HNSW_M``), with original vectors
+counted as disk when quantized and ``--on-disk`` is set. With ``--qdrant-url``
+the same configurations are built on a Qdrant server through
+``app.services.collection_config`` and searched with its search params.
+
+Run from ``backend/``::
+
+    python -m benchmarks.quantization_bench --points 50000 --dims 1536
+"""
+import argparse
+import os
+import time
+import uuid
+from typing import Callable, List, Tuple
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+
+import numpy as np
+from app.core.config import settings
+
+def make_corpus(points: int, queries: int, dims: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    scale = np.exp(-np.arange(dims) / (dims / 4)).astype(np.float32)
+    corpus = rng.standard_normal((points, dims), dtype=np.float32) * scale
+    picks = rng.choice(points, queries, replace=False)
+    noise = rng.standard_normal((queries, dims), dtype=np.float32) * scale * 0.6
+    return normalize(corpus), normalize(corpus[picks] + noise)
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    best = np.argpartition(-scores, k, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, best, axis=1), axis=1)
+    return np.take_along_axis(best, order, axis=1)
+
+def rescore(corpus: np.ndarray, queries: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+    exact = np.einsum("qd,qcd->qc", queries, corpus[candidates])
+    return np.take_along_axis(candidates, top_k(exact, k), axis=1)
+
+def scalar_search(corpus: np.ndarray, dims: int) -> Callable[[np.ndarray, int], np.ndarray]:
+    low, high = np.quantile(corpus, [0.005, 0.995])
+    step = (high - low) / 255
+    codes = np.clip(np.round((corpus - low) / step), 0, 255).astype(np.uint8)
+    def search(queries: np.ndarray, limit: int) -> np.ndarray:
+        # Dot product of the dequantized vectors; the constant offset does not change the ranking
+        return top_k(queries @ codes.T.astype(np.float32), limit)
+    return search
+
+def binary_search(corpus: np.ndarray, dims: int) -> Callable[[np.ndarray, int], np.ndarray]:
+    bits = np.packbits(corpus > 0, axis=1)
+    popcount = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+    def search(queries: np.ndarray, limit: int) -> np.ndarray:
+        query_bits = np.packbits(queries > 0, axis=1)
+        distances = np.stack([popcount[np.bitwise_xor(bits, q)].sum(axis=1) for q in query_bits])
+        return top_k(-distances.astype(np.float32), limit)
+    return search
+
+def memory_mb(points: int, dims: int, mode: str, on_disk: bool, m: int) -> Tuple[float, float]:
+    """(RAM, disk) in MB for vectors plus HNSW links"""
+    original = points * dims * 4
+    quantized = {"none": 0, "scalar": points * dims, "binary": points * dims / 8}[mode]
+    links = points * m * 2 * 4
+    ram = quantized + links + (0 if on_disk and mode != "none" else original)
+    disk = original if on_disk else 0
+    return ram / 1e6, disk / 1e6
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+def run_local(args, corpus: np.ndarray, queries: np.ndarray, truth: np.ndarray) -> None:
+    k = args.k
+    oversampled = int(k * settings.QDRANT_OVERSAMPLING)
+    print(f"{'config':<28}{'recall@k':>10}{'ms/query':>10}{'RAM MB':>10}{'disk MB':>10}")
+
+    def report(name, search, mode, dims, rescored):
+        start = time.perf_counter()
+        found = search()
+        elapsed = (time.perf_counter() - start) / len(queries) * 1000
+        ram, disk = memory_mb(len(corpus), dims, mode, args.on_disk, settings.QDRANT_HNSW_M)
+        if rescored:
+            # Rescoring reads the original vectors, from disk when they are not in RAM
+            name += " +rescore"
+        print(f"{name:<28}{recall(found, truth):>10.3f}{elapsed:>10.2f}{ram:>10.1f}{disk:>10.1f}")
+
+    for dims in sorted({args.dims, *args.truncate}, reverse=True):
+        if dims > args.dims:
+            continue
+        truncated = normalize(corpus[:, :dims])
+        truncated_queries = normalize(queries[:, :dims])
+        report(f"float32 d={dims}", lambda: top_k(truncated_queries @ truncated.T, k), "none", dims, False)
+
+    for mode, build in (("scalar", scalar_search), ("binary", binary_search)):
+        search = build(corpus, args.dims)
+        report(f"{mode} d={args.dims}", lambda: search(queries, k), mode, args.dims, False)
+        report(
+            f"{mode} d={args.dims} x{settings.QDRANT_OVERSAMPLING:g}",
+            lambda: rescore(corpus, queries, search(queries, oversampled), k),
+            mode, args.dims, True
+        )
+
+def run_qdrant(args, corpus: np.ndarray, queries: np.ndarray, truth: np.ndarray) -> None:
+    from qdrant_client import QdrantClient, models
+    from app.services.collection_config import create_collection, search_params
+
+    client = QdrantClient(url=args.qdrant_url, timeout=300)
+    settings.QDRANT_ON_DISK_VECTORS = args.on_disk
+    print(f"{'config':<28}{'recall@k':>10}{'ms/query':>10}")
+    for mode, rescored in (("none", False), ("scalar", False), ("scalar", True), ("binary", False), ("binary", True)):
+        settings.QDRANT_QUANTIZATION = mode
+        settings.QDRANT_RESCORE = rescored
+        name = f"bench-{mode}-{uuid.uuid4().hex[:6]}"
+        create_collection(client, name, args.dims)
+        for start in range(0, len(corpus), 1000):
+            batch = corpus[start:start + 1000]
+            client.upsert(name, models.Batch(ids=list(range(start, start + len(batch))), vectors=batch.tolist()))
+        client.update_collection(name, optimizer_config=models.OptimizersConfigDiff(indexing_threshold=0))
+        while client.get_collection(name).status != models.CollectionStatus.GREEN:
+            time.sleep(1)
+
+        found: List[List[int]] = []
+        start = time.perf_counter()
+        for query in queries:
+            points = client.query_points(name, query=query.tolist(), limit=args.k, search_params=search_params()).points
+            found.append([point.id for point in points])
+        elapsed = (time.perf_counter() - start) / len(queries) * 1000
+        label = f"{mode}{' +rescore' if rescored else ''}"
+        print(f"{label:<28}{recall(np.array(found), truth):>10.3f}{elapsed:>10.2f}")
+        client.delete_collection(name)
+    client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dims", type=int, default=settings.EMBEDDING_DIMENSIONS)
+    parser.add_argument("--truncate", type=int, nargs="*", default=[768, 512, 256], help="Matryoshka dimensions to compare")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--on-disk", action="store_true", help="Keep original vectors on disk when quantized")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--qdrant-url", help="Measure real collections on a Qdrant server")
+    args = parser.parse_args()
+
+    corpus, queries = make_corpus(args.points, args.queries, args.dims, args.seed)
+    truth = top_k(queries @ corpus.T, args.k)
+    print(f"{args.points} points, {args.queries} queries, {args.dims} dims, k={args.k}, hnsw m={settings.QDRANT_HNSW_M}\n")
+    if args.qdrant_url:
+        run_qdrant(args, corpus, queries, truth)
+    else:
+        run_local(args, corpus, queries, truth)
+
+if __name__ == "__main__":
+    main()
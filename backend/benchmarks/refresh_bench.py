@@ -0,0 +1,96 @@
+"""Repository refresh benchmark: full ingestion vs conditional refetch.
+
+Serves ``--repos`` READMEs (copies of a markdown file) from the fake GitHub
+server, then runs ``DocumentService.process_github_repo`` over all of them
+three times through one shared ``HttpFetcher``:
+
+* ``cold``: empty cache, every README is downloaded, parsed and embedded;
+* ``warm``: nothing changed, every fetch is a 304 and is skipped;
+* ``changed``: ``--changed`` READMEs were edited and are reprocessed.
+
+The first ``--fail-first`` requests get a 503 to exercise retries. Embeddings
+come from the lexical hashing embedder and Qdrant runs in memory.
+
+Run from ``backend/``::
+
+    python -m benchmarks.refresh_bench --repos 50 --changed 5
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+from benchmarks.fake_github import FakeGitHub
+from app.core.config import settings
+
+DEFAULT_FILE = Path(__file__).resolve().parents[2] / "testdata" / "bosch.md"
+
+async def run(args) -> None:
+    text = args.file.read_text(encoding="utf-8")
+    files = {f"bench/repo{i}/main/README.md": f"# Repo {i}\n\n{text}" for i in range(args.repos)}
+    github = await FakeGitHub(files, latency=args.latency, fail_first=args.fail_first).start()
+    settings.GITHUB_RAW_BASE_URL = github.base_url
+    settings.EMBEDDER_BACKEND = "local"
+    settings.QDRANT_COLLECTION_NAME = "refresh_bench"
+
+    from app.services.document_service import DocumentService
+    from app.services.http_fetcher import HttpCache, HttpFetcher
+
+    async_qdrant_client = AsyncQdrantClient(location=":memory:")
+    await async_qdrant_client.create_collection(
+        settings.QDRANT_COLLECTION_NAME,
+        vectors_config=models.VectorParams(size=settings.EMBEDDING_DIMENSIONS, distance=models.Distance.COSINE)
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        fetcher = HttpFetcher(cache=HttpCache(tmp))
+        service = DocumentService(
+            qdrant_client=QdrantClient(location=":memory:"),
+            async_qdrant_client=async_qdrant_client,
+            fetcher=fetcher
+        )
+        urls = [f"https://github.com/bench/repo{i}" for i in range(args.repos)]
+        print(f"{args.repos} repos, {len(text) / 1e3:.0f} KB each, {args.fail_first} injected 503s\n")
+        print(f"{'pass':<10}{'seconds':>9}{'repos/s':>9}{'processed':>11}{'skipped':>9}{'KB sent':>9}{'retries':>9}")
+
+        for name in ("cold", "warm", "changed"):
+            if name == "changed":
+                for i in range(args.changed):
+                    github.put(f"bench/repo{i}/main/README.md", f"# Repo {i} (edited)\n\n{text}")
+            sent, retries = github.bytes_sent, fetcher.retries
+            semaphore = asyncio.Semaphore(settings.INGEST_MAX_CONCURRENCY)
+
+            async def process(url):
+                async with semaphore:
+                    return await service.process_github_repo(url)
+
+            start = time.perf_counter()
+            results = await asyncio.gather(*[process(url) for url in urls])
+            elapsed = time.perf_counter() - start
+            skipped = sum(1 for result in results if result and result["not_modified"])
+            print(
+                f"{name:<10}{elapsed:>9.2f}{args.repos / elapsed:>9.1f}{args.repos - skipped:>11}{skipped:>9}"
+                f"{(github.bytes_sent - sent) / 1e3:>9.0f}{fetcher.retries - retries:>9}"
+            )
+        await fetcher.aclose()
+
+    await async_qdrant_client.close()
+    await github.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", type=Path, default=DEFAULT_FILE)
+    parser.add_argument("--repos", type=int, default=50)
+    parser.add_argument("--changed", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake server latency per request in seconds")
+    parser.add_argument("--fail-first", type=int, default=3, help="Requests answered with 503 before serving")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
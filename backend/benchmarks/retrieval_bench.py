@@ -0,0 +1,166 @@
+"""Retrieval benchmark: dense vs sparse (BM25) vs hybrid (reciprocal rank fusion),
+each with and without the lexical reranking stage.
+
+Ingests a markdown file through ``DocumentService`` into a Qdrant collection
+and a temporary lexical index, then runs two query sets through
+``ChatService.search`` in every retrieval mode:
+
+* identifier queries ask about rare tokens in the document (part numbers,
+  register and function names such as ``BMI270`` or ``bmi270_reg_read_spi``);
+  every chunk containing the token is relevant.
+* passage queries are a run of words copied from a chunk, which is relevant.
+
+Reports recall@k, MRR and search latency per mode and reranker setting. By default embeddings come
+from the fake OpenAI server, whose bag-of-words vectors favour dense retrieval
+on exact words more than real embeddings do; pass ``--openai`` to use the real
+API with ``OPENAI_API_KEY``. Qdrant runs in memory unless ``--qdrant-url`` is set.
+
+Run from ``backend/``::
+
+    python -m benchmarks.retrieval_bench --file ../testdata/bosch.md
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+
+from openai import AsyncOpenAI, OpenAI
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+from benchmarks.fake_openai import FakeOpenAI
+from app.core.config import settings
+
+DEFAULT_FILE = Path(__file__).resolve().parents[2] / "testdata" / "bosch.md"
+IDENTIFIER_RE = re.compile(r"\b(?=\w*[A-Za-z])(?=\w*(?:\d|_))\w{4,}\b")
+URL = "https://github.com/bench/retrieval/blob/main/README.md"
+
+def build_queries(chunks: List[Dict], num_passages: int, seed: int) -> List[Tuple[str, str, Set[str]]]:
+    """(kind, query, relevant point ids) triples"""
+    queries = []
+    counts: Dict[str, int] = {}
+    for chunk in chunks:
+        for identifier in set(IDENTIFIER_RE.findall(chunk["content"])):
+            counts[identifier] = counts.get(identifier, 0) + 1
+    for identifier in sorted(counts):
+        if counts[identifier] <= 3:
+            relevant = {chunk["id"] for chunk in chunks if identifier in chunk["content"]}
+            queries.append(("identifier", f"What does the guide say about {identifier}?", relevant))
+
+    rng = random.Random(seed)
+    for chunk in rng.sample(chunks, min(num_passages, len(chunks))):
+        words = chunk["content"].split()
+        start = rng.randrange(max(1, len(words) - 12))
+        queries.append(("passage", " ".join(words[start:start + 12]), {chunk["id"]}))
+    return queries
+
+async def run(args) -> None:
+    fake = None
+    if args.openai:
+        base_url = settings.OPENAI_BASE_URL
+    else:
+        fake = await FakeOpenAI(latency=0).start()
+        base_url = fake.base_url
+    openai_client = OpenAI(api_key=settings.OPENAI_API_KEY, base_url=base_url)
+    async_openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=base_url)
+
+    settings.QDRANT_COLLECTION_NAME = "retrieval_bench"
+    if args.qdrant_url:
+        qdrant_client = QdrantClient(url=args.qdrant_url)
+        async_qdrant_client = AsyncQdrantClient(url=args.qdrant_url)
+        qdrant_client.delete_collection(settings.QDRANT_COLLECTION_NAME)
+    else:
+        qdrant_client = QdrantClient(location=":memory:")
+        async_qdrant_client = AsyncQdrantClient(location=":memory:")
+        # In-memory clients do not share state; ingest and search use the async one
+        await async_qdrant_client.create_collection(
+            settings.QDRANT_COLLECTION_NAME,
+            vectors_config=models.VectorParams(size=1536, distance=models.Distance.COSINE)
+        )
+
+    from app.services.chat_service import RETRIEVAL_MODES, ChatService
+    from app.services.document_service import DocumentService
+    from app.services.lexical_index import LexicalIndex
+    from app.services.reranker import LexicalReranker
+
+    with tempfile.TemporaryDirectory() as tmp:
+        lexical_index = LexicalIndex(str(Path(tmp) / "lexical_index.sqlite3"))
+        clients = dict(
+            openai_client=openai_client,
+            async_openai_client=async_openai_client,
+            qdrant_client=qdrant_client,
+            async_qdrant_client=async_qdrant_client,
+            lexical_index=lexical_index
+        )
+        document_service = DocumentService(api_key=settings.OPENAI_API_KEY, **clients)
+        chat_service = ChatService(
+            api_key=settings.OPENAI_API_KEY,
+            reranker=LexicalReranker(prior_weight=settings.RERANK_PRIOR_WEIGHT),
+            **clients
+        )
+
+        content = args.file.read_text(encoding="utf-8")
+        start = time.perf_counter()
+        stats = await document_service.store_document(URL, content)
+        print(f"ingested {stats['sections']} chunks in {time.perf_counter() - start:.2f}s")
+
+        points, _ = await async_qdrant_client.scroll(
+            settings.QDRANT_COLLECTION_NAME, limit=100000, with_payload=["content"]
+        )
+        chunks = [{"id": str(point.id), "content": point.payload["content"]} for point in points]
+        queries = build_queries(chunks, args.passages, args.seed)
+        kinds = sorted({kind for kind, _, _ in queries})
+        print("queries: " + ", ".join(f"{sum(1 for q in queries if q[0] == kind)} {kind}" for kind in kinds))
+        print(
+            f"k={args.k}, candidates per index={settings.RETRIEVAL_CANDIDATES}, rrf_k={settings.RRF_K}, "
+            f"rerank candidates={settings.RERANK_CANDIDATES}\n"
+        )
+
+        print(f"{'mode':<8}{'rerank':<8}{'queries':<12}{'recall@k':>10}{'mrr':>8}{'p50 ms':>9}{'p95 ms':>9}")
+        for mode, rerank in [(mode, rerank) for mode in RETRIEVAL_MODES for rerank in (False, True)]:
+            per_kind: Dict[str, List[Tuple[bool, float]]] = {kind: [] for kind in kinds}
+            latencies = []
+            for kind, query, relevant in queries:
+                start = time.perf_counter()
+                results = await chat_service.search(query, limit=args.k, mode=mode, rerank=rerank)
+                latencies.append(time.perf_counter() - start)
+                ranks = [rank for rank, result in enumerate(results, start=1) if result["id"] in relevant]
+                per_kind[kind].append((bool(ranks), 1.0 / ranks[0] if ranks else 0.0))
+
+            latencies.sort()
+            p50 = statistics.median(latencies) * 1000
+            p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000
+            for kind in kinds:
+                hits = per_kind[kind]
+                recall = sum(hit for hit, _ in hits) / len(hits)
+                mrr = sum(rr for _, rr in hits) / len(hits)
+                print(f"{mode:<8}{'yes' if rerank else 'no':<8}{kind:<12}{recall:>10.3f}{mrr:>8.3f}{p50:>9.1f}{p95:>9.1f}")
+
+        await document_service.aclose()
+        lexical_index.close()
+
+    await async_qdrant_client.close()
+    qdrant_client.close()
+    if fake is not None:
+        await fake.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", type=Path, default=DEFAULT_FILE)
+    parser.add_argument("--k", type=int, default=5, help="Results per query")
+    parser.add_argument("--passages", type=int, default=40, help="Number of passage queries")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--qdrant-url", help="Use a Qdrant server instead of the in-memory client")
+    parser.add_argument("--openai", action="store_true", help="Use the real OpenAI API for embeddings")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
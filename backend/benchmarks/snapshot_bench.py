@@ -0,0 +1,133 @@
+"""Snapshot export and import throughput, and a round-trip check.
+
+Fills an in-memory Qdrant collection with synthetic sections shaped like the
+ones ingestion writes, exports it to a snapshot file, imports the file into a
+fresh collection and verifies that ids, vectors and payloads survived. Reports
+points per second each way and the file size against JSON for the same points.
+An import costs only disk reads and upserts; re-ingesting the same corpus
+would also fetch and embed every section.
+
+Run from ``backend/``::
+
+    python -m benchmarks.snapshot_bench --points 20000 --dimensions 1536
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import uuid
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models
+from app.core.config import settings
+from app.services.collection_config import ensure_collection
+from app.services.lexical_index import LexicalIndex
+from app.services.project_service import ProjectService
+from app.services.snapshot import Snapshot, export_snapshot, import_snapshot
+
+SOURCE = "snapshot_source"
+TARGET = "snapshot_target"
+
+def synthetic_points(count: int, dimensions: int):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((count, dimensions), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [str(uuid.UUID(int=i + 1)) for i in range(count)]
+    payloads = []
+    for i in range(count):
+        url = f"https://github.com/bench/repo{i % 20}/blob/main/docs/page{i // 50}.md"
+        payloads.append({
+            "name": f"section_{i % 50}",
+            "meta_data": {
+                "url": url,
+                "project": f"bench/repo{i % 20}",
+                "title": f"Section {i}",
+                "heading_path": ["Guide", f"Section {i}"],
+                "type": "markdown",
+                "content_hash": uuid.UUID(int=i).hex * 2,
+            },
+            "content": f"Section {i} explains how to configure register {i % 97} of the sensor. " * 8,
+            "usage": None,
+        })
+    return ids, vectors, payloads
+
+async def run(args) -> None:
+    settings.EMBEDDER_BACKEND = "local"
+    settings.EMBEDDING_DIMENSIONS = args.dimensions
+    client = AsyncQdrantClient(location=":memory:")
+    ids, vectors, payloads = synthetic_points(args.points, args.dimensions)
+
+    with tempfile.TemporaryDirectory(prefix="snapshot-") as tmp:
+        projects = ProjectService(tmp)
+        for i in range(20):
+            projects.add_project(f"repo{i}", f"https://github.com/bench/repo{i}/blob/main/README.md", "")
+        await ensure_collection(client, SOURCE, args.dimensions)
+        for start in range(0, args.points, 1000):
+            await client.upsert(SOURCE, points=models.Batch(
+                ids=ids[start:start + 1000],
+                vectors=vectors[start:start + 1000].tolist(),
+                payloads=payloads[start:start + 1000]
+            ))
+
+        path = Path(tmp) / "corpus.snap"
+        exported = await export_snapshot(client, SOURCE, projects, str(path))
+
+        restored_projects = ProjectService(str(Path(tmp) / "restored"))
+        lexical_index = LexicalIndex(str(Path(tmp) / "restored" / "lexical_index.sqlite3"))
+        imported = await import_snapshot(
+            client, TARGET, restored_projects, str(path),
+            lexical_index=lexical_index, batch_size=args.batch_size, concurrency=args.concurrency
+        )
+
+        snapshot = Snapshot(str(path))
+        order = {point_id: row for row, point_id in enumerate(ids)}
+        sample = [ids[i] for i in range(0, args.points, max(1, args.points // 100))]
+        points = await client.retrieve(TARGET, ids=sample, with_payload=True, with_vectors=True)
+        intact = all(
+            np.allclose(point.vector, vectors[order[str(point.id)]], atol=1e-6)
+            and point.payload == payloads[order[str(point.id)]]
+            for point in points
+        ) and len(points) == len(sample)
+        target_count = (await client.count(TARGET)).count
+        lexical_hits = len(lexical_index.search("register 42", limit=10))
+        json_bytes = sum(
+            len(json.dumps({"id": point_id, "vector": vector.tolist(), "payload": payload}))
+            for point_id, vector, payload in zip(ids[:1000], vectors[:1000], payloads[:1000])
+        ) * args.points / min(1000, args.points)
+        file_bytes = path.stat().st_size
+        projects.close()
+        restored_projects.close()
+        lexical_index.close()
+        del snapshot
+    await client.close()
+
+    print(f"{args.points} points of {args.dimensions} dimensions\n")
+    print(f"export   {exported['seconds']:>7.2f}s  {args.points / max(exported['seconds'], 1e-9):>9.0f} points/s")
+    print(f"import   {imported['seconds']:>7.2f}s  {args.points / max(imported['seconds'], 1e-9):>9.0f} points/s  "
+          f"(batch {args.batch_size}, {args.concurrency} in flight)")
+    print(f"file     {file_bytes / 2**20:>7.1f} MB  vs {json_bytes / 2**20:.1f} MB as JSON")
+    print(f"restored {target_count} points, {imported['projects']} projects, "
+          f"{lexical_hits} lexical hits for a sample query")
+    passed = intact and target_count == args.points and imported["projects"] == 20 and lexical_hits > 0
+    print("PASS: round trip intact" if passed else "FAIL: restored corpus differs")
+    raise SystemExit(0 if passed else 1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+import os
+
+# Settings are read on import and require the keys; no test calls the real APIs
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+
+import pytest
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
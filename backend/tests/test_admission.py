@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from app.services.admission import AdmissionController, AdmissionRejected, Priority, TokenBucket
+
+pytestmark = pytest.mark.anyio
+
+def controller(requests_per_minute=600, tokens_per_minute=0, queue_sizes=None, max_waits=None, reserve=0.2):
+    return AdmissionController(
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+        burst_seconds=1,
+        reserve=reserve,
+        queue_sizes=queue_sizes or {Priority.INTERACTIVE: 10, Priority.BULK: 10},
+        max_waits=max_waits or {Priority.INTERACTIVE: 5.0, Priority.BULK: None},
+    )
+
+def test_token_bucket_wait():
+    bucket = TokenBucket(per_minute=60, burst_seconds=10)
+    assert bucket.capacity == 10 and bucket.wait(10) == 0
+    bucket.level = 0
+    assert bucket.wait(2) == pytest.approx(2.0)
+
+async def test_calls_within_the_burst_are_admitted_at_once():
+    admission = controller()
+    for _ in range(10):
+        await asyncio.wait_for(admission.acquire(Priority.INTERACTIVE, 0), 0.05)
+    assert admission.stats()["interactive"]["admitted"] == 10
+
+async def test_queued_calls_are_admitted_in_priority_order():
+    # 600 per minute is one call every 0.1s once the burst of 10 is used
+    admission = controller(reserve=0)
+    for _ in range(10):
+        await admission.acquire(Priority.BULK, 0)
+    order = []
+
+    async def call(priority, name):
+        await admission.acquire(priority, 0)
+        order.append(name)
+
+    bulk = asyncio.create_task(call(Priority.BULK, "bulk"))
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(call(Priority.INTERACTIVE, "interactive"))
+    await asyncio.gather(bulk, interactive)
+    assert order == ["interactive", "bulk"]
+
+async def test_bulk_calls_leave_the_reserve_for_interactive_ones():
+    admission = controller(reserve=0.5)
+    for _ in range(5):
+        await admission.acquire(Priority.BULK, 0)
+    assert admission.expected_wait(Priority.BULK) > 0
+    assert admission.expected_wait(Priority.INTERACTIVE) == 0
+
+async def test_calls_expected_to_wait_too_long_are_rejected_with_a_retry_delay():
+    admission = controller(requests_per_minute=60, max_waits={Priority.INTERACTIVE: 0.5, Priority.BULK: None})
+    await admission.acquire(Priority.INTERACTIVE, 0)
+    with pytest.raises(AdmissionRejected) as rejected:
+        await admission.acquire(Priority.INTERACTIVE, 0)
+    assert rejected.value.retry_after == 1
+    assert admission.stats()["interactive"]["rejected"] == 1
+
+async def test_full_queue_rejects_at_once():
+    admission = controller(requests_per_minute=60, queue_sizes={Priority.INTERACTIVE: 1, Priority.BULK: 0})
+    await admission.acquire(Priority.INTERACTIVE, 0)
+    waiting = asyncio.create_task(admission.acquire(Priority.INTERACTIVE, 0))
+    await asyncio.sleep(0)
+    with pytest.raises(AdmissionRejected, match="queue full"):
+        admission.check(Priority.INTERACTIVE)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert admission.stats()["interactive"]["queued"] == 0
+
+async def test_disabled_limits_admit_everything():
+    admission = controller(requests_per_minute=0, tokens_per_minute=0)
+    for _ in range(100):
+        await admission.acquire(Priority.BULK, 10_000)
@@ -0,0 +1,53 @@
+import time
+from app.services.answer_cache import AnswerCache, normalize_query
+
+def response(answer):
+    return {"status": "success", "data": {"answer": answer, "sources": [], "metadata": {}}}
+
+def test_normalize_query():
+    assert normalize_query("  How do I   reset it?? ") == "how do i reset it"
+
+def test_exact_and_semantic_hits_are_scoped_by_project():
+    cache = AnswerCache(ttl=60, similarity_threshold=0.9, max_entries=10)
+    cache.put("How to reset?", response("Write 0xB6."), cache.version("a/b"), embedding=[1.0, 0.0], project="a/b")
+
+    hit = cache.get("how to reset", "a/b")
+    assert hit["data"]["answer"] == "Write 0xB6." and hit["data"]["metadata"]["cached"] == "exact"
+    assert cache.get("how to reset", "c/d") is None
+
+    similar = cache.get_similar([0.99, 0.05], "a/b")
+    assert similar["data"]["metadata"]["cached"] == "semantic"
+    assert cache.get_similar([0.0, 1.0], "a/b") is None
+    assert cache.get_similar([0.99, 0.05], None) is None
+
+def test_hits_are_copies():
+    cache = AnswerCache(ttl=60, similarity_threshold=0.9, max_entries=10)
+    cache.put("q", response("a"), cache.version(None))
+    cache.get("q")["data"]["answer"] = "changed"
+    assert cache.get("q")["data"]["answer"] == "a"
+
+def test_invalidation_drops_answers_and_refuses_stale_puts():
+    cache = AnswerCache(ttl=60, similarity_threshold=0.9, max_entries=10)
+    cache.put("scoped", response("a"), cache.version("a/b"), project="a/b")
+    cache.put("global", response("b"), cache.version(None))
+    cache.put("other", response("c"), cache.version("c/d"), project="c/d")
+    stale = cache.version("a/b")
+
+    cache.invalidate("a/b")
+    assert cache.get("scoped", "a/b") is None
+    assert cache.get("global") is None
+    assert cache.get("other", "c/d") is not None
+    cache.put("scoped", response("old"), stale, project="a/b")
+    assert cache.get("scoped", "a/b") is None
+
+def test_errors_are_not_cached_and_entries_expire_and_are_bounded(monkeypatch):
+    cache = AnswerCache(ttl=60, similarity_threshold=0.9, max_entries=2)
+    cache.put("error", {"status": "error", "data": {}}, cache.version(None))
+    assert cache.get("error") is None
+    for query in ("one", "two", "three"):
+        cache.put(query, response(query), cache.version(None))
+    assert cache.get("one") is None and cache.stats()["entries"] == 2
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get("three") is None
@@ -0,0 +1,89 @@
+import pytest
+from openai import AsyncOpenAI, OpenAI
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models
+from app.core.config import settings
+from app.services.admission import AdmissionRejected
+from app.services.chat_service import ChatService
+from app.services.collection_config import ensure_collection
+from app.services.conversation_store import ConversationStore
+from benchmarks.fake_openai import FakeOpenAI
+
+pytestmark = pytest.mark.anyio
+
+QUESTION = "How do I wire the sensor?"
+
+class EmbeddingRejectingAdmission:
+    """Admits completions and turns away every embedding call"""
+
+    def __init__(self):
+        self.rejected = 0
+
+    async def acquire(self, priority, tokens):
+        if tokens < settings.ADMISSION_COMPLETION_TOKENS:
+            self.rejected += 1
+            raise AdmissionRejected(priority, 1.0, "embeddings rejected")
+
+@pytest.fixture
+async def openai_server():
+    server = await FakeOpenAI(latency=0.0, search_first=True).start()
+    yield server
+    await server.stop()
+
+@pytest.fixture
+async def qdrant():
+    client = AsyncQdrantClient(location=":memory:")
+    await ensure_collection(client, settings.QDRANT_COLLECTION_NAME, settings.EMBEDDING_DIMENSIONS)
+    await client.upsert(settings.QDRANT_COLLECTION_NAME, points=[models.PointStruct(
+        id=1,
+        vector=FakeOpenAI.embed(QUESTION, settings.EMBEDDING_DIMENSIONS).tolist(),
+        payload={
+            "name": "section_0",
+            "meta_data": {"url": "https://github.com/owner/repo/blob/main/README.md", "title": "Wiring", "project": "owner/repo"},
+            "content": "Connect SDA and SCL to the sensor.",
+        }
+    )])
+    yield client
+    await client.close()
+
+def chat_service(openai_server, qdrant, admission, **kwargs) -> ChatService:
+    return ChatService(
+        api_key="sk-test",
+        openai_client=OpenAI(api_key="sk-test", base_url=openai_server.base_url),
+        async_openai_client=AsyncOpenAI(api_key="sk-test", base_url=openai_server.base_url),
+        qdrant_client=QdrantClient(location=":memory:"),
+        async_qdrant_client=qdrant,
+        retrieval_mode="dense",
+        admission=admission,
+        **kwargs
+    )
+
+async def test_rejected_query_embedding_is_raised_instead_of_answering_without_context(openai_server, qdrant):
+    admission = EmbeddingRejectingAdmission()
+    service = chat_service(openai_server, qdrant, admission)
+    with pytest.raises(AdmissionRejected):
+        await service.query_docs(QUESTION)
+    assert openai_server.requests == 0
+
+async def test_rejected_query_embedding_ends_a_follow_up_stream_with_an_error(openai_server, qdrant):
+    store = ConversationStore(max_sessions=10, ttl=3600, window_tokens=4000, summary_tokens=500)
+    store.append("session", "What is it?", "A pressure sensor.")
+    service = chat_service(openai_server, qdrant, EmbeddingRejectingAdmission(), conversation_store=store)
+    events = [event async for event in service.stream_query_docs(QUESTION, session_id="session")]
+    assert [name for name, _ in events] == ["error"]
+    assert openai_server.requests == 0
+
+async def test_retriever_reuses_the_question_embedding(openai_server, qdrant):
+    service = chat_service(openai_server, qdrant, None)
+    question_embedding = FakeOpenAI.embed(QUESTION, settings.EMBEDDING_DIMENSIONS).tolist()
+    results = await service._retrieve(QUESTION, question=QUESTION, question_embedding=question_embedding)
+    assert [result["content"] for result in results] == ["Connect SDA and SCL to the sensor."]
+    assert openai_server.requests == 0
+
+async def test_rejected_rephrased_search_falls_back_to_the_question(openai_server, qdrant):
+    admission = EmbeddingRejectingAdmission()
+    service = chat_service(openai_server, qdrant, admission)
+    question_embedding = FakeOpenAI.embed(QUESTION, settings.EMBEDDING_DIMENSIONS).tolist()
+    results = await service._retrieve("sensor wiring", question=QUESTION, question_embedding=question_embedding)
+    assert [result["content"] for result in results] == ["Connect SDA and SCL to the sensor."]
+    assert admission.rejected == 1
@@ -0,0 +1,13 @@
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+def test_chat_requests_overlap_and_do_not_stall_the_loop():
+    # A fresh interpreter, so the cold request races warm-up's imports as in production
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.chat_load", "--requests", "20", "--latency", "0.5"],
+        cwd=BACKEND, capture_output=True, text=True, timeout=300
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,63 @@
+from app.core.tokens import estimate_tokens
+from app.services.chunker import MarkdownChunker
+
+DOCUMENT = """# Sensor
+
+Intro paragraph about the sensor and what it measures in the field.
+
+## Wiring
+
+Connect SDA and SCL. Pull-up resistors of 4.7k are required on both lines.
+
+## Usage
+
+```python
+sensor = Sensor()
+print(sensor.read())
+```
+"""
+
+def test_chunks_follow_sections_with_heading_breadcrumbs():
+    chunks = MarkdownChunker(min_tokens=0).chunk(DOCUMENT)
+    assert [chunk.heading_path for chunk in chunks] == [["Sensor"], ["Sensor", "Wiring"], ["Sensor", "Usage"]]
+    assert [chunk.title for chunk in chunks] == ["Sensor", "Wiring", "Usage"]
+    assert chunks[1].content.startswith("Sensor > Wiring\n\nConnect SDA and SCL.")
+
+def test_small_section_absorbs_its_first_subsection():
+    chunks = MarkdownChunker(min_tokens=40).chunk("# Title\n\nShort.\n\n## Details\n\nMore text here.\n")
+    assert len(chunks) == 1
+    assert "## Details" in chunks[0].content
+
+def test_feeding_pieces_matches_chunking_the_whole_text():
+    whole = MarkdownChunker(min_tokens=0).chunk(DOCUMENT)
+    chunker = MarkdownChunker(min_tokens=0)
+    pieces = []
+    for i in range(0, len(DOCUMENT), 7):
+        pieces += chunker.feed(DOCUMENT[i:i + 7])
+    pieces += chunker.close()
+    assert pieces == whole
+
+def test_long_sections_are_split_within_the_token_limit_with_overlap():
+    sentences = " ".join(f"Sentence number {i} describes register {i} of the device." for i in range(200))
+    chunks = MarkdownChunker(target_tokens=100, max_tokens=150, overlap_tokens=20).chunk(f"# Long\n\n{sentences}\n")
+    assert len(chunks) > 5
+    assert all(chunk.tokens <= 150 for chunk in chunks)
+    first_tail = chunks[0].content.rsplit(". ", 1)[-1]
+    assert first_tail in chunks[1].content
+
+def test_oversized_code_fences_are_split_into_complete_fences():
+    code = "\n".join(f"value_{i} = compute({i})" for i in range(300))
+    chunks = MarkdownChunker(target_tokens=100, max_tokens=150).chunk(f"# Code\n\n```python\n{code}\n```\n")
+    assert len(chunks) > 1
+    for chunk in chunks:
+        body = chunk.content.split("\n\n", 1)[1]
+        assert body.startswith("```python\n") and body.endswith("\n```")
+        assert estimate_tokens(body) <= 150
+
+def test_unterminated_fence_is_closed():
+    chunks = MarkdownChunker().chunk("# Title\n\n```\ncode without end\n")
+    assert chunks[-1].content.endswith("code without end\n```")
+
+def test_heading_inside_code_is_not_a_section():
+    chunks = MarkdownChunker(min_tokens=0).chunk("# Title\n\n```\n# not a heading\n```\n")
+    assert len(chunks) == 1 and chunks[0].heading_path == ["Title"]
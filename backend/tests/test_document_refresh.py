@@ -0,0 +1,89 @@
+import io
+import tarfile
+import pytest
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from app.core.config import settings
+from app.services.document_service import DocumentService
+from app.services.http_fetcher import HttpCache, HttpFetcher
+from benchmarks.fake_github import FakeGitHub
+
+pytestmark = pytest.mark.anyio
+
+README = "# Sensor\n\nThe sensor measures pressure.\n\n## Wiring\n\nConnect SDA and SCL.\n"
+
+def tarball(files) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for path, text in files.items():
+            data = text.encode()
+            info = tarfile.TarInfo(f"repo-0123abc/{path}")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+@pytest.fixture
+async def github(monkeypatch):
+    server = await FakeGitHub({
+        "owner/repo/main/README.md": README,
+        "owner/repo/tar.gz/HEAD": tarball({"README.md": README, "docs/guide.md": "# Guide\n\nRun it.\n"}),
+    }).start()
+    monkeypatch.setattr(settings, "GITHUB_RAW_BASE_URL", server.base_url)
+    monkeypatch.setattr(settings, "GITHUB_ARCHIVE_BASE_URL", server.base_url)
+    monkeypatch.setattr(settings, "EMBEDDER_BACKEND", "local")
+    monkeypatch.setattr(settings, "PROCESS_POOL_WORKERS", 1)
+    yield server
+    await server.stop()
+
+@pytest.fixture
+async def service(github, tmp_path):
+    client = AsyncQdrantClient(location=":memory:")
+    service = DocumentService(
+        qdrant_client=QdrantClient(location=":memory:"),
+        async_qdrant_client=client,
+        fetcher=HttpFetcher(cache=HttpCache(str(tmp_path)))
+    )
+    yield service
+    await service.fetcher.aclose()
+    await client.close()
+
+async def stored_urls(service: DocumentService):
+    return set(await service.pipeline.fingerprints_by_url("owner/repo"))
+
+async def drop_collection(service: DocumentService):
+    await service.pipeline.client.delete_collection(settings.QDRANT_COLLECTION_NAME)
+    service._collection_ready = False
+
+async def test_unchanged_readme_is_skipped(github, service):
+    first = await service.process_github_repo("https://github.com/owner/repo")
+    assert not first["not_modified"] and first["stats"]["sections"] > 0
+    second = await service.process_github_repo("https://github.com/owner/repo")
+    assert second["not_modified"]
+    assert github.not_modified == 1
+
+async def test_unchanged_readme_without_points_is_ingested_from_the_cached_copy(github, service):
+    await service.process_github_repo("https://github.com/owner/repo")
+    await drop_collection(service)
+    sent = github.bytes_sent
+
+    result = await service.process_github_repo("https://github.com/owner/repo")
+    assert not result["not_modified"] and result["stats"]["sections"] > 0
+    assert await stored_urls(service) == {"https://github.com/owner/repo/blob/main/README.md"}
+    assert github.not_modified == 1 and github.bytes_sent == sent
+
+async def test_unchanged_archive_is_skipped(github, service):
+    first = await service.process_repository("https://github.com/owner/repo")
+    assert first["files"] == 2
+    second = await service.process_repository("https://github.com/owner/repo")
+    assert second["not_modified"]
+
+async def test_unchanged_archive_without_points_is_downloaded_again(github, service):
+    await service.process_repository("https://github.com/owner/repo")
+    await drop_collection(service)
+
+    result = await service.process_repository("https://github.com/owner/repo")
+    assert not result["not_modified"] and result["files"] == 2
+    assert await stored_urls(service) == {
+        "https://github.com/owner/repo/blob/HEAD/README.md",
+        "https://github.com/owner/repo/blob/HEAD/docs/guide.md",
+    }
+    assert github.not_modified == 1
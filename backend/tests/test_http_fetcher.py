@@ -0,0 +1,75 @@
+import pytest
+from app.core.config import settings
+from app.services.http_fetcher import FetchError, HttpCache, HttpFetcher
+from benchmarks.fake_github import FakeGitHub
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def github():
+    server = await FakeGitHub({"owner/repo/main/README.md": "# Title\n\nBody text\n"}).start()
+    yield server
+    await server.stop()
+
+async def fetch(fetcher: HttpFetcher, url: str, **kwargs):
+    async with fetcher.get(url, **kwargs) as response:
+        return response.not_modified, await response.text()
+
+async def test_repeated_fetch_is_conditional_and_replays_the_cached_body(github, tmp_path):
+    fetcher = HttpFetcher(cache=HttpCache(str(tmp_path)))
+    url = f"{github.base_url}/owner/repo/main/README.md"
+    try:
+        assert await fetch(fetcher, url) == (False, "# Title\n\nBody text\n")
+        sent = github.bytes_sent
+        assert await fetch(fetcher, url) == (True, "# Title\n\nBody text\n")
+        assert github.bytes_sent == sent
+        assert fetcher.stats()["not_modified"] == 1
+
+        github.put("owner/repo/main/README.md", "# Title\n\nEdited\n")
+        assert await fetch(fetcher, url) == (False, "# Title\n\nEdited\n")
+        assert await fetch(fetcher, url, conditional=False) == (False, "# Title\n\nEdited\n")
+    finally:
+        await fetcher.aclose()
+
+async def test_validators_are_only_cached_after_the_body_was_read(github, tmp_path):
+    fetcher = HttpFetcher(cache=HttpCache(str(tmp_path)))
+    url = f"{github.base_url}/owner/repo/main/README.md"
+    try:
+        async with fetcher.get(url) as response:
+            assert not response.not_modified
+        with pytest.raises(RuntimeError):
+            async with fetcher.get(url) as response:
+                await response.text()
+                raise RuntimeError("processing failed")
+        assert await fetch(fetcher, url) == (False, "# Title\n\nBody text\n")
+        assert github.not_modified == 0
+    finally:
+        await fetcher.aclose()
+
+async def test_retries_unavailable_responses(github, monkeypatch):
+    monkeypatch.setattr(settings, "FETCH_RETRIES", 3)
+    github.fail_first = 2
+    fetcher = HttpFetcher()
+    try:
+        assert await fetch(fetcher, f"{github.base_url}/owner/repo/main/README.md") == (False, "# Title\n\nBody text\n")
+        assert fetcher.stats() == {"requests": 3, "not_modified": 0, "retries": 2}
+    finally:
+        await fetcher.aclose()
+
+async def test_missing_document_raises_fetch_error(github):
+    fetcher = HttpFetcher()
+    try:
+        with pytest.raises(FetchError) as error:
+            await fetch(fetcher, f"{github.base_url}/owner/repo/main/missing.md")
+        assert error.value.status == 404
+    finally:
+        await fetcher.aclose()
+
+async def test_rejects_bodies_over_the_limit(github):
+    github.put("owner/repo/main/big.md", "x" * 10_000)
+    fetcher = HttpFetcher()
+    try:
+        with pytest.raises(ValueError):
+            await fetch(fetcher, f"{github.base_url}/owner/repo/main/big.md", max_bytes=1000)
+    finally:
+        await fetcher.aclose()
@@ -0,0 +1,9 @@
+from benchmarks.import_budget import import_once
+
+BUDGET_MS = 1000.0
+
+def test_app_imports_without_sdks_within_budget():
+    runs = [import_once() for _ in range(3)]
+    best, _, loaded = min(runs, key=lambda run: run[0])
+    assert loaded == [], f"imported at startup although loaded lazily: {loaded}"
+    assert best < BUDGET_MS, f"import app.main took {best:.0f} ms, budget {BUDGET_MS:.0f} ms"
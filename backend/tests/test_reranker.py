@@ -0,0 +1,36 @@
+from app.services.reranker import LexicalReranker, query_terms, trim_to_budget
+
+def result(i, content):
+    return {"id": str(i), "content": content}
+
+def test_query_terms_drop_stopwords_and_duplicates():
+    assert query_terms("How do I reset the sensor? Reset it") == ["reset", "sensor"]
+    assert query_terms("what is it") == ["what", "is", "it"]
+
+def test_passages_covering_the_query_move_up():
+    results = [
+        result(0, "Installation with pip and the package index."),
+        result(1, "Changelog for older versions."),
+        result(2, "To reset the sensor, write 0xB6 to the reset register."),
+    ]
+    reranked = LexicalReranker(prior_weight=0.3).rerank("reset sensor register", results)
+    assert reranked[0]["id"] == "2"
+    assert all("rerank_score" in item for item in reranked)
+
+def test_prior_keeps_the_first_stage_order_between_equal_passages():
+    results = [result(i, "the same passage about sensors") for i in range(3)]
+    assert [item["id"] for item in LexicalReranker().rerank("sensor", results)] == ["0", "1", "2"]
+
+def test_scores_are_scaled_and_cached_per_query_and_candidates():
+    reranker = LexicalReranker()
+    scores = reranker.score("sensor", ["sensor sensor", "a sensor in a long passage about other things", "nothing"])
+    assert scores.max() == 1.0 and scores[2] == 0.0
+    results = [result(0, "sensor"), result(1, "other")]
+    reranker.rerank("Sensor", results)
+    reranker.rerank("sensor", results)
+    assert reranker.stats()["hits"] == 1 and reranker.stats()["misses"] == 1
+
+def test_trim_to_budget_keeps_order_and_always_the_first():
+    results = [result(0, "word " * 400), result(1, "short"), result(2, "short")]
+    assert [item["id"] for item in trim_to_budget(results, 10)] == ["0"]
+    assert [item["id"] for item in trim_to_budget(results[1:], 1000)] == ["1", "2"]
@@ -0,0 +1,90 @@
+import uuid
+import numpy as np
+import pytest
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models
+from app.core.config import settings
+from app.services.collection_config import ensure_collection
+from app.services.lexical_index import LexicalIndex
+from app.services.project_service import ProjectService
+from app.services.snapshot import Snapshot, export_snapshot, import_snapshot
+
+pytestmark = pytest.mark.anyio
+
+DIMENSIONS = 8
+POINTS = 25
+
+@pytest.fixture
+def embedder_settings(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDER_BACKEND", "local")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSIONS", DIMENSIONS)
+
+@pytest.fixture
+async def client():
+    client = AsyncQdrantClient(location=":memory:")
+    yield client
+    await client.close()
+
+async def fill(client: AsyncQdrantClient):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((POINTS, DIMENSIONS)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [str(uuid.UUID(int=i + 1)) for i in range(POINTS)]
+    payloads = [
+        {
+            "name": f"section_{i}",
+            "meta_data": {"url": f"https://github.com/owner/repo/blob/main/page{i % 3}.md", "project": "owner/repo"},
+            "content": f"Register {i} configures the sensor",
+        }
+        for i in range(POINTS)
+    ]
+    await ensure_collection(client, "source", DIMENSIONS)
+    await client.upsert("source", points=models.Batch(ids=ids, vectors=vectors.tolist(), payloads=payloads))
+    return ids, vectors, payloads
+
+async def test_round_trip_restores_points_projects_and_lexical_index(embedder_settings, client, tmp_path):
+    ids, vectors, payloads = await fill(client)
+    projects = ProjectService(str(tmp_path / "source"))
+    projects.add_project("repo", "https://github.com/owner/repo/blob/main/README.md", "A sensor driver")
+    path = tmp_path / "corpus.snap"
+
+    exported = await export_snapshot(client, "source", projects, str(path), page_size=10)
+    assert exported["points"] == POINTS and exported["projects"] == 1
+    assert Snapshot(str(path)).header["embedder"] == {"backend": "local", "model": "local-hashing-v1", "dimensions": DIMENSIONS}
+
+    restored = ProjectService(str(tmp_path / "target"))
+    lexical_index = LexicalIndex(str(tmp_path / "target" / "lexical.sqlite3"))
+    imported = await import_snapshot(client, "target", restored, str(path), lexical_index, batch_size=7, concurrency=2)
+    assert imported["points"] == POINTS
+    assert [project.readmeUrl for project in restored.get_projects()] == ["https://github.com/owner/repo/blob/main/README.md"]
+
+    points = await client.retrieve("target", ids=ids, with_payload=True, with_vectors=True)
+    by_id = {str(point.id): point for point in points}
+    for point_id, vector, payload in zip(ids, vectors, payloads):
+        assert np.allclose(by_id[point_id].vector, vector, atol=1e-6)
+        assert by_id[point_id].payload == payload
+    assert len(lexical_index.search("register 7", limit=5)) > 0
+    for service in (projects, restored, lexical_index):
+        service.close()
+
+async def test_import_refuses_vectors_of_another_embedder(embedder_settings, client, tmp_path, monkeypatch):
+    await fill(client)
+    projects = ProjectService(str(tmp_path))
+    path = tmp_path / "corpus.snap"
+    await export_snapshot(client, "source", projects, str(path))
+
+    monkeypatch.setattr(settings, "EMBEDDER_BACKEND", "openai")
+    with pytest.raises(ValueError, match="embedder"):
+        await import_snapshot(client, "target", projects, str(path))
+    assert not await client.collection_exists("target")
+    projects.close()
+
+async def test_truncated_snapshot_is_rejected(embedder_settings, client, tmp_path):
+    await fill(client)
+    projects = ProjectService(str(tmp_path))
+    path = tmp_path / "corpus.snap"
+    await export_snapshot(client, "source", projects, str(path))
+    path.write_bytes(path.read_bytes()[:-10])
+    with pytest.raises(ValueError, match="truncated"):
+        Snapshot(str(path))
+    projects.close()
@@ -0,0 +1,76 @@
+import pytest
+from app.services.upload_store import UploadStore, clean_filename
+
+BOUNDARY = b"----boundary"
+
+def multipart(files, fields=()):
+    body = b""
+    for name, value in fields:
+        body += b"--" + BOUNDARY + b"\r\n"
+        body += f'Content-Disposition: form-data; name="{name}"\r\n\r\n'.encode() + value + b"\r\n"
+    for filename, content in files:
+        body += b"--" + BOUNDARY + b"\r\n"
+        body += f'Content-Disposition: form-data; name="files"; filename="{filename}"\r\n'.encode()
+        body += b"Content-Type: application/octet-stream\r\n\r\n" + content + b"\r\n"
+    return body + b"--" + BOUNDARY + b"--\r\n"
+
+@pytest.fixture
+def store(tmp_path):
+    store = UploadStore(str(tmp_path), {"md", "txt"}, max_file_bytes=1000)
+    yield store
+    store.close()
+
+def receive(store, body, project="owner/repo", force=False, piece=5):
+    receiver = store.receiver(BOUNDARY, project, force)
+    for i in range(0, len(body), piece):
+        receiver.write(body[i:i + piece])
+    return receiver.finish()
+
+def test_clean_filename():
+    assert clean_filename("../docs/./guide.md") == "docs/guide.md"
+    assert clean_filename("C:\\docs\\guide.md") == "C:/docs/guide.md"
+
+def test_files_are_stored_by_content_hash_as_they_stream_in(store):
+    uploads = receive(store, multipart([("docs/guide.md", b"# Guide\n"), ("notes.txt", b"notes")], [("project", b"x")]))
+    assert [(upload.filename, upload.status) for upload in uploads] == [("docs/guide.md", "queued"), ("notes.txt", "queued")]
+    guide = uploads[0]
+    assert guide.url == "upload://owner/repo/docs/guide.md" and guide.size == 8
+    assert guide.path.read_bytes() == b"# Guide\n" and guide.path.name == f"{guide.sha256}.md"
+    assert not any(store.incoming.iterdir())
+
+def test_disallowed_and_oversized_files_are_rejected(store):
+    uploads = receive(store, multipart([("tool.exe", b"MZ"), ("big.md", b"x" * 2000)]))
+    assert [upload.status for upload in uploads] == ["rejected", "rejected"]
+    assert not any(store.objects.iterdir()) and not any(store.incoming.iterdir())
+
+def test_same_content_is_a_duplicate_until_forced_or_failed(store):
+    body = multipart([("guide.md", b"# Guide\n")])
+    first = receive(store, body)[0]
+    assert receive(store, body)[0].status == "duplicate"
+    assert receive(store, body, project="other/repo")[0].status == "queued"
+    assert receive(store, body, force=True)[0].status == "queued"
+
+    store.mark(first, "error")
+    assert receive(store, body)[0].status == "queued"
+
+def test_changed_content_replaces_the_previous_version(store):
+    old = receive(store, multipart([("guide.md", b"old")]))[0]
+    store.mark(old, "ingested")
+    new = receive(store, multipart([("guide.md", b"new")]))[0]
+    store.mark(new, "ingested")
+    assert receive(store, multipart([("guide.md", b"old")]))[0].status == "queued"
+
+def test_later_file_with_the_same_name_wins(store):
+    uploads = receive(store, multipart([("guide.md", b"first"), ("guide.md", b"second")]))
+    assert [upload.status for upload in uploads] == ["rejected", "queued"]
+    assert receive(store, multipart([("guide.md", b"first")]))[0].status == "queued"
+
+def test_truncated_body_is_an_error_and_abort_forgets_queued_files(store):
+    body = multipart([("a.md", b"complete"), ("b.md", b"x" * 100)])
+    receiver = store.receiver(BOUNDARY, "owner/repo")
+    receiver.write(body[:-60])
+    with pytest.raises(ValueError):
+        receiver.finish()
+    receiver.abort()
+    assert not any(store.incoming.iterdir())
+    assert receive(store, multipart([("a.md", b"complete")]))[0].status == "queued"